@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+import time
+import inspect
+import sqlite3
+import hashlib
+import threading
+import collections
+import numpy as np
+import cal_area as ca
+import area_stats
+import track_io
+
+# 内存缓存默认条目数
+DEFAULT_MEMORY_SIZE = 256
+# 磁盘缓存默认最大字节数
+DEFAULT_DISK_BYTES = 64 << 20
+# 参与轨迹内容哈希的字段
+HASH_COLUMNS = ('lng', 'lat', 'deep')
+# 抽稀时按速度识别停车点, 给定 max_area_error 时速度也参与哈希
+SPEED_COLUMN = 'veo'
+# 不影响计算结果、不参与缓存键的 track_area 参数
+IGNORED_OPTIONS = ('workers', 'stats')
+# track_area 各可选参数的默认值, 与默认值相同的参数不参与缓存键
+DEFAULT_OPTIONS = {name: parameter.default for name, parameter in inspect.signature(ca.track_area).parameters.items()
+                   if parameter.default is not inspect.Parameter.empty}
+
+
+def track_digest(track_data, track_id=None, hash_columns=HASH_COLUMNS):
+    """
+    计算轨迹的内容摘要: 给定轨迹 id 时只取 id、点数和最后一个轨迹点, 否则对轨迹坐标和耕深整体哈希
+
+    :param track_data: 轨迹记录字典列表或字段名到数组的字典
+    :param track_id: 轨迹 id, 如农机编号加作业日期
+    :param hash_columns: 参与哈希的字段
+    :return: 摘要字节串
+    """
+    columns = track_io.track_columns(track_data, hash_columns)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(tuple(hash_columns)).encode('ascii'))
+    if track_id is not None:
+        # 实时轨迹只会在末尾追加, id 加点数和最后一个点即可区分
+        digest.update(str(track_id).encode('utf-8'))
+        digest.update(str(len(columns['lng'])).encode('ascii'))
+        for column in hash_columns:
+            digest.update(np.asarray(columns[column][-1:], dtype=np.float64).tobytes())
+    else:
+        for column in hash_columns:
+            digest.update(np.ascontiguousarray(columns[column], dtype=np.float64).tobytes())
+    return digest.digest()
+
+
+def field_digest(field_data):
+    """
+    计算地块边界几何的内容摘要, 不包括要素属性
+
+    :param field_data: 地块边界数据
+    :return: 摘要字节串
+    """
+    geometries = [feature['geometry'] for feature in field_data['features']]
+    text = json.dumps(geometries, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def normalize_option(item):
+    """
+    统一参数值的表示, 使相同含义的参数得到相同的缓存键, 如耕深阈值表的列表、元组和数组
+
+    :param item: (参数名, 参数值)
+    :return: (参数名, 统一后的参数值)
+    """
+    name, value = item
+    if name == 'band_thresholds' and value is not None:
+        value = tuple(float(threshold) for threshold in value)
+    return name, value
+
+
+def is_default_option(name, value):
+    """
+    判断参数值是否与 track_area 的默认值相同
+
+    :param name: 参数名
+    :param value: 统一后的参数值
+    :return: 是否为默认值
+    """
+    if name not in DEFAULT_OPTIONS:
+        return False
+    default = DEFAULT_OPTIONS[name]
+    if default is None or isinstance(default, bool):
+        return value is default
+    return value == default
+
+
+def cache_key(track_data, field_data, width, deep_depth, shallow_depth, track_id=None, **options):
+    """
+    生成 track_area 结果的缓存键
+
+    :param track_data: 轨迹记录字典列表或字段名到数组的字典
+    :param field_data: 地块边界数据
+    :param width: 农具作业幅宽
+    :param deep_depth: 农具深耕阈值
+    :param shallow_depth: 农具浅耕阈值
+    :param track_id: 轨迹 id, 为 None 时对轨迹内容整体哈希
+    :param options: 其它 track_area 参数, 如 backend、cell_size; 与 track_area 默认值相同的参数等同于未给定
+    :return: 缓存键(十六进制字符串)
+    """
+    hash_columns = HASH_COLUMNS
+    if options.get('max_area_error') is not None and track_io.has_column(track_data, SPEED_COLUMN):
+        # 抽稀结果与速度有关
+        hash_columns += (SPEED_COLUMN,)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(track_digest(track_data, track_id, hash_columns))
+    digest.update(field_digest(field_data))
+    params = [float(width), float(deep_depth), float(shallow_depth)]
+    params += sorted((name, value) for name, value in map(normalize_option, options.items())
+                     if name not in IGNORED_OPTIONS and not is_default_option(name, value))
+    digest.update(repr(params).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class AreaCache:
+    """
+    track_area 结果缓存: 内存 LRU 缓存 + sqlite 磁盘缓存, 磁盘缓存超过容量时淘汰最久未访问的结果
+    """
+
+    def __init__(self, path=None, memory_size=DEFAULT_MEMORY_SIZE, max_disk_bytes=DEFAULT_DISK_BYTES):
+        """
+        :param path: sqlite 缓存文件路径, 为 None 时只使用内存缓存
+        :param memory_size: 内存缓存条目数
+        :param max_disk_bytes: 磁盘缓存最大字节数
+        """
+        self.memory_size = memory_size
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+        # 命中统计
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute('CREATE TABLE IF NOT EXISTS results '
+                            '(key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+            self.db.commit()
+
+    def get(self, key):
+        """
+        查询缓存结果, 磁盘命中时同时放入内存缓存
+
+        :param key: 缓存键
+        :return: 缓存结果, 未命中时为 None
+        """
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return self.memory[key]
+            if self.db is not None:
+                row = self.db.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    self.db.execute('UPDATE results SET accessed = ? WHERE key = ?', (time.time(), key))
+                    self.db.commit()
+                    result = tuple(json.loads(row[0]))
+                    self.remember(key, result)
+                    self.disk_hits += 1
+                    return result
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        """
+        写入缓存结果
+
+        :param key: 缓存键
+        :param result: track_area 结果
+        """
+        result = tuple(float(value) for value in result)
+        with self.lock:
+            self.remember(key, result)
+            if self.db is not None:
+                value = json.dumps(result)
+                self.db.execute('INSERT OR REPLACE INTO results (key, value, size, accessed) VALUES (?, ?, ?, ?)',
+                                (key, value, len(key) + len(value), time.time()))
+                self.evict()
+                self.db.commit()
+
+    def remember(self, key, result):
+        """
+        放入内存缓存, 超过条目数时淘汰最久未访问的结果
+
+        :param key: 缓存键
+        :param result: track_area 结果
+        """
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def evict(self):
+        """
+        磁盘缓存超过最大字节数时, 按最久未访问顺序删除结果
+        """
+        total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        excess = total - self.max_disk_bytes
+        freed = 0
+        keys = []
+        for key, size in self.db.execute('SELECT key, size FROM results ORDER BY accessed'):
+            keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.db.executemany('DELETE FROM results WHERE key = ?', keys)
+        self.evictions += len(keys)
+
+    def stats(self):
+        """
+        获取缓存命中统计
+
+        :return: 命中统计字典
+        """
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self.memory),
+            }
+
+    def track_area(self, track_data, field_data, width, deep_depth, shallow_depth, track_id=None, **options):
+        """
+        带缓存的 cal_area.track_area, 参数相同
+
+        :param track_data: 农机轨迹数据, 轨迹文件路径(JSON 或二进制)、轨迹记录字典列表或 track_io.load_track 读取的字段数组
+        :param field_data: 地块边界数据
+        :param width: 农具作业幅宽
+        :param deep_depth: 农具深耕阈值
+        :param shallow_depth: 农具浅耕阈值
+        :param track_id: 轨迹 id, 为 None 时对轨迹内容整体哈希
+        :param options: 其它 track_area 参数; 给定 stats 时命中缓存只记录 cache 步骤, 未命中时还记录各计算步骤
+        :return: 轨迹总体长度, 地块面积, 轨迹覆盖面积, 深耕作业面积, 浅耕作业面积, 总作业面积(不包括重复作业), 重复作业面积;
+                 return_geometry 为 True 时与 cal_area.track_area 相同
+        """
+        if options.get('return_geometry'):
+            # 几何对象不写入缓存, 直接计算且不计入命中统计
+            return ca.track_area(track_data, field_data, width, deep_depth, shallow_depth, **options)
+        track_data = track_io.open_track(track_data)
+        stats = options.get('stats') or area_stats.NULL_STATS
+        with stats.stage('cache') as counters:
+            key = cache_key(track_data, field_data, width, deep_depth, shallow_depth, track_id, **options)
+            result = self.get(key)
+            counters['hit'] = result is not None
+        if result is None:
+            result = ca.track_area(track_data, field_data, width, deep_depth, shallow_depth, **options)
+            self.put(key, result)
+        return result
+
+    def close(self):
+        """
+        关闭磁盘缓存
+        """
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import json
+import asyncio
+import logging
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import cal_area as ca
+import coor_utils
+from batch_area import RESULT_FIELDS, warm_worker
+
+"""
+python area_service.py --port 8080 --workers 4 --warm_zones EPSG:4528
+python area_service.py --port 8080 --track_dir /data/tracks
+
+curl -X POST http://127.0.0.1:8080/track_area -d '{"track": [...], "field": {...}, "width": 2.3, "deep_depth": 15.0, "shallow_depth": 12.0}'
+"""
+
+logger = logging.getLogger(__name__)
+
+# 请求体最大字节数
+DEFAULT_MAX_BODY_BYTES = 64 << 20
+# 单个请求的默认超时时间(秒)
+DEFAULT_TIMEOUT = 60.0
+# 请求中可选的 track_area 参数
+REQUEST_OPTIONS = ('tile_size', 'backend', 'cell_size', 'max_area_error', 'band_thresholds')
+# HTTP 状态码说明
+HTTP_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+    504: 'Gateway Timeout',
+}
+
+
+class RequestError(Exception):
+    """
+    请求内容错误, 返回给调用方的状态码和错误信息
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def request_track(track, track_dir=None):
+    """
+    检查请求中的轨迹数据: 轨迹文件路径只允许位于配置的轨迹目录内, 未配置轨迹目录时只接受请求内的轨迹数据
+
+    :param track: 请求中的轨迹数据, 轨迹记录列表、字段数组字典或轨迹文件路径
+    :param track_dir: 允许读取的轨迹文件目录, 为 None 时不接受轨迹文件路径
+    :return: 轨迹数据, 为路径时返回其绝对路径
+    """
+    if not isinstance(track, str):
+        return track
+    if track_dir is None:
+        raise ValueError("ERROR!!! Track file paths are not accepted, send the track records in the request")
+    root = os.path.realpath(track_dir)
+    path = os.path.realpath(os.path.join(root, track))
+    if os.path.commonpath((root, path)) != root:
+        raise ValueError("ERROR!!! Track file path is outside the track directory")
+    return path
+
+
+def compute_area(body, track_dir=None):
+    """
+    在工作进程中解析请求体并计算作业面积, 在工作进程中解析 JSON 以免阻塞事件循环
+
+    :param body: 请求体字节串, JSON 对象包含 track(轨迹记录列表、字段数组字典或轨迹目录内的轨迹文件相对路径)、field、
+                 width、deep_depth、shallow_depth 及可选的 track_area 参数
+    :param track_dir: 允许读取的轨迹文件目录, 为 None 时不接受轨迹文件路径
+    :return: (状态码, 结果字典)
+    """
+    try:
+        payload = json.loads(body)
+        options = {name: payload[name] for name in REQUEST_OPTIONS if payload.get(name) is not None}
+        track = request_track(payload['track'], track_dir)
+        result = ca.track_area(track, payload['field'], float(payload['width']), float(payload['deep_depth']),
+                               float(payload['shallow_depth']), **options)
+    except (KeyError, ValueError, TypeError) as e:
+        return 400, {'status': 'error', 'error': '{}: {}'.format(type(e).__name__, e)}
+    except Exception as e:
+        return 500, {'status': 'error', 'error': '{}: {}'.format(type(e).__name__, e),
+                     'traceback': traceback.format_exc(limit=3)}
+    record = {'status': 'ok'}
+    record.update(zip(RESULT_FIELDS, (float(value) for value in result)))
+    return 200, record
+
+
+class AreaService:
+    """
+    本地 HTTP 作业面积计算服务: 在预热的进程池中计算, 在途请求数达到上限时直接拒绝, 每个请求有超时时间
+    """
+
+    def __init__(self, workers=None, max_pending=None, timeout=DEFAULT_TIMEOUT, warm_zones=coor_utils.CGCS2000_ZONES,
+                 max_body_bytes=DEFAULT_MAX_BODY_BYTES, track_dir=None):
+        """
+        :param workers: 工作进程数, 为 None 时使用 CPU 核数
+        :param max_pending: 在途请求数上限, 为 None 时为进程数的 2 倍
+        :param timeout: 单个请求的超时时间(秒)
+        :param warm_zones: 需要预热的投影坐标系编号列表, 默认为全部 CGCS2000 3 度带
+        :param max_body_bytes: 请求体最大字节数
+        :param track_dir: 允许按路径读取的轨迹文件目录, 为 None 时只接受请求内的轨迹数据
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.warm_zones = tuple(warm_zones)
+        self.executor = self.create_executor()
+        self.max_pending = max_pending or self.workers * 2
+        self.timeout = timeout
+        self.max_body_bytes = max_body_bytes
+        self.track_dir = track_dir
+        self.slots = asyncio.Semaphore(self.max_pending)
+
+        # 请求统计
+        self.counters = {'requests': 0, 'ok': 0, 'rejected': 0, 'timeouts': 0, 'errors': 0, 'pool_restarts': 0}
+
+    def create_executor(self):
+        """
+        创建工作进程池, 工作进程初始化时预热 warm_zones 中的投影带
+
+        :return: 进程池
+        """
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=warm_worker, initargs=(self.warm_zones,))
+
+    def restart_executor(self, executor):
+        """
+        工作进程异常退出导致进程池不可用时重建进程池; 多个请求同时发现时只重建一次
+
+        :param executor: 发现不可用的进程池
+        """
+        if executor is not self.executor:
+            return
+        logger.warning('Worker pool is broken, restarting it')
+        executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = self.create_executor()
+        self.counters['pool_restarts'] += 1
+
+    def warm_up(self):
+        """
+        提前启动全部工作进程, 使首个请求不承担进程启动、模块导入和坐标系初始化的耗时;
+        工作进程初始化时构建 warm_zones 中各投影带的坐标转换器, 空任务完成即表示预热结束
+        """
+        futures = [self.executor.submit(int) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    async def read_request(self, reader):
+        """
+        读取一个 HTTP 请求
+
+        :param reader: asyncio 流读取器
+        :return: (请求方法, 路径, 请求体字节串)
+        """
+        request_line = await reader.readline()
+        if not request_line:
+            raise ConnectionError('Connection closed')
+        try:
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise RequestError(400, 'Malformed request line')
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length') or 0)
+        if length > self.max_body_bytes:
+            raise RequestError(413, 'Request body exceeds {} bytes'.format(self.max_body_bytes))
+        body = await reader.readexactly(length) if length else b''
+        return method, path.split('?', 1)[0], body
+
+    async def write_response(self, writer, status, record):
+        """
+        写出 JSON 响应并关闭连接
+
+        :param writer: asyncio 流写入器
+        :param status: 状态码
+        :param record: 响应字典
+        """
+        body = json.dumps(record, ensure_ascii=False).encode('utf-8')
+        head = 'HTTP/1.1 {} {}\r\nContent-Type: application/json; charset=utf-8\r\nContent-Length: {}\r\n' \
+               'Connection: close\r\n\r\n'.format(status, HTTP_REASONS.get(status, ''), len(body))
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+        writer.close()
+
+    async def handle_area(self, body):
+        """
+        处理作业面积计算请求
+
+        :param body: 请求体字节串
+        :return: (状态码, 结果字典)
+        """
+        # 在途请求已满时立即拒绝, 不在服务端排队
+        if self.slots.locked():
+            self.counters['rejected'] += 1
+            return 503, {'status': 'error', 'error': 'Too many pending requests'}
+
+        await self.slots.acquire()
+        executor = self.executor
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(executor, compute_area, body, self.track_dir)
+        except BrokenProcessPool:
+            self.slots.release()
+            self.restart_executor(executor)
+            self.counters['errors'] += 1
+            return 503, {'status': 'error', 'error': 'Worker pool is restarting'}
+        except BaseException:
+            self.slots.release()
+            raise
+        # 任务在工作进程中真正结束后才释放名额, 超时的任务仍占用名额, 在途请求数不会超过工作进程的实际负载
+        future.add_done_callback(lambda _: self.slots.release())
+
+        try:
+            # shield 使超时只影响对调用方的响应, 不取消任务本身, 名额仍由任务结束时释放
+            status, record = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            # 已开始计算的任务无法中断, 在工作进程中继续执行到结束, 结果被丢弃
+            self.counters['timeouts'] += 1
+            return 504, {'status': 'error', 'error': 'Timed out after {} s'.format(self.timeout)}
+        except BrokenProcessPool:
+            # 工作进程异常退出(如内存不足被终止), 重建进程池后可继续处理新的请求
+            self.restart_executor(executor)
+            self.counters['errors'] += 1
+            return 503, {'status': 'error', 'error': 'Worker process died, pool is restarting'}
+
+        self.counters['ok' if status == 200 else 'errors'] += 1
+        return status, record
+
+    async def handle_connection(self, reader, writer):
+        """
+        处理一个连接上的一个请求
+
+        :param reader: asyncio 流读取器
+        :param writer: asyncio 流写入器
+        """
+        try:
+            method, path, body = await self.read_request(reader)
+        except RequestError as e:
+            await self.write_response(writer, e.status, {'status': 'error', 'error': str(e)})
+            return
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            writer.close()
+            return
+
+        self.counters['requests'] += 1
+        if path == '/health':
+            status, record = 200, dict(self.counters, status='ok', max_pending=self.max_pending)
+        elif path != '/track_area':
+            status, record = 404, {'status': 'error', 'error': 'Unknown path: {}'.format(path)}
+        elif method != 'POST':
+            status, record = 405, {'status': 'error', 'error': 'Use POST'}
+        else:
+            try:
+                status, record = await self.handle_area(body)
+            except Exception as e:
+                logger.exception('Failed to handle %s', path)
+                self.counters['errors'] += 1
+                status, record = 500, {'status': 'error', 'error': '{}: {}'.format(type(e).__name__, e)}
+        try:
+            await self.write_response(writer, status, record)
+        except ConnectionError:
+            logger.warning('Client disconnected before the response of %s', path)
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        """
+        启动服务并一直运行
+
+        :param host: 监听地址
+        :param port: 监听端口
+        """
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        logger.info('Serving track_area on http://%s:%d with %d workers', host, port, self.workers)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        """
+        关闭进程池
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve track_area over local HTTP with a pre-warmed worker pool')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes, CPU count by default')
+    parser.add_argument('--max_pending', type=int, default=None, help='Requests in flight before answering 503, twice the workers by default')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='Seconds before a request is answered with 504')
+    parser.add_argument('--warm_zones', nargs='*', default=coor_utils.CGCS2000_ZONES,
+                        help='CGCS2000 zones to warm up in every worker, e.g. EPSG:4528; all 21 zones by default')
+    parser.add_argument('--track_dir', default=None, help='Directory requests may read track files from by relative '
+                                                          'path; only inline tracks are accepted when omitted')
+    opt = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    service = AreaService(opt.workers, opt.max_pending, opt.timeout, opt.warm_zones, track_dir=opt.track_dir)
+    service.warm_up()
+    try:
+        asyncio.run(service.serve(opt.host, opt.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
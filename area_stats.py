@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import time
+import logging
+import contextlib
+import collections
+
+logger = logging.getLogger(__name__)
+
+# 单个计算步骤的统计结果
+StageStats = collections.namedtuple('StageStats', [
+    'name',       # 步骤名称
+    'wall_time',  # 耗时(秒)
+    'counters',   # 计数字典, 如输入/输出点数、作业段数、并集顶点数
+])
+
+
+def log_stage(stage):
+    """
+    以日志方式输出单个步骤的统计结果, 可作为 AreaStats 的回调
+
+    :param stage: StageStats 步骤统计结果
+    """
+    counters = ', '.join('{}={}'.format(name, value) for name, value in stage.counters.items())
+    logger.info('%-12s %8.2f ms  %s', stage.name, stage.wall_time * 1000, counters)
+
+
+class AreaStats:
+    """
+    作业面积计算的分步骤统计: 记录各步骤耗时和计数, 每个步骤结束时调用回调
+    """
+    enabled = True
+
+    def __init__(self, hook=None):
+        """
+        :param hook: 步骤结束时的回调, 参数为 StageStats, 如 log_stage 或指标导出函数
+        """
+        self.hook = hook
+        self.stages = []
+
+    @contextlib.contextmanager
+    def stage(self, name, **counters):
+        """
+        统计一个计算步骤, with 语句内可向返回的计数字典中写入计数
+
+        :param name: 步骤名称
+        :param counters: 步骤开始时已知的计数
+        :return: 计数字典
+        """
+        start = time.perf_counter()
+        try:
+            yield counters
+        finally:
+            stage = StageStats(name, time.perf_counter() - start, counters)
+            self.stages.append(stage)
+            if self.hook is not None:
+                self.hook(stage)
+
+    @property
+    def total_time(self):
+        """
+        各步骤耗时之和(秒)
+        """
+        return sum(stage.wall_time for stage in self.stages)
+
+    def as_dict(self):
+        """
+        转换为可序列化为 JSON 的字典
+
+        :return: 步骤名称到耗时和计数的字典
+        """
+        return {stage.name: dict(stage.counters, wall_time=stage.wall_time) for stage in self.stages}
+
+
+class NullStats:
+    """
+    未开启统计时使用的空统计对象, 不计时也不保存结果
+    """
+    enabled = False
+
+    def stage(self, name, **counters):
+        """
+        :param name: 步骤名称
+        :param counters: 计数, 忽略
+        :return: 空上下文, 返回一个丢弃的计数字典
+        """
+        return contextlib.nullcontext(counters)
+
+
+# 共享的空统计对象
+NULL_STATS = NullStats()
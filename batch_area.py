@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import csv
+import json
+import argparse
+import functools
+import traceback
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import cal_area as ca
+import coor_utils
+import track_io
+
+"""
+python batch_area.py --manifest ./jobs.csv --output ./results.jsonl --workers 8
+"""
+
+# 清单中每个作业的字段
+JOB_FIELDS = ('track_path', 'field_path', 'width', 'deep_depth', 'shallow_depth')
+# 输出结果中七项面积的字段名
+RESULT_FIELDS = ('track_length', 'field_area', 'total_area', 'cultivation_deep_area', 'cultivation_shallow_area',
+                 'cultivation_total_area', 'overlap_total_area')
+
+
+def read_manifest(manifest_path):
+    """
+    读取作业清单, 支持 CSV(带表头) 和 JSONL, 没有 id 字段时以作业序号作为 id;
+    无法解析的行作为带 error 信息的作业返回, 执行时只记该作业失败, 不中断整个批次
+
+    :param manifest_path: 作业清单文件路径
+    :return: 作业字典列表
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        if manifest_path.endswith('.jsonl'):
+            rows = []
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except ValueError as e:
+                    rows.append(e)
+        else:
+            rows = list(csv.DictReader(f))
+
+    jobs = []
+    for i, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            jobs.append({'id': str(i), 'error': 'Malformed manifest row: {}'.format(row)})
+            continue
+        job = {'id': str(row.get('id') or i)}
+        try:
+            for name in JOB_FIELDS:
+                if row.get(name) is None:
+                    raise ValueError("ERROR!!! Job {} in manifest lacks field: {}".format(job['id'], name))
+                job[name] = row[name] if name.endswith('_path') else float(row[name])
+        except (ValueError, TypeError) as e:
+            job = {'id': job['id'], 'error': '{}: {}'.format(type(e).__name__, e)}
+        jobs.append(job)
+    return jobs
+
+
+def completed_job_ids(output_path):
+    """
+    读取已有结果文件中成功完成的作业 id, 用于断点续算
+
+    :param output_path: 结果文件路径
+    :return: 已完成作业 id 集合
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 中断时写了一半的行
+                continue
+            if record.get('status') == 'ok':
+                done.add(str(record['id']))
+    return done
+
+
+@functools.lru_cache(maxsize=8)
+def load_track_cached(track_path):
+    """
+    读取轨迹文件, 同一进程内多个作业共用同一轨迹时只读取一次
+
+    :param track_path: 轨迹文件路径
+    :return: 字段名到 numpy 数组的字典
+    """
+    return track_io.load_track(track_path, ('lng', 'lat', 'deep'))
+
+
+@functools.lru_cache(maxsize=64)
+def load_field_cached(field_path):
+    """
+    读取地块文件, 同一进程内多个作业共用同一地块时只读取一次
+
+    :param field_path: 地块文件路径
+    :return: 地块边界数据
+    """
+    with open(field_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def warm_worker(warm_zones):
+    """
+    进程池工作进程初始化, 预先构建常用投影带的坐标转换器
+
+    :param warm_zones: 需要预热的投影坐标系编号列表
+    """
+    for utm_proj in warm_zones:
+        coor_utils.get_transformer(utm_proj)
+
+
+def run_job(job):
+    """
+    执行单个作业, 异常时返回错误信息而不中断整个批次
+
+    :param job: 作业字典
+    :return: 结果记录字典
+    """
+    record = {'id': job['id']}
+    if 'error' in job:
+        # 清单中无法解析的作业
+        record['status'] = 'error'
+        record['error'] = job['error']
+        return record
+    try:
+        result = ca.track_area(load_track_cached(job['track_path']), load_field_cached(job['field_path']),
+                               job['width'], job['deep_depth'], job['shallow_depth'])
+        record['status'] = 'ok'
+        record.update(zip(RESULT_FIELDS, (float(value) for value in result)))
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = '{}: {}'.format(type(e).__name__, e)
+        record['traceback'] = traceback.format_exc(limit=3)
+    return record
+
+
+def run_batch(manifest_path, output_path, workers=None, warm_zones=coor_utils.CGCS2000_ZONES, max_pending=None):
+    """
+    在进程池中批量执行作业, 每完成一个作业即写入结果文件, 已完成的作业在重新运行时跳过
+
+    :param manifest_path: 作业清单文件路径
+    :param output_path: 结果文件路径(JSONL)
+    :param workers: 并行进程数, 为 None 时使用 CPU 核数
+    :param warm_zones: 需要预热的投影坐标系编号列表, 默认为全部 CGCS2000 3 度带
+    :param max_pending: 同时提交的最大作业数, 为 None 时为进程数的 4 倍
+    :return: (成功作业数, 失败作业数, 跳过作业数)
+    """
+    jobs = read_manifest(manifest_path)
+    done = completed_job_ids(output_path)
+    pending_jobs = [job for job in jobs if job['id'] not in done]
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+
+    ok_count = 0
+    error_count = 0
+    # 中断时写了一半的行没有换行符, 续写前先补上, 以免与新结果连在同一行
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                with open(output_path, 'a', encoding='utf-8') as out:
+                    out.write('\n')
+    with open(output_path, 'a', encoding='utf-8') as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=warm_worker, initargs=(tuple(warm_zones),)) as executor:
+        job_iter = iter(pending_jobs)
+        running = set()
+        while True:
+            # 控制在途作业数量, 避免一次性提交全部作业
+            for job in job_iter:
+                running.add(executor.submit(run_job, job))
+                if len(running) >= max_pending:
+                    break
+            if not running:
+                break
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+                if record['status'] == 'ok':
+                    ok_count += 1
+                else:
+                    error_count += 1
+    return ok_count, error_count, len(jobs) - len(pending_jobs)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calculate operation area for many (track, field) jobs in a process pool')
+    parser.add_argument('--manifest', required=True, help='CSV or JSONL manifest of track_path, field_path, width, deep_depth, shallow_depth')
+    parser.add_argument('--output', required=True, help='JSONL result file, appended to and used for resuming')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes, CPU count by default')
+    parser.add_argument('--warm_zones', nargs='*', default=coor_utils.CGCS2000_ZONES,
+                        help='CGCS2000 zones to warm up in every worker, e.g. EPSG:4528; all 21 zones by default')
+    opt = parser.parse_args()
+
+    ok_count, error_count, skip_count = run_batch(opt.manifest, opt.output, opt.workers, opt.warm_zones)
+    print(f'Finished jobs: {ok_count}, failed jobs: {error_count}, skipped jobs: {skip_count}')
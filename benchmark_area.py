@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import sys
+import json
+import time
+import platform
+import argparse
+import numpy as np
+import shapely
+import cal_area as ca
+import area_stats
+import synthetic_track
+from batch_area import RESULT_FIELDS
+
+"""
+python benchmark_area.py --output ./benchmark.json --max_points 100000
+python benchmark_area.py --output ./benchmark_new.json --baseline ./benchmark.json
+python benchmark_area.py --output ./benchmark_new.json --baseline ./benchmark_baseline.json --max_points 10000
+"""
+
+# 基准用例: (名称, 轨迹点数, 作业行数, 其它合成参数)
+BENCHMARK_CASES = (
+    ('1k-1run', 1000, 1, {}),
+    ('10k-10runs', 10000, 10, {'parks': 2}),
+    ('10k-100runs-switch', 10000, 10, {'switch_rate': 0.01}),
+    ('100k-100runs', 100000, 100, {'parks': 10}),
+    ('100k-1krun-switch', 100000, 100, {'switch_rate': 0.01, 'parks': 10}),
+    ('1m-1krun', 1000000, 1000, {'parks': 50}),
+    ('1m-10krun', 1000000, 10000, {'parks': 50}),
+)
+# 面积与基准结果的最大相对偏差
+DEFAULT_AREA_TOLERANCE = 1e-6
+# 耗时与基准结果的最大比值
+DEFAULT_TIME_TOLERANCE = 1.5
+
+
+def run_case(name, points, passes, workload, width, deep_depth, shallow_depth, repeat, options):
+    """
+    生成合成轨迹并多次计算作业面积, 取端到端耗时最短的一次记录各步骤耗时
+
+    :param name: 用例名称
+    :param points: 轨迹点数
+    :param passes: 作业行数
+    :param workload: 其它合成参数
+    :param width: 农具作业幅宽
+    :param deep_depth: 农具深耕阈值
+    :param shallow_depth: 农具浅耕阈值
+    :param repeat: 重复次数
+    :param options: 其它 track_area 参数
+    :return: 用例结果字典
+    """
+    track_data, field_data = synthetic_track.generate_workload(points, passes, width, deep_depth, shallow_depth, **workload)
+    best = None
+    for _ in range(repeat):
+        stats = area_stats.AreaStats()
+        start = time.perf_counter()
+        result = ca.track_area(track_data, field_data, width, deep_depth, shallow_depth, stats=stats, **options)
+        wall_time = time.perf_counter() - start
+        if best is None or wall_time < best[0]:
+            best = (wall_time, stats, result)
+
+    wall_time, stats, result = best
+    stages = stats.as_dict()
+    return {
+        'points': points,
+        'passes': passes,
+        'workload': workload,
+        'runs': stages['runs']['runs'],
+        'wall_time': wall_time,
+        'stages': stages,
+        'areas': dict(zip(RESULT_FIELDS, (float(value) for value in result))),
+    }
+
+
+def compare_results(results, baseline, area_tolerance=DEFAULT_AREA_TOLERANCE, time_tolerance=DEFAULT_TIME_TOLERANCE):
+    """
+    与基准结果比较面积和耗时
+
+    :param results: 本次用例结果字典
+    :param baseline: 基准用例结果字典
+    :param area_tolerance: 面积最大相对偏差
+    :param time_tolerance: 耗时最大比值
+    :return: 回归问题描述列表
+    """
+    problems = []
+    for name, case in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]
+        for field, value in case['areas'].items():
+            reference = expected['areas'][field]
+            if abs(value - reference) > area_tolerance * max(abs(reference), 1.0):
+                problems.append('{}: {} changed from {:.6f} to {:.6f}'.format(name, field, reference, value))
+        ratio = case['wall_time'] / expected['wall_time'] if expected['wall_time'] > 0 else 1.0
+        if ratio > time_tolerance:
+            problems.append('{}: wall time {:.3f}s is {:.2f}x the baseline {:.3f}s'.format(
+                name, case['wall_time'], ratio, expected['wall_time']))
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark track_area on synthetic boustrophedon workloads')
+    parser.add_argument('--output', required=True, help='JSON file for the benchmark results')
+    parser.add_argument('--baseline', default=None, help='Earlier results to check areas and timing against')
+    parser.add_argument('--cases', nargs='*', default=None, help='Case names to run, all cases by default')
+    parser.add_argument('--max_points', type=int, default=None, help='Skip cases with more track points')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case, the fastest one is kept')
+    parser.add_argument('--width', type=float, default=2.3, help='Width of agricultural implement')
+    parser.add_argument('--deep_depth', type=float, default=15.0, help='Deep tillage depth')
+    parser.add_argument('--shallow_depth', type=float, default=12.0, help='Shallow tillage depth')
+    parser.add_argument('--backend', default='vector', choices=('vector', 'raster'), help='Exact vector or fast raster coverage')
+    parser.add_argument('--tile_size', type=float, default=None, help='Tile size (m) of the tiled union engine')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes of the tiled union engine')
+    parser.add_argument('--area_tolerance', type=float, default=DEFAULT_AREA_TOLERANCE, help='Relative area change allowed against the baseline')
+    parser.add_argument('--time_tolerance', type=float, default=DEFAULT_TIME_TOLERANCE, help='Wall time ratio allowed against the baseline')
+    opt = parser.parse_args()
+
+    options = dict(tile_size=opt.tile_size, workers=opt.workers, backend=opt.backend)
+    results = {}
+    for name, points, passes, workload in BENCHMARK_CASES:
+        if opt.cases and name not in opt.cases:
+            continue
+        if opt.max_points and points > opt.max_points:
+            continue
+        case = run_case(name, points, passes, workload, opt.width, opt.deep_depth, opt.shallow_depth, opt.repeat, options)
+        results[name] = case
+        print(f"{name:<20} points={case['points']:<8} runs={case['runs']:<6} wall={case['wall_time']:.3f}s")
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'shapely': shapely.__version__,
+            'machine': platform.machine(),
+        },
+        'options': dict(options, width=opt.width, deep_depth=opt.deep_depth, shallow_depth=opt.shallow_depth, repeat=opt.repeat),
+        'cases': results,
+    }
+    with open(opt.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if opt.baseline:
+        with open(opt.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['cases']
+        problems = compare_results(results, baseline, opt.area_tolerance, opt.time_tolerance)
+        for problem in problems:
+            print(f'REGRESSION {problem}')
+        if problems:
+            sys.exit(1)
+        print(f'No regressions against {opt.baseline}')
@@ -1,191 +1,575 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import math
-import pyproj
+import logging
+import collections
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import shapely
 import coor_utils
-from shapely.geometry import Polygon, Point, LineString, LinearRing
-from shapely.ops import unary_union
+import field_utils
+import track_io
+import segment_utils
+import union_engine
+import raster_area
+import live_area
+import decimate_utils
+import area_stats
+import window_area
+import fleet_area
+from shapely.geometry import Polygon, LinearRing
 
+# 作业档位编号, 对应耕深阈值 (浅耕阈值, 深耕阈值)
+SHALLOW_BAND = segment_utils.SHALLOW_BAND
+DEEP_BAND = segment_utils.DEEP_BAND
 
-def track_area(track_data, field_data, width, deep_depth, shallow_depth):
+logger = logging.getLogger(__name__)
+
+# 投影后的轨迹和地块
+PreparedTrack = collections.namedtuple('PreparedTrack', [
+    'track_points_utm',   # 全部轨迹点投影坐标
+    'filter_index',       # 地块范围内轨迹点在全部轨迹点中的索引
+    'filter_points_utm',  # 地块范围内轨迹点投影坐标
+    'filter_depths',      # 地块范围内轨迹点耕深
+    'filter_speeds',      # 地块范围内轨迹点速度, 轨迹数据没有速度字段时为 None
+    'field_poly',         # 投影坐标系下的地块多边形
+    'utm_proj',           # 投影坐标系编号
+])
+
+# track_area 计算过程中得到的几何对象, 用于绘图和导出, 均在投影坐标系下
+CoverageGeometry = collections.namedtuple('CoverageGeometry', [
+    'utm_proj',           # 投影坐标系编号
+    'field_poly',         # 地块多边形
+    'filter_points_utm',  # 地块范围内轨迹点投影坐标数组
+    'runs',               # 作业段数组, 每行为 (档位, 起始索引, 结束索引)
+    'run_polygons',       # 各作业段多边形列表, 与 runs 顺序一致; 栅格计算时为 None
+    'activity_polygon',   # 农机运动覆盖多边形, 没有轨迹点或栅格计算时为 None
+    'band_unions',        # 档位到该档位覆盖多边形的字典; 栅格计算时为 None
+    'union_polygon',      # 总作业覆盖多边形; 栅格计算时为 None
+    'raster',             # 栅格计算时的 raster_area.RasterCoverage, 矢量计算时为 None
+])
+
+
+def prepare_track(track_data, field_data, stats=area_stats.NULL_STATS, utm_proj=None):
     """
-    根据农机终端轨迹计算农机作业面积
+    筛选地块范围内轨迹点, 并将轨迹和地块一次性转换到投影坐标系
+
+    :param track_data: 农机轨迹数据, 轨迹文件路径(JSON 或二进制)、轨迹记录字典列表或 track_io.load_track 读取的字段数组
+    :param field_data: 地块边界数据
+    :param stats: area_stats.AreaStats 分步骤统计, 默认不统计
+    :param utm_proj: 投影坐标系编号, 为 None 时按轨迹经度中位数判断
+    :return: PreparedTrack 投影后的轨迹和地块
+    """
+    # 获取轨迹坐标和耕深, 兼容轨迹文件路径、记录字典列表和按字段存储的数组
+    with stats.stage('load') as counters:
+        track_data = track_io.open_track(track_data)
+        track_columns = track_io.track_columns(track_data, ('lng', 'lat', 'deep'))
+        lons_raw = np.asarray(track_columns['lng'], dtype=np.float64)
+        lats_raw = np.asarray(track_columns['lat'], dtype=np.float64)
+        depths_raw = track_columns['deep']
+        counters['output_points'] = len(lons_raw)
+
+    with stats.stage('filter', input_points=len(lons_raw)) as counters:
+        # 创建地块多边形对象(支持 ESRI 多环 rings)
+        field_polygon = field_utils.field_geometry(field_data)
+
+        # 批量判断轨迹点是否在地块范围内, 得到后续各步骤复用的布尔掩膜
+        filter_mask = field_utils.points_in_field(lons_raw, lats_raw, field_polygon)
+        filter_index = np.flatnonzero(filter_mask)
+        # 地块范围内轨迹点的耕深
+        filter_depths = depths_raw[filter_index]
+        # 地块范围内轨迹点的速度, 用于抽稀时识别停车点
+        filter_speeds = None
+        if track_io.has_column(track_data, 'veo'):
+            filter_speeds = track_io.track_columns(track_data, ('veo',))['veo'][filter_index]
+        counters['output_points'] = len(filter_index)
+
+    with stats.stage('projection', input_points=len(lons_raw)) as counters:
+        # 坐标系转换，由地理坐标系转换为投影坐标系
+        if utm_proj is None:
+            # 判断轨迹坐标中位数所处 UTM 投影带
+            mid_lon = coor_utils.get_median(lons_raw)
+            utm_proj = coor_utils.check_utm(mid_lon)
+
+        # 获取转换器(按投影带缓存)，从 WGS84 坐标系转换到 UTM 坐标系
+        transformer = coor_utils.get_transformer(utm_proj)
+
+        # 一次性将全部轨迹点转换为 UTM 坐标系下的坐标，后续各步骤均按索引取用
+        track_x, track_y = transformer.transform(lons_raw, lats_raw)
+        track_points_utm = np.column_stack((track_x, track_y))
+        # 地块范围内轨迹点的 UTM 坐标
+        filter_points_utm = track_points_utm[filter_index]
+
+        # 将地块多边形转换为 UTM 坐标系下的多边形
+        field_poly = coor_utils.project_geometry(field_polygon, transformer)
+        counters['output_points'] = len(track_points_utm)
+
+    return PreparedTrack(track_points_utm, filter_index, filter_points_utm, filter_depths, filter_speeds, field_poly,
+                         utm_proj)
+
+
+def track_bands(filter_depths, deep_depth, shallow_depth, band_thresholds=None):
+    """
+    按耕深阈值表划分轨迹点作业档位
+
+    :param filter_depths: 地块范围内轨迹点的耕深
+    :param deep_depth: 农具深耕阈值
+    :param shallow_depth: 农具浅耕阈值
+    :param band_thresholds: 递增的耕深阈值表, 如 (浅耕阈值, 中耕阈值, 深耕阈值), 给定时忽略深耕、浅耕阈值;
+                            为 None 时为 (浅耕阈值, 深耕阈值)
+    :return: 作业档位数组, 0 为未作业, 默认阈值表时 1 为浅耕, 2 为深耕
+    """
+    thresholds = segment_utils.band_thresholds(deep_depth, shallow_depth, band_thresholds)
+    return segment_utils.depth_bands(filter_depths, thresholds)
+
+
+def track_runs(filter_depths, deep_depth, shallow_depth, band_thresholds=None):
+    """
+    按耕深阈值表切分作业段
+
+    :param filter_depths: 地块范围内轨迹点的耕深
+    :param deep_depth: 农具深耕阈值
+    :param shallow_depth: 农具浅耕阈值
+    :param band_thresholds: 递增的耕深阈值表, 为 None 时为 (浅耕阈值, 深耕阈值)
+    :return: 作业段数组, 每行为 (档位, 起始索引, 结束索引)
+    """
+    return segment_utils.segment_runs(track_bands(filter_depths, deep_depth, shallow_depth, band_thresholds))
+
+
+def decimate_prepared(prepared, width, deep_depth, shallow_depth, max_area_error, band_thresholds=None):
+    """
+    缓冲前按允许的最大面积相对误差抽稀地块范围内轨迹, 作业档位边界点保持不变
+
+    :param prepared: PreparedTrack 投影后的轨迹和地块
+    :param width: 农具作业幅宽
+    :param deep_depth: 农具深耕阈值
+    :param shallow_depth: 农具浅耕阈值
+    :param max_area_error: 允许的最大面积相对误差, 如 0.001
+    :param band_thresholds: 递增的耕深阈值表, 为 None 时为 (浅耕阈值, 深耕阈值)
+    :return: (抽稀后的 PreparedTrack, decimate_utils.DecimationStats 抽稀统计结果)
+    """
+    filter_bands = track_bands(prepared.filter_depths, deep_depth, shallow_depth, band_thresholds)
+    keep, stats = decimate_utils.decimate_track(prepared.filter_points_utm, filter_bands, width / 2.0, max_area_error,
+                                                prepared.filter_speeds)
+    filter_speeds = prepared.filter_speeds[keep] if prepared.filter_speeds is not None else None
+    prepared = prepared._replace(filter_index=prepared.filter_index[keep],
+                                 filter_points_utm=prepared.filter_points_utm[keep],
+                                 filter_depths=prepared.filter_depths[keep], filter_speeds=filter_speeds)
+    return prepared, stats
+
+
+def raster_coverage(track_data, field_data, width, deep_depth, shallow_depth, cell_size=raster_area.DEFAULT_CELL_SIZE,
+                    band_thresholds=None):
+    """
+    以栅格方式计算作业覆盖次数栅格及各面积, 结果包含相对矢量精确结果的误差上界
 
     :param track_data: 农机轨迹数据
     :param field_data: 地块边界数据
     :param width: 农具作业幅宽
     :param deep_depth: 农具深耕阈值
     :param shallow_depth: 农具浅耕阈值
-    :return: 轨迹总体长度, 地块面积, 轨迹覆盖面积, 深耕作业面积, 浅耕作业面积, 总作业面积(不包括重复作业), 重复作业面积
+    :param cell_size: 栅格边长(米)
+    :param band_thresholds: 递增的耕深阈值表, 为 None 时为 (浅耕阈值, 深耕阈值); 栅格按深耕(最高一档)和浅耕(其余档位)统计
+    :return: raster_area.RasterCoverage 栅格覆盖计算结果, 面积单位为平方米
+    """
+    prepared = prepare_track(track_data, field_data)
+    bands = segment_utils.table_bands(segment_utils.band_thresholds(deep_depth, shallow_depth, band_thresholds))
+    runs = track_runs(prepared.filter_depths, deep_depth, shallow_depth, band_thresholds)
+    return raster_area.track_coverage(prepared.filter_points_utm, segment_utils.report_runs(runs, bands), width / 2.0,
+                                      prepared.field_poly.bounds, (SHALLOW_BAND, DEEP_BAND), cell_size)
+
+
+def work_areas(filter_points_utm, filter_depths, field_bounds, width, deep_depth, shallow_depth, tile_size=None, workers=1,
+               backend='vector', cell_size=raster_area.DEFAULT_CELL_SIZE, stats=area_stats.NULL_STATS, geometries=None,
+               band_thresholds=None):
+    """
+    根据地块范围内的投影轨迹计算农机运动面积和各作业面积
+
+    :param filter_points_utm: 地块范围内轨迹点投影坐标数组
+    :param filter_depths: 地块范围内轨迹点耕深数组
+    :param field_bounds: 投影坐标系下的地块范围 (min_x, min_y, max_x, max_y)
+    :param width: 农具作业幅宽
+    :param deep_depth: 农具深耕阈值
+    :param shallow_depth: 农具浅耕阈值
+    :param tile_size: 分瓦片计算并集面积时的瓦片边长(米), 为 None 时整体计算
+    :param workers: 分瓦片计算时的并行进程数
+    :param backend: 计算方式, 'vector' 为矢量精确计算, 'raster' 为栅格快速计算
+    :param cell_size: 栅格计算时的栅格边长(米)
+    :param stats: area_stats.AreaStats 分步骤统计, 默认不统计
+    :param geometries: 字典, 给定时写入计算得到的作业段、覆盖多边形(或栅格覆盖结果), 键与 CoverageGeometry 字段一致;
+                       分瓦片计算时不支持
+    :param band_thresholds: 递增的耕深阈值表, 为 None 时为 (浅耕阈值, 深耕阈值); 作业段按各档位切分,
+                            深耕作业面积为最高一档, 浅耕作业面积为其余作业档位
+    :return: 轨迹覆盖面积, 深耕作业面积, 浅耕作业面积, 总作业面积(不包括重复作业), 重复作业面积
     """
+    if geometries is not None and backend != 'raster' and tile_size is not None:
+        raise ValueError("ERROR!!! Coverage geometries are not available from the tiled union engine")
     # 农具作业幅宽的一半长度
     half_width = width / 2.0
 
     # ---------------------------------------------------#
-    #   1. 只保留地块范围内轨迹
+    #   5. 计算农机运动总面积(包含深耕、浅耕和无动作面积)
     # ---------------------------------------------------#
-    # 遍历轨迹并获取坐标
-    track_points_raw_list = []
-    lons_raw_list = []
-    for point in track_data:
-        lon = point['lng']
-        lat = point['lat']
-        depth = point['deep']
-        track_points_raw_list.append(tuple((lon, lat, depth)))
-        lons_raw_list.append(lon)
-
-    # 遍历地块所有要素并获取坐标
-    field_points = []
-    for feature in field_data['features']:
-        geom = feature['geometry']
-        for point in geom['rings'][0]:
-            field_points.append(tuple(point))
-    # 创建地块多边形对象
-    field_polygon = Polygon(field_points)
-
-    track_points_filter_list = []
-    for poi in track_points_raw_list:
-        track_poi = Point(poi[0], poi[1])
-        # 判断点是否在GeoJSON矢量范围内
-        if field_polygon.contains(track_poi):
-            track_points_filter_list.append(poi)
+    # 一次遍历切分全部作业段, 作业段为投影坐标数组上的索引区间
+    bands = segment_utils.table_bands(segment_utils.band_thresholds(deep_depth, shallow_depth, band_thresholds))
+    with stats.stage('runs', input_points=len(filter_points_utm)) as counters:
+        table_runs = track_runs(filter_depths, deep_depth, shallow_depth, band_thresholds)
+        # 深耕为最高一档, 浅耕为其余作业档位, 默认阈值表时与 table_runs 相同
+        runs = segment_utils.report_runs(table_runs, bands)
+        counters['runs'] = len(runs)
+        counters['deep_runs'] = int(np.count_nonzero(runs[:, 0] == DEEP_BAND))
+        counters['shallow_runs'] = int(np.count_nonzero(runs[:, 0] == SHALLOW_BAND))
+
+    if backend == 'raster':
+        # 栅格方式计算运动面积和各作业面积
+        with stats.stage('raster', input_points=len(filter_points_utm), runs=len(runs)) as counters:
+            coverage = raster_area.track_coverage(filter_points_utm, runs, half_width, field_bounds,
+                                                  (SHALLOW_BAND, DEEP_BAND), cell_size)
+            counters['cells'] = coverage.pass_count.size
+            # 各面积相对矢量精确结果的误差上界(亩)
+            error_bounds = coverage.error_bounds
+            counters['activity_error'] = error_bounds['activity_area'] / 2000 * 3
+            counters['deep_error'] = error_bounds['band_areas'][DEEP_BAND] / 2000 * 3
+            counters['shallow_error'] = error_bounds['band_areas'][SHALLOW_BAND] / 2000 * 3
+            counters['union_error'] = error_bounds['union_area'] / 2000 * 3
+            counters['overlap_error'] = error_bounds['overlap_area'] / 2000 * 3
+        if geometries is not None:
+            geometries.update(runs=runs, raster=coverage)
+        total_area = coverage.activity_area / 2000 * 3
+        cultivation_deep_area = coverage.band_areas[DEEP_BAND] / 2000 * 3
+        cultivation_shallow_area = coverage.band_areas[SHALLOW_BAND] / 2000 * 3
+        cultivation_total_area = coverage.union_area / 2000 * 3
+        overlap_total_area = coverage.overlap_area / 2000 * 3
+        return total_area, cultivation_deep_area, cultivation_shallow_area, cultivation_total_area, overlap_total_area
+
+    with stats.stage('activity', input_points=len(filter_points_utm)) as counters:
+        if len(filter_points_utm) == 0:
+            total_area = 0.0
+        else:
+            # 点连接成线并创建线的缓冲区
+            total_buffered = segment_utils.run_buffer(filter_points_utm, half_width)
+            # 计算点集合围成的多边形的面积
+            total_poly = Polygon(total_buffered)
+            total_area = (total_poly.area - (math.pi * half_width ** 2)) / 2000 * 3
+            if stats.enabled:
+                counters['vertices'] = int(shapely.get_num_coordinates(total_poly))
+            if geometries is not None:
+                geometries['activity_polygon'] = total_poly
 
     # ---------------------------------------------------#
-    #   2. 坐标系转换，由地理坐标系转换为投影坐标系
+    #   6. 计算农机深耕、浅耕、耕作总（除去重叠面积）面积
+    # ---------------------------------------------------#
+    # 定义各档位作业段面积之和(包括重复作业), 无自重叠的作业段使用解析公式, 不构建多边形
+    with stats.stage('gross', runs=len(runs)):
+        band_total_areas = dict.fromkeys(bands, 0.0)
+        for band, start, stop in table_runs:
+            band_total_areas[band] += segment_utils.run_gross_area(filter_points_utm[start:stop], half_width)
+
     # ---------------------------------------------------#
-    # 判断轨迹坐标中位数所处 UTM 投影带
-    mid_lon = coor_utils.get_median(lons_raw_list)
-    utm_proj = coor_utils.check_utm(mid_lon)
+    with stats.stage('union', runs=len(runs)) as counters:
+        if geometries is not None:
+            # 需要返回几何对象时保留各作业段多边形, 并集由作业段多边形合并得到, 不再重复缓冲
+            run_polygons = [segment_utils.run_buffer(filter_points_utm[start:stop], half_width) for _, start, stop in runs]
+            union_deep_polygon = shapely.union_all([poly for poly, band in zip(run_polygons, runs[:, 0]) if band == DEEP_BAND])
+            union_shallow_polygon = shapely.union_all(
+                [poly for poly, band in zip(run_polygons, runs[:, 0]) if band == SHALLOW_BAND])
+            union_total_polygon = shapely.union_all([union_deep_polygon, union_shallow_polygon])
+            union_deep_area = union_deep_polygon.area
+            union_shallow_area = union_shallow_polygon.area
+            union_total_area = union_total_polygon.area
+            if stats.enabled:
+                counters['deep_vertices'] = int(shapely.get_num_coordinates(union_deep_polygon))
+                counters['shallow_vertices'] = int(shapely.get_num_coordinates(union_shallow_polygon))
+                counters['total_vertices'] = int(shapely.get_num_coordinates(union_total_polygon))
+            geometries.update(runs=runs, run_polygons=run_polygons, union_polygon=union_total_polygon,
+                              band_unions={SHALLOW_BAND: union_shallow_polygon, DEEP_BAND: union_deep_polygon})
+        elif tile_size is None:
+            # 计算深耕多边形的并集面积
+            union_deep_polygon = segment_utils.runs_buffer(filter_points_utm, runs[runs[:, 0] == DEEP_BAND], half_width)
+            union_deep_area = union_deep_polygon.area
+
+            # 计算浅耕多边形的并集面积
+            union_shallow_polygon = segment_utils.runs_buffer(filter_points_utm, runs[runs[:, 0] == SHALLOW_BAND],
+                                                              half_width)
+            union_shallow_area = union_shallow_polygon.area
+
+            # 计算总作业多边形的并集面积
+            union_total_polygon = segment_utils.runs_buffer(filter_points_utm, runs, half_width)
+            union_total_area = union_total_polygon.area
+            if stats.enabled:
+                counters['deep_vertices'] = int(shapely.get_num_coordinates(union_deep_polygon))
+                counters['shallow_vertices'] = int(shapely.get_num_coordinates(union_shallow_polygon))
+                counters['total_vertices'] = int(shapely.get_num_coordinates(union_total_polygon))
+        else:
+            # 分瓦片并行计算各档位及总作业多边形的并集面积
+            band_union_areas, union_total_area, band_union_vertices, union_total_vertices = union_engine.union_areas(
+                filter_points_utm, runs, half_width, (SHALLOW_BAND, DEEP_BAND), tile_size, workers)
+            union_deep_area = band_union_areas[DEEP_BAND]
+            union_shallow_area = band_union_areas[SHALLOW_BAND]
+            # 各瓦片裁剪后并集的顶点数之和, 包括瓦片边界处新增的顶点
+            counters['deep_vertices'] = band_union_vertices[DEEP_BAND]
+            counters['shallow_vertices'] = band_union_vertices[SHALLOW_BAND]
+            counters['total_vertices'] = union_total_vertices
+
+    cultivation_deep_area = union_deep_area / 2000 * 3
+    cultivation_shallow_area = union_shallow_area / 2000 * 3
+    cultivation_total_area = union_total_area / 2000 * 3
+
+    # 计算重复作业面积
+    deep_shallow_total_area = sum(band_total_areas.values())
+    overlap_total_area = (deep_shallow_total_area - union_total_area) / 2000 * 3
+
+    return total_area, cultivation_deep_area, cultivation_shallow_area, cultivation_total_area, overlap_total_area
+
+
+def track_area(track_data, field_data, width, deep_depth, shallow_depth, tile_size=None, workers=1, backend='vector',
+               cell_size=raster_area.DEFAULT_CELL_SIZE, chunk_size=None, max_area_error=None, stats=None,
+               return_geometry=False, band_thresholds=None):
+    """
+    根据农机终端轨迹计算农机作业面积
+
+    :param track_data: 农机轨迹数据, 轨迹文件路径(JSON 或二进制)、轨迹记录字典列表或 track_io.load_track 读取的字段数组
+    :param field_data: 地块边界数据
+    :param width: 农具作业幅宽
+    :param deep_depth: 农具深耕阈值
+    :param shallow_depth: 农具浅耕阈值
+    :param tile_size: 分瓦片计算并集面积时的瓦片边长(米), 为 None 时整体计算
+    :param workers: 分瓦片计算时的并行进程数
+    :param backend: 计算方式, 'vector' 为矢量精确计算, 'raster' 为栅格快速计算
+    :param cell_size: 栅格计算时的栅格边长(米)
+    :param chunk_size: 分块计算时每个窗口的轨迹点数, 为 None 时整体计算; 分块计算时轨迹文件按窗口流式读取,
+                       投影带按地块中心经度判断; 分块计算只支持矢量方式, 不支持分瓦片并行计算
+    :param max_area_error: 缓冲前抽稀轨迹时允许的最大面积相对误差, 为 None 时不抽稀; 分块计算不支持抽稀
+    :param stats: area_stats.AreaStats 分步骤统计, 为 None 时不统计; 分块计算不支持
+    :param return_geometry: 是否同时返回计算得到的几何对象; 分块计算和分瓦片计算不支持
+    :param band_thresholds: 递增的耕深阈值表, 如 (浅耕阈值, 中耕阈值, 深耕阈值), 给定时忽略深耕、浅耕阈值;
+                            深耕作业面积为最高一档, 浅耕作业面积为其余作业档位
+    :return: 轨迹总体长度, 地块面积, 轨迹覆盖面积, 深耕作业面积, 浅耕作业面积, 总作业面积(不包括重复作业), 重复作业面积;
+             return_geometry 为 True 时返回 (上述七项结果, CoverageGeometry 几何对象)
+    """
+    if chunk_size is not None:
+        if return_geometry:
+            raise ValueError("ERROR!!! Chunked processing does not return coverage geometries")
+        if backend != 'vector':
+            raise ValueError("ERROR!!! Chunked processing only supports the vector backend")
+        if max_area_error is not None:
+            raise ValueError("ERROR!!! Chunked processing does not support track decimation")
+        if stats is not None:
+            raise ValueError("ERROR!!! Chunked processing does not record stage stats")
+        if tile_size is not None or (workers is not None and workers > 1):
+            raise ValueError("ERROR!!! Chunked processing merges coverage in its own tiles and does not use the tiled "
+                             "union engine")
+        # 超长轨迹按窗口分块计算, 内存占用受窗口大小限制
+        return live_area.chunked_track_area(track_data, field_data, width, deep_depth, shallow_depth, chunk_size,
+                                            band_thresholds=band_thresholds)
+    if stats is None:
+        stats = area_stats.NULL_STATS
 
-    # 定义转换器，从 WGS84 坐标系转换到 UTM 坐标系
-    wgs84 = pyproj.CRS('EPSG:4326')
-    utm = pyproj.CRS(utm_proj)
-    transformer = pyproj.Transformer.from_crs(wgs84, utm, always_xy=True)
+    # ---------------------------------------------------#
+    #   1. 只保留地块范围内轨迹
+    #   2. 坐标系转换，由地理坐标系转换为投影坐标系
+    # ---------------------------------------------------#
+    prepared = prepare_track(track_data, field_data, stats)
+    if max_area_error is not None:
+        # 缓冲前抽稀地块范围内轨迹, 轨迹总体长度仍按全部轨迹点计算
+        with stats.stage('decimate', input_points=len(prepared.filter_points_utm)) as counters:
+            prepared, decimation = decimate_prepared(prepared, width, deep_depth, shallow_depth, max_area_error,
+                                                     band_thresholds)
+            counters.update(decimation._asdict())
+        if stats is area_stats.NULL_STATS:
+            # 未开启阶段统计时仍输出抽稀结果, 便于核对去除点数和最大偏差
+            logger.info('Decimated track points: %d -> %d (stationary %d, simplified %d), max deviation %.4f m, '
+                        'area error bound %.4f m2', decimation.input_points, decimation.output_points,
+                        decimation.stationary_points, decimation.simplified_points, decimation.max_deviation,
+                        decimation.area_error)
 
     # ---------------------------------------------------#
     #   3. 计算总体轨迹长度(km)
     # ---------------------------------------------------#
-    # 将经纬度坐标转换为 UTM 坐标系下的坐标
-    track_points_utm = [transformer.transform(poi[0], poi[1]) for poi in track_points_raw_list]
-    # 点连接成线
-    track_line = LinearRing(track_points_utm)
-    # 点连接成线
-    track_length = track_line.length / 1000
+    with stats.stage('track_length', input_points=len(prepared.track_points_utm)):
+        # 点连接成线
+        track_line = LinearRing(prepared.track_points_utm)
+        # 点连接成线
+        track_length = track_line.length / 1000
 
     # ---------------------------------------------------#
     #   4. 计算地块总面积
     # ---------------------------------------------------#
-    # 将经纬度坐标转换为 UTM 坐标系下的坐标
-    field_points_utm = [transformer.transform(poi[0], poi[1]) for poi in field_points]
-    # 点连接成线
-    field_line = LinearRing(field_points_utm)
-
-    # 计算点集合围成的多边形的面积
-    field_poly = Polygon(field_line)
-    field_area = field_poly.area / 2000 * 3
+    # 计算 UTM 坐标系下地块多边形的面积
+    field_area = prepared.field_poly.area / 2000 * 3
 
     # ---------------------------------------------------#
-    #   5. 计算农机运动总面积(包含深耕、浅耕和无动作面积)
+    #   5-6. 计算农机运动总面积和深耕、浅耕、耕作总面积
     # ---------------------------------------------------#
-    # 将经纬度坐标转换为 UTM 坐标系下的坐标
-    total_points_utm = [transformer.transform(poi[0], poi[1]) for poi in track_points_filter_list]
-    # 点连接成线
-    total_line = LineString(total_points_utm)
+    geometries = dict.fromkeys(CoverageGeometry._fields) if return_geometry else None
+    total_area, cultivation_deep_area, cultivation_shallow_area, cultivation_total_area, overlap_total_area = work_areas(
+        prepared.filter_points_utm, prepared.filter_depths, prepared.field_poly.bounds, width, deep_depth, shallow_depth,
+        tile_size, workers, backend, cell_size, stats, geometries, band_thresholds)
 
-    # 创建线的缓冲区
-    total_buffered = total_line.buffer(half_width)
-    # 计算点集合围成的多边形的面积
-    total_poly = Polygon(total_buffered)
-    total_area = (total_poly.area - (math.pi * half_width ** 2)) / 2000 * 3
+    result = (track_length, field_area, total_area, cultivation_deep_area, cultivation_shallow_area, cultivation_total_area,
+              overlap_total_area)
+    if return_geometry:
+        geometries.update(utm_proj=prepared.utm_proj, field_poly=prepared.field_poly,
+                          filter_points_utm=prepared.filter_points_utm)
+        return result, CoverageGeometry(**geometries)
+    return result
 
-    # ---------------------------------------------------#
-    #   6. 计算农机深耕、浅耕、耕作总（除去重叠面积）面积
-    # ---------------------------------------------------#
-    # 定义耕作总面积
-    total_poly_list = []
-    # 定义深耕总面积
-    deep_poly_list = []
-    # 定义浅耕总面积
-    shallow_poly_list = []
 
-    # ---------------------------------------------------#
-    # 定义一个存储做深耕活动线段点的数组
-    deep_lines_poi = []
-    # 定义一个存储单条深耕活动线段点的数组
-    deep_temp_poi = []
-    for i in range(len(track_points_filter_list)):
-        # 将经纬度坐标转换为 UTM 坐标系下的坐标
-        lon_utm, lat_utm = transformer.transform(track_points_filter_list[i][0], track_points_filter_list[i][1])
-        # 判断deep大于deep_depth，认为是做深耕活动
-        if track_points_filter_list[i][2] >= deep_depth:
-            deep_temp_poi.append(tuple((lon_utm, lat_utm)))
-            if track_points_filter_list[i + 1][2] < deep_depth:
-                deep_lines_poi.append(deep_temp_poi)
-                deep_temp_poi = []
-                continue
-
-    # 定义深耕总面积
-    deep_total_area = 0
-    for dl in deep_lines_poi:
-        if len(dl) == 1:
-            deep_point = Point(dl)
-            deep_buffered = deep_point.buffer(half_width)
-        if len(dl) > 1:
-            deep_line = LineString(dl)
-            deep_buffered = deep_line.buffer(half_width)
-        deep_poly = Polygon(deep_buffered)
-        deep_poly_list.append(deep_poly)
-        total_poly_list.append(deep_poly)
-        deep_area = deep_poly.area
-        deep_total_area = deep_total_area + deep_area
+def window_areas(track_data, field_data, width, deep_depth, shallow_depth, interval=None, boundaries=None):
+    """
+    按时间窗口(如每小时、每班次)统计农机作业面积, 轨迹只投影和切分一次, 跨窗口的作业段在窗口边界处切分
 
-    # ---------------------------------------------------#
-    # 定义一个存储做浅耕活动线段点的数组
-    shallow_lines_poi = []
-    # 定义一个存储单条浅耕活动线段点的数组
-    shallow_temp_poi = []
-    for i in range(len(track_points_filter_list)):
-        # 将经纬度坐标转换为 UTM 坐标系下的坐标
-        lon_utm, lat_utm = transformer.transform(track_points_filter_list[i][0], track_points_filter_list[i][1])
-        # 判断shallow_depth<=deep<deep_depth，认为是做浅耕活动
-        if shallow_depth <= track_points_filter_list[i][2] < deep_depth:
-            shallow_temp_poi.append(tuple((lon_utm, lat_utm)))
-            if track_points_filter_list[i + 1][2] < shallow_depth or track_points_filter_list[i + 1][2] >= deep_depth:
-                shallow_lines_poi.append(shallow_temp_poi)
-                shallow_temp_poi = []
-                continue
-
-    # 定义浅耕总面积
-    shallow_total_area = 0
-    for sl in shallow_lines_poi:
-        if len(sl) == 1:
-            shallow_point = Point(sl)
-            shallow_buffered = shallow_point.buffer(half_width)
-        if len(sl) > 1:
-            shallow_line = LineString(sl)
-            shallow_buffered = shallow_line.buffer(half_width)
-        shallow_poly = Polygon(shallow_buffered)
-        shallow_poly_list.append(shallow_poly)
-        total_poly_list.append(shallow_poly)
-        shallow_area = shallow_poly.area
-        shallow_total_area = shallow_total_area + shallow_area
+    :param track_data: 农机轨迹数据, 轨迹文件路径(JSON 或二进制)、轨迹记录字典列表或 track_io.load_track 读取的字段数组, 需包含 gps_time,
+                       轨迹点可不按 gps_time 排序
+    :param field_data: 地块边界数据
+    :param width: 农具作业幅宽
+    :param deep_depth: 农具深耕阈值
+    :param shallow_depth: 农具浅耕阈值
+    :param interval: 窗口间隔(秒), 如 3600 为按小时
+    :param boundaries: 班次分界时间列表(时间戳或时间字符串), 给定时忽略 interval
+    :return: 各窗口结果字典列表, 包括起止时间、轨迹点数、深耕作业面积、浅耕作业面积、总作业面积(不包括重复作业)、
+             重复作业面积及其中的窗口内重复和跨窗口重复作业面积
+    """
+    track_data = track_io.open_track(track_data)
+    prepared = prepare_track(track_data, field_data)
+    filter_times = track_io.track_columns(track_data, ('gps_time',))['gps_time'][prepared.filter_index]
+    # 轨迹点上报顺序可能与 gps_time 不一致, 先按时间稳定排序再切分作业段
+    order = np.argsort(filter_times, kind='stable')
+    filter_times = np.asarray(filter_times, dtype=np.float64)[order]
+    filter_points_utm = prepared.filter_points_utm[order]
+    runs = track_runs(prepared.filter_depths[order], deep_depth, shallow_depth)
+    edges = window_area.window_edges(filter_times, interval, boundaries)
+    windows = window_area.window_breakdown(filter_points_utm, filter_times, runs, width / 2.0, edges,
+                                           (SHALLOW_BAND, DEEP_BAND))
 
-    # ---------------------------------------------------#
-    # 计算深耕多边形的并集面积
-    union_deep_polygon = unary_union(deep_poly_list)
-    cultivation_deep_area = union_deep_polygon.area / 2000 * 3
+    results = []
+    for window in windows:
+        results.append({
+            'start': window.start,
+            'end': window.end,
+            'points': window.points,
+            'cultivation_deep_area': window.band_areas[DEEP_BAND] / 2000 * 3,
+            'cultivation_shallow_area': window.band_areas[SHALLOW_BAND] / 2000 * 3,
+            'cultivation_total_area': window.union_area / 2000 * 3,
+            'overlap_total_area': (window.within_overlap_area + window.cross_overlap_area) / 2000 * 3,
+            'overlap_within_area': window.within_overlap_area / 2000 * 3,
+            'overlap_cross_area': window.cross_overlap_area / 2000 * 3,
+        })
+    return results
 
-    # 计算浅耕多边形的并集面积
-    union_shallow_polygon = unary_union(shallow_poly_list)
-    cultivation_shallow_area = union_shallow_polygon.area / 2000 * 3
 
-    # 计算总作业多边形的并集面积
-    union_total_polygon = unary_union(total_poly_list)
-    cultivation_total_area = union_total_polygon.area / 2000 * 3
+def parcel_areas(filter_points_utm, filter_depths, field_poly, width, deep_depth, shallow_depth):
+    """
+    计算单个地块的地块面积和各作业面积
 
-    # 计算重复作业面积
-    deep_shallow_total_area = deep_total_area + shallow_total_area
-    overlap_total_area = (deep_shallow_total_area - union_total_polygon.area) / 2000 * 3
+    :param filter_points_utm: 地块范围内轨迹点投影坐标数组
+    :param filter_depths: 地块范围内轨迹点耕深数组
+    :param field_poly: 投影坐标系下的地块多边形
+    :param width: 农具作业幅宽
+    :param deep_depth: 农具深耕阈值
+    :param shallow_depth: 农具浅耕阈值
+    :return: 地块面积, 轨迹覆盖面积, 深耕作业面积, 浅耕作业面积, 总作业面积(不包括重复作业), 重复作业面积
+    """
+    field_area = field_poly.area / 2000 * 3
+    return (field_area,) + work_areas(filter_points_utm, filter_depths, field_poly.bounds, width, deep_depth, shallow_depth)
+
+
+def fields_area(track_data, field_collection, width, deep_depth, shallow_depth, workers=1):
+    """
+    根据农机终端轨迹一次性计算多个地块内的农机作业面积, 轨迹点经 STRtree 空间索引一次分配到各地块
+
+    :param track_data: 农机轨迹数据, 轨迹文件路径(JSON 或二进制)、轨迹记录字典列表或 track_io.load_track 读取的字段数组
+    :param field_collection: 地块要素集合(ESRI JSON 或 GeoJSON)
+    :param width: 农具作业幅宽
+    :param deep_depth: 农具深耕阈值
+    :param shallow_depth: 农具浅耕阈值
+    :param workers: 各地块并行计算的进程数, 小于等于 1 时在当前进程内计算
+    :return: 地块标识(OID/Name, 重复时见 field_utils.feature_keys)到 track_area 同样七项结果的字典, 只包含有轨迹点落入的地块
+    """
+    # 获取轨迹坐标和耕深
+    track_data = track_io.open_track(track_data)
+    track_columns = track_io.track_columns(track_data, ('lng', 'lat', 'deep'))
+    lons_raw = np.asarray(track_columns['lng'], dtype=np.float64)
+    lats_raw = np.asarray(track_columns['lat'], dtype=np.float64)
+    depths_raw = track_columns['deep']
+
+    # 全部轨迹点只转换一次
+    transformer = coor_utils.get_transformer(coor_utils.check_utm(coor_utils.get_median(lons_raw)))
+    track_x, track_y = transformer.transform(lons_raw, lats_raw)
+    track_points_utm = np.column_stack((track_x, track_y))
+    track_length = LinearRing(track_points_utm).length / 1000
+
+    # 一次性将轨迹点分配到各地块
+    features = field_collection['features']
+    feature_polygons = [field_utils.feature_geometry(feature) for feature in features]
+    parcel_index = field_utils.assign_points(lons_raw, lats_raw, feature_polygons)
+
+    # OID 重复时改用 Name, 仍然重复的地块以 (标识, 要素序号) 为标识
+    feature_keys = field_utils.feature_keys(features)
+    keys = []
+    tasks = []
+    for polygon_index, point_index in parcel_index.items():
+        keys.append(feature_keys[polygon_index])
+        field_poly = coor_utils.project_geometry(feature_polygons[polygon_index], transformer)
+        tasks.append((track_points_utm[point_index], depths_raw[point_index], field_poly))
+
+    if workers is not None and workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(parcel_areas, points, depths, field_poly, width, deep_depth, shallow_depth)
+                       for points, depths, field_poly in tasks]
+            results = [future.result() for future in futures]
+    else:
+        results = [parcel_areas(points, depths, field_poly, width, deep_depth, shallow_depth)
+                   for points, depths, field_poly in tasks]
+
+    return {key: (track_length,) + result for key, result in zip(keys, results)}
+
+
+def machine_coverage(track_data, field_data, width, deep_depth, shallow_depth, utm_proj):
+    """
+    计算单台农机在地块内的作业面积和各作业段多边形
+
+    :param track_data: 农机轨迹数据
+    :param field_data: 地块边界数据
+    :param width: 农具作业幅宽
+    :param deep_depth: 农具深耕阈值
+    :param shallow_depth: 农具浅耕阈值
+    :param utm_proj: 投影坐标系编号, 同一地块的全部农机使用同一投影带
+    :return: (track_area 同样七项结果, 作业段多边形列表, 覆盖范围多边形)
+    """
+    prepared = prepare_track(track_data, field_data, utm_proj=utm_proj)
+    track_length = LinearRing(prepared.track_points_utm).length / 1000 if len(prepared.track_points_utm) else 0.0
+    field_area = prepared.field_poly.area / 2000 * 3
+    # 作业段多边形和覆盖范围直接取自面积计算过程
+    geometries = {}
+    areas = work_areas(prepared.filter_points_utm, prepared.filter_depths, prepared.field_poly.bounds, width, deep_depth,
+                       shallow_depth, geometries=geometries)
+    return (track_length, field_area) + areas, geometries['run_polygons'], geometries['union_polygon']
+
+
+def fleet_track_area(machines, field_data, workers=1):
+    """
+    计算多台农机在同一地块内的作业面积, 合并得到去重后的总覆盖面积和农机两两之间的重叠面积
+
+    :param machines: 农机标识到农机数据的字典, 农机数据包含 track(农机轨迹数据)、width、deep_depth、shallow_depth
+    :param field_data: 地块边界数据
+    :param workers: 各农机并行计算的进程数, 小于等于 1 时在当前进程内计算
+    :return: fleet_area.FleetCoverage 多台农机作业覆盖结果
+    """
+    # 全部农机按地块中心经度使用同一投影带
+    field_polygon = field_utils.field_geometry(field_data)
+    utm_proj = coor_utils.check_utm(field_polygon.centroid.x)
+
+    machine_ids = list(machines)
+    tasks = [(machines[machine_id]['track'], field_data, float(machines[machine_id]['width']),
+              float(machines[machine_id]['deep_depth']), float(machines[machine_id]['shallow_depth']), utm_proj)
+             for machine_id in machine_ids]
+    if workers is not None and workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(machine_coverage, *task) for task in tasks]
+            results = [future.result() for future in futures]
+    else:
+        results = [machine_coverage(*task) for task in tasks]
 
-    return track_length, field_area, total_area, cultivation_deep_area, cultivation_shallow_area, cultivation_total_area, \
-        overlap_total_area
+    machine_areas, machine_swaths, machine_unions = zip(*results) if results else ((), (), ())
+    return fleet_area.fleet_coverage(machine_ids, list(machine_areas), list(machine_swaths), list(machine_unions))
@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+import pytest
+import synthetic_track
+
+# 示例地块
+FIELD_PATH = './chongming_field.json'
+
+
+@pytest.fixture(scope='session')
+def field_data():
+    with open(FIELD_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='session')
+def jittered_workload():
+    # 定位抖动、停车和频繁切换耕深的合成轨迹, 中心线在停车处大量自相交
+    return synthetic_track.generate_workload(10000, 10, 2.3, 15.0, 12.0, switch_rate=0.01, parks=2)
@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import argparse
+import track_io
+
+"""
+python convert_track.py --track_data ./xinxiang_chongming_track.json --output ./xinxiang_chongming_track.trk
+"""
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert vendor track json to the memory-mappable binary track format')
+    parser.add_argument('--track_data', required=True, help='Track json file of agricultural machinery')
+    parser.add_argument('--output', required=True, help='Binary track file to write')
+    parser.add_argument('--columns', nargs='*', default=track_io.BINARY_COLUMNS, help='Track fields to keep')
+    opt = parser.parse_args()
+
+    count = track_io.convert_track(opt.track_data, opt.output, tuple(opt.columns))
+    print(f'Converted track points: {count}')
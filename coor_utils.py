@@ -1,17 +1,34 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+import functools
+import numpy as np
+import pyproj
+import shapely
+
+
+# CGCS2000 3 度带投影坐标系适用的经度范围
+CGCS2000_MIN_LON = 73.50
+CGCS2000_MAX_LON = 134.77
+# CGCS2000 3 度带第 25 带(中央经线 75°E)对应的 EPSG 编号
+CGCS2000_FIRST_EPSG = 4513
+# CGCS2000 3 度带覆盖中国范围的投影带数(第 25 至 45 带)
+CGCS2000_ZONE_COUNT = 21
+# 全部 CGCS2000 3 度带投影坐标系编号, EPSG:4513 至 EPSG:4533
+CGCS2000_ZONES = tuple('EPSG:{}'.format(CGCS2000_FIRST_EPSG + i) for i in range(CGCS2000_ZONE_COUNT))
+
 
 # 计算中位数
 def get_median(data):
     """
-    计算数组内中位数
+    计算数组内中位数, 采用选择算法, 不修改输入数组
 
     :param data: 输入数组
     :return: 数组中位数
     """
-    data.sort()
-    half = len(data) // 2
-    return (data[half] + data[~half]) / 2
+    values = np.asarray(data, dtype=np.float64)
+    half = len(values) // 2
+    partitioned = np.partition(values, sorted({half, len(values) - 1 - half}))
+    return (partitioned[half] + partitioned[~half]) / 2
 
 
 def check_utm(lon):
@@ -21,49 +38,35 @@ def check_utm(lon):
     :param lon: 输入经度
     :return: CGCS2000 投影坐标系带编号
     """
-    if 73.62 <= lon < 76.50:
-        return 'EPSG:4513'
-    elif 73.50 <= lon < 79.50:
-        return 'EPSG:4514'
-    elif 79.50 <= lon < 82.50:
-        return 'EPSG:4515'
-    elif 82.50 <= lon < 85.50:
-        return 'EPSG:4516'
-    elif 82.50 <= lon < 85.50:
-        return 'EPSG:4516'
-    elif 85.50 <= lon < 88.50:
-        return 'EPSG:4517'
-    elif 88.50 <= lon < 91.50:
-        return 'EPSG:4518'
-    elif 91.50 <= lon < 94.50:
-        return 'EPSG:4519'
-    elif 94.50 <= lon < 97.50:
-        return 'EPSG:4520'
-    elif 97.50 <= lon < 100.50:
-        return 'EPSG:4521'
-    elif 100.50 <= lon < 103.50:
-        return 'EPSG:4522'
-    elif 103.50 <= lon < 106.50:
-        return 'EPSG:4523'
-    elif 106.50 <= lon < 109.50:
-        return 'EPSG:4524'
-    elif 109.50 <= lon < 112.50:
-        return 'EPSG:4525'
-    elif 112.50 <= lon < 115.50:
-        return 'EPSG:4526'
-    elif 115.50 <= lon < 118.50:
-        return 'EPSG:4527'
-    elif 118.50 <= lon < 121.50:
-        return 'EPSG:4528'
-    elif 121.50 <= lon < 124.50:
-        return 'EPSG:4529'
-    elif 124.50 <= lon < 127.50:
-        return 'EPSG:4530'
-    elif 127.50 <= lon < 130.50:
-        return 'EPSG:4531'
-    elif 130.50 <= lon < 133.50:
-        return 'EPSG:4532'
-    elif 130.50 <= lon <= 134.77:
-        return 'EPSG:4533'
-    else:
+    if not CGCS2000_MIN_LON <= lon <= CGCS2000_MAX_LON:
         raise ValueError("ERROR!!! Track data is beyond the boundary of China")
+    zone_index = min(int((lon - CGCS2000_MIN_LON) // 3), CGCS2000_ZONE_COUNT - 1)
+    return 'EPSG:{}'.format(CGCS2000_FIRST_EPSG + zone_index)
+
+
+@functools.lru_cache(maxsize=None)
+def get_transformer(utm_proj):
+    """
+    获取从 WGS84 坐标系转换到指定 CGCS2000 投影带的转换器, 按投影带缓存, 进程内只构建一次
+
+    :param utm_proj: CGCS2000 投影坐标系带编号
+    :return: pyproj 坐标转换器
+    """
+    wgs84 = pyproj.CRS('EPSG:4326')
+    utm = pyproj.CRS(utm_proj)
+    return pyproj.Transformer.from_crs(wgs84, utm, always_xy=True)
+
+
+def project_geometry(geometry, transformer):
+    """
+    将几何对象的全部坐标批量转换到投影坐标系
+
+    :param geometry: 地理坐标系下的几何对象
+    :param transformer: pyproj 坐标转换器
+    :return: 投影坐标系下的几何对象
+    """
+    def transform_coords(coords):
+        x, y = transformer.transform(coords[:, 0], coords[:, 1])
+        return np.column_stack((x, y))
+
+    return shapely.transform(geometry, transform_coords)
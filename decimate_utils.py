@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import collections
+import numpy as np
+
+# 轨迹抽稀统计结果
+DecimationStats = collections.namedtuple('DecimationStats', [
+    'input_points',       # 抽稀前轨迹点数
+    'output_points',      # 抽稀后轨迹点数
+    'stationary_points',  # 作为停车重复点去除的轨迹点数
+    'simplified_points',  # 经 Douglas-Peucker 化简(含共线点)去除的轨迹点数
+    'tolerance',          # 化简距离容差(米)
+    'max_deviation',      # 去除点到抽稀后轨迹的最大距离(米)
+    'area_error',         # 作业幅宽缓冲区面积的最大偏差(平方米)
+])
+
+# 速度不超过该值(km/h)的轨迹点视为停车
+STATIONARY_SPEED = 0.5
+
+
+def point_segment_distances(points, start, end):
+    """
+    计算多个点到线段的距离
+
+    :param points: 点坐标数组
+    :param start: 线段起点
+    :param end: 线段终点
+    :return: 距离数组
+    """
+    direction = end - start
+    length2 = float(np.dot(direction, direction))
+    offsets = points - start
+    if length2 > 0:
+        t = np.clip(offsets @ direction / length2, 0.0, 1.0)
+        offsets = offsets - t[:, np.newaxis] * direction
+    return np.hypot(offsets[:, 0], offsets[:, 1])
+
+
+def stationary_mask(points, speeds, tolerance):
+    """
+    标记停车期间的重复点: 速度接近 0(无速度时不判断速度)且距上一个保留点不超过容差
+
+    :param points: 投影坐标数组
+    :param speeds: 速度数组, 可为 None
+    :param tolerance: 距离容差(米)
+    :return: 停车重复点布尔掩膜
+    """
+    mask = np.zeros(len(points), dtype=bool)
+    if len(points) < 2:
+        return mask
+    steps = np.hypot(*np.diff(points, axis=0).T)
+    candidates = np.flatnonzero(steps <= tolerance) + 1
+    if speeds is not None:
+        candidates = candidates[np.asarray(speeds)[candidates] <= STATIONARY_SPEED]
+
+    # 只在候选点上逐点比较, 与上一个保留点比较避免漂移累积
+    anchor = -1
+    for i in candidates:
+        if anchor < 0 or not mask[i - 1]:
+            anchor = i - 1
+        if np.hypot(*(points[i] - points[anchor])) <= tolerance:
+            mask[i] = True
+    return mask
+
+
+def douglas_peucker(points, tolerance):
+    """
+    Douglas-Peucker 化简, 共线点偏差为 0 会被优先去除
+
+    :param points: 投影坐标数组
+    :param tolerance: 距离容差(米)
+    :return: 保留点布尔掩膜, 首末点总是保留
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = point_segment_distances(points[first + 1:last], points[first], points[last])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def max_deviation(points, keep):
+    """
+    计算去除点到抽稀后折线的最大距离
+
+    :param points: 抽稀前投影坐标数组
+    :param keep: 保留点布尔掩膜
+    :return: 最大距离(米)
+    """
+    kept = np.flatnonzero(keep)
+    worst = 0.0
+    for first, last in zip(kept[:-1], kept[1:]):
+        if last - first > 1:
+            distances = point_segment_distances(points[first + 1:last], points[first], points[last])
+            worst = max(worst, float(distances.max()))
+    return worst
+
+
+def decimate_track(points, bands, half_width, max_area_error, speeds=None):
+    """
+    缓冲前抽稀轨迹: 去除停车重复点, 再按作业档位分段进行 Douglas-Peucker 化简(共线点一并去除),
+    档位变化处的轨迹点总是保留. 化简容差由允许的最大面积相对误差得到: 容差 = 最大面积相对误差 × 半幅宽,
+    去除点到抽稀后轨迹的距离不超过容差, 缓冲区面积相对偏差不超过最大面积相对误差
+
+    :param points: 地块范围内轨迹点投影坐标数组
+    :param bands: 轨迹点作业档位数组
+    :param half_width: 农具作业幅宽的一半长度
+    :param max_area_error: 允许的最大面积相对误差, 如 0.001
+    :param speeds: 轨迹点速度数组(km/h), 可为 None
+    :return: (保留点布尔掩膜, DecimationStats 抽稀统计结果)
+    """
+    n = len(points)
+    tolerance = max_area_error * half_width
+    keep = np.ones(n, dtype=bool)
+    if n < 3:
+        return keep, DecimationStats(n, n, 0, 0, tolerance, 0.0, 0.0)
+    bands = np.asarray(bands)
+
+    # 档位变化处及首末点为必须保留的边界点
+    boundaries = np.zeros(n, dtype=bool)
+    boundaries[[0, -1]] = True
+    changes = np.flatnonzero(bands[1:] != bands[:-1])
+    boundaries[changes] = True
+    boundaries[changes + 1] = True
+
+    # 去除停车重复点, 停车点和化简各占一半容差, 总偏差不超过容差
+    stationary = stationary_mask(points, speeds, tolerance / 2) & ~boundaries
+    keep &= ~stationary
+
+    # 按档位边界分段化简
+    remaining = np.flatnonzero(keep)
+    remaining_boundaries = np.flatnonzero(boundaries[remaining])
+    for first, last in zip(remaining_boundaries[:-1], remaining_boundaries[1:]):
+        if last - first < 2:
+            continue
+        piece = remaining[first:last + 1]
+        keep[piece] = douglas_peucker(points[piece], tolerance / 2)
+
+    deviation = max_deviation(points, keep)
+    kept_points = points[keep]
+    kept_length = float(np.hypot(*np.diff(kept_points, axis=0).T).sum()) if len(kept_points) > 1 else 0.0
+    # 折线偏移不超过最大距离时, 缓冲区两侧边界的偏移均不超过该距离
+    area_error = 2 * deviation * kept_length
+    stats = DecimationStats(n, int(keep.sum()), int(stationary.sum()), int(n - keep.sum() - stationary.sum()),
+                            tolerance, deviation, area_error)
+    return keep, stats
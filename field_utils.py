@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+import collections
+import numpy as np
+import shapely
+from shapely.geometry import Polygon, MultiPolygon, Point
+from shapely.ops import unary_union
+
+logger = logging.getLogger(__name__)
+
+
+def ring_signed_area(ring):
+    """
+    计算环的有向面积(顺时针为负, 逆时针为正)
+
+    :param ring: 环坐标数组
+    :return: 有向面积
+    """
+    ring = np.asarray(ring, dtype=np.float64)
+    x = ring[:, 0]
+    y = ring[:, 1]
+    return (np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1])) / 2.0
+
+
+def feature_polygon(rings):
+    """
+    根据 ESRI 要素的多环 rings 构建多边形, 顺时针环为外环, 逆时针环为内环(洞)
+
+    :param rings: ESRI 要素 geometry['rings']
+    :return: 要素多边形对象
+    """
+    outer_rings = []
+    inner_rings = []
+    for ring in rings:
+        if ring_signed_area(ring) < 0:
+            outer_rings.append(ring)
+        else:
+            inner_rings.append(ring)
+    # 环方向不规范(全部为逆时针)时, 按外环处理
+    if not outer_rings:
+        outer_rings, inner_rings = inner_rings, []
+
+    # 将内环分配给包含它的外环
+    holes = [[] for _ in outer_rings]
+    outer_polygons = [Polygon(ring) for ring in outer_rings]
+    for ring in inner_rings:
+        for i, outer_polygon in enumerate(outer_polygons):
+            if outer_polygon.contains(Point(ring[0])):
+                holes[i].append(ring)
+                break
+
+    polygons = [Polygon(outer_rings[i], holes[i]) for i in range(len(outer_rings))]
+    if len(polygons) == 1:
+        return polygons[0]
+    return unary_union(polygons)
+
+
+def feature_geometry(feature):
+    """
+    构建单个地块要素的多边形, 支持 ESRI JSON(rings) 和 GeoJSON(Polygon/MultiPolygon)
+
+    :param feature: 地块要素
+    :return: 要素多边形对象
+    """
+    geom = feature['geometry']
+    if 'rings' in geom:
+        return feature_polygon(geom['rings'])
+    if geom['type'] == 'Polygon':
+        return Polygon(geom['coordinates'][0], geom['coordinates'][1:])
+    if geom['type'] == 'MultiPolygon':
+        return MultiPolygon([(rings[0], rings[1:]) for rings in geom['coordinates']])
+    raise ValueError("ERROR!!! Unsupported field geometry type: {}".format(geom['type']))
+
+
+def feature_attributes(feature):
+    """
+    获取地块要素的属性字典, 支持 ESRI JSON(attributes) 和 GeoJSON(properties)
+
+    :param feature: 地块要素
+    :return: 属性字典
+    """
+    return feature.get('attributes') or feature.get('properties') or {}
+
+
+def feature_key(feature, index):
+    """
+    获取地块要素的标识, 依次取 OID、Name, 都没有时取要素序号
+
+    :param feature: 地块要素
+    :param index: 要素序号
+    :return: 要素标识
+    """
+    attributes = feature_attributes(feature)
+    for name in ('OID', 'Name'):
+        if attributes.get(name) is not None:
+            return attributes[name]
+    return index
+
+
+def feature_keys(features):
+    """
+    获取全部地块要素的标识, 不重复的标识保持不变; OID 重复的要素改用 Name, 仍然重复的要素改用 (标识, 要素序号),
+    避免不同地块的结果互相覆盖, 也不会把一个地块的结果记在另一个地块的 OID 下
+
+    :param features: 地块要素列表
+    :return: 与要素顺序一致的标识列表, 互不重复
+    """
+    keys = [feature_key(feature, index) for index, feature in enumerate(features)]
+    counts = collections.Counter(keys)
+    if all(count == 1 for count in counts.values()):
+        return keys
+    duplicates = [key for key, count in counts.items() if count > 1]
+
+    # OID 重复时改用要素的 Name, Name 也重复时改用 (标识, 要素序号)
+    names = list(keys)
+    for index, feature in enumerate(features):
+        attributes = feature_attributes(feature)
+        if counts[keys[index]] > 1 and attributes.get('OID') is not None and attributes.get('Name') is not None:
+            names[index] = attributes['Name']
+    name_counts = collections.Counter(names)
+    keys = [(key, index) if name_counts[name] > 1 else name for index, (key, name) in enumerate(zip(keys, names))]
+    logger.warning('Duplicate parcel keys %s, colliding parcels are keyed by Name or (key, feature index)',
+                   duplicates[:10])
+    return keys
+
+
+def field_geometry(field_data):
+    """
+    根据地块边界数据构建地块多边形, 多个要素时取并集
+
+    :param field_data: 地块边界数据
+    :return: 地块多边形对象
+    """
+    polygons = [feature_geometry(feature) for feature in field_data['features']]
+    if len(polygons) == 1:
+        return polygons[0]
+    return unary_union(polygons)
+
+
+def points_in_field(lons, lats, field_polygon):
+    """
+    批量判断轨迹点是否在地块范围内, 先按外包框粗筛, 再用预处理多边形精确判断
+
+    :param lons: 轨迹点经度数组
+    :param lats: 轨迹点纬度数组
+    :param field_polygon: 地块多边形对象
+    :return: 轨迹点是否在地块内的布尔掩膜
+    """
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+
+    # 外包框粗筛
+    min_lon, min_lat, max_lon, max_lat = field_polygon.bounds
+    mask = (lons >= min_lon) & (lons <= max_lon) & (lats >= min_lat) & (lats <= max_lat)
+    candidates = np.flatnonzero(mask)
+
+    # 预处理多边形后批量精确判断
+    shapely.prepare(field_polygon)
+    mask[candidates] = shapely.contains_xy(field_polygon, lons[candidates], lats[candidates])
+    return mask
+
+
+def assign_points(lons, lats, feature_polygons):
+    """
+    基于 STRtree 空间索引一次性将轨迹点分配到其所在的地块
+
+    :param lons: 轨迹点经度数组
+    :param lats: 轨迹点纬度数组
+    :param feature_polygons: 地块多边形列表
+    :return: 地块序号到其范围内轨迹点索引数组(按轨迹顺序)的字典
+    """
+    tree = shapely.STRtree(feature_polygons)
+    points = shapely.points(np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64))
+    point_index, polygon_index = tree.query(points, predicate='within')
+
+    # 按地块分组, 组内保持轨迹顺序
+    order = np.lexsort((point_index, polygon_index))
+    point_index = point_index[order]
+    polygon_index = polygon_index[order]
+    groups, starts = np.unique(polygon_index, return_index=True)
+    stops = np.append(starts[1:], len(polygon_index))
+    return {int(group): point_index[start:stop] for group, start, stop in zip(groups, starts, stops)}
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import collections
+import numpy as np
+import shapely
+
+# 多台农机在同一地块的作业覆盖结果
+FleetCoverage = collections.namedtuple('FleetCoverage', [
+    'machine_ids',         # 农机标识列表, 与重叠矩阵行列顺序一致
+    'machine_areas',       # 农机标识到 track_area 同样七项结果的字典
+    'union_area',          # 全部农机总作业覆盖面积(亩), 多台农机重复作业只计一次
+    'fleet_overlap_area',  # 农机之间的重复作业面积(亩), 即各农机覆盖面积之和减去总覆盖面积
+    'overlap_matrix',      # 农机两两之间覆盖范围的重叠面积(亩), 对角线为各农机自身覆盖面积
+])
+
+
+def swath_pair_overlaps(swaths, owners, machine_unions):
+    """
+    基于 STRtree 空间索引计算农机两两之间的覆盖重叠面积: 只有作业段相交的农机对才求交, 且求交前将双方覆盖范围裁剪到相交作业段的
+    公共外包框内, 计算量随相互重叠的作业段增长, 而不是随农机数的平方增长
+
+    :param swaths: 全部农机的作业段多边形列表
+    :param owners: 各作业段所属农机序号数组
+    :param machine_unions: 各农机覆盖范围多边形列表
+    :return: 农机两两之间覆盖重叠面积矩阵(平方米), 对角线为 0
+    """
+    machine_count = len(machine_unions)
+    matrix = np.zeros((machine_count, machine_count))
+    if len(swaths) == 0:
+        return matrix
+    swaths = np.asarray(swaths, dtype=object)
+    owners = np.asarray(owners)
+    tree = shapely.STRtree(swaths)
+    left, right = tree.query(swaths, predicate='intersects')
+
+    # 只保留不同农机之间的作业段对, 每对只计一次
+    pairs = owners[left] < owners[right]
+    left = left[pairs]
+    right = right[pairs]
+    if len(left) == 0:
+        return matrix
+
+    # 按农机对分组
+    pair_keys = owners[left] * machine_count + owners[right]
+    order = np.argsort(pair_keys, kind='stable')
+    groups, starts = np.unique(pair_keys[order], return_index=True)
+    stops = np.append(starts[1:], len(order))
+    for group, start, stop in zip(groups, starts, stops):
+        a, b = divmod(int(group), machine_count)
+        # 两台农机覆盖范围的交集只可能出现在双方相交作业段外包框的公共部分
+        left_bounds = shapely.total_bounds(swaths[np.unique(left[order[start:stop]])])
+        right_bounds = shapely.total_bounds(swaths[np.unique(right[order[start:stop]])])
+        min_x, min_y = np.maximum(left_bounds[:2], right_bounds[:2])
+        max_x, max_y = np.minimum(left_bounds[2:], right_bounds[2:])
+        if min_x >= max_x or min_y >= max_y:
+            continue
+        clipped_a = shapely.clip_by_rect(machine_unions[a], min_x, min_y, max_x, max_y)
+        clipped_b = shapely.clip_by_rect(machine_unions[b], min_x, min_y, max_x, max_y)
+        matrix[a, b] = matrix[b, a] = shapely.intersection(clipped_a, clipped_b).area
+    return matrix
+
+
+def fleet_coverage(machine_ids, machine_areas, machine_swaths, machine_unions):
+    """
+    合并多台农机的作业覆盖, 计算总覆盖面积和农机间重叠矩阵
+
+    :param machine_ids: 农机标识列表
+    :param machine_areas: 各农机 track_area 同样七项结果列表
+    :param machine_swaths: 各农机作业段多边形列表的列表
+    :param machine_unions: 各农机覆盖范围多边形列表
+    :return: FleetCoverage 多台农机作业覆盖结果
+    """
+    machine_count = len(machine_ids)
+    swaths = [swath for swath_list in machine_swaths for swath in swath_list]
+    owners = np.repeat(np.arange(machine_count), [len(swath_list) for swath_list in machine_swaths])
+    matrix = swath_pair_overlaps(swaths, owners, machine_unions)
+    for i, machine_union in enumerate(machine_unions):
+        matrix[i, i] = machine_union.area
+
+    # 全部农机的总覆盖范围
+    union_area = shapely.union_all(machine_unions).area if machine_unions else 0.0
+    fleet_overlap_area = float(np.trace(matrix)) - union_area
+
+    return FleetCoverage(list(machine_ids), dict(zip(machine_ids, machine_areas)), union_area / 2000 * 3,
+                         fleet_overlap_area / 2000 * 3, matrix / 2000 * 3)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import math
+import numpy as np
+from shapely.geometry import Point, LineString
+import coor_utils
+import field_utils
+import segment_utils
+import track_io
+import union_engine
+
+# 默认覆盖范围瓦片边长(米)
+DEFAULT_TILE_SIZE = 50.0
+
+
+class OpenRun:
+    """
+    未结束的作业段: 不保留轨迹点, 只保留末点和解析面积的累计量, 新增轨迹点按线段增量累加面积并并入作业段自身覆盖范围
+    """
+
+    def __init__(self, band, half_width, tile_size):
+        """
+        :param band: 作业档位
+        :param half_width: 农具作业幅宽的一半长度
+        :param tile_size: 覆盖范围瓦片边长(米)
+        """
+        self.band = band
+        self.half_width = half_width
+        self.last_point = None
+
+        # 解析面积的累计量, 与 segment_utils.swath_area 逐项一致
+        self.length = 0.0
+        self.joint_area = 0.0
+        # 最后一条非零长度线段的航向、长度及其起点转角的内侧重叠长度
+        self.last_heading = None
+        self.last_length = 0.0
+        self.last_inner = 0.0
+        # 航向相对首段的累计变化及其范围
+        self.heading_offset = 0.0
+        self.min_offset = 0.0
+        self.max_offset = 0.0
+        # 作业段无自重叠时使用解析面积, 否则使用作业段自身覆盖范围的面积
+        self.simple = True
+        self.coverage = union_engine.TiledCoverage(tile_size)
+
+    def extend(self, points):
+        """
+        追加作业段的轨迹点
+
+        :param points: 新增轨迹点投影坐标数组
+        :return: 新增部分(包括与上一个轨迹点之间的线段和转角)的缓冲区多边形
+        """
+        line_points = points if self.last_point is None else np.vstack((self.last_point, points))
+        self.last_point = points[-1]
+        piece = segment_utils.run_buffer(line_points, self.half_width)
+        self.coverage.add(piece)
+        if self.simple and len(line_points) > 1:
+            self.accumulate(np.diff(line_points, axis=0))
+        return piece
+
+    def accumulate(self, deltas):
+        """
+        累加新增线段的解析面积, 作业段折返或局部自重叠时改用覆盖范围面积
+
+        :param deltas: 新增线段的坐标增量数组
+        """
+        lengths = np.hypot(deltas[:, 0], deltas[:, 1])
+        # 去除停车等原因产生的零长度线段
+        moving = lengths > 1e-9
+        deltas = deltas[moving]
+        lengths = lengths[moving]
+        if len(lengths) == 0:
+            return
+
+        # 与之前最后一条线段之间及新增线段之间的转向角
+        headings = np.arctan2(deltas[:, 1], deltas[:, 0])
+        previous = headings[:0] if self.last_heading is None else np.array([self.last_heading])
+        turns = (np.diff(np.concatenate((previous, headings))) + math.pi) % (2 * math.pi) - math.pi
+        offsets = self.heading_offset + np.cumsum(turns)
+        self.min_offset = min(self.min_offset, float(offsets.min(initial=0.0)))
+        self.max_offset = max(self.max_offset, float(offsets.max(initial=0.0)))
+        if self.max_offset - self.min_offset > segment_utils.MAX_SIMPLE_HEADING_SPAN:
+            self.simple = False
+            return
+
+        # 转角内侧重叠区域超出相邻线段长度时作业段局部自重叠, 之前最后一条线段需与其后的新转角一起检查
+        turn_angles = np.abs(turns)
+        inner_lengths = self.half_width * np.tan(turn_angles / 2)
+        if self.last_heading is None:
+            segment_lengths = lengths
+            before = np.concatenate(([0.0], inner_lengths))
+        else:
+            segment_lengths = np.concatenate(([self.last_length], lengths))
+            before = np.concatenate(([self.last_inner], inner_lengths))
+        after = np.concatenate((inner_lengths, [0.0]))
+        if np.any(before + after > segment_lengths):
+            self.simple = False
+            return
+
+        self.length += float(lengths.sum())
+        self.joint_area += float((segment_utils.fillet_area(turn_angles, self.half_width)
+                                  - self.half_width * inner_lengths).sum())
+        self.heading_offset = float(offsets[-1]) if len(offsets) else self.heading_offset
+        self.last_heading = float(headings[-1])
+        self.last_length = float(lengths[-1])
+        self.last_inner = float(before[-1])
+
+    def gross_area(self):
+        """
+        获取作业段的缓冲区面积
+
+        :return: 作业段缓冲区面积
+        """
+        if not self.simple:
+            return self.coverage.area
+        cap_area = 2 * float(segment_utils.fillet_area(math.pi, self.half_width))
+        return 2 * self.half_width * self.length + cap_area + self.joint_area
+
+
+class TrackAccumulator:
+    """
+    实时轨迹作业面积累加器: 每次只处理新上报的轨迹点, 新增轨迹的幅宽在到达时即并入各覆盖范围,
+    未结束作业段的面积按线段增量累加, 每次更新和获取结果的开销只与新增轨迹点数有关
+    """
+
+    def __init__(self, field_data, width, deep_depth, shallow_depth, utm_proj=None, tile_size=DEFAULT_TILE_SIZE,
+                 band_thresholds=None):
+        """
+        :param field_data: 地块边界数据
+        :param width: 农具作业幅宽
+        :param deep_depth: 农具深耕阈值
+        :param shallow_depth: 农具浅耕阈值
+        :param utm_proj: 投影坐标系编号, 为 None 时按地块中心经度判断
+        :param tile_size: 覆盖范围瓦片边长(米)
+        :param band_thresholds: 递增的耕深阈值表, 为 None 时为 (浅耕阈值, 深耕阈值); 深耕为最高一档, 浅耕为其余作业档位
+        """
+        # 农具作业幅宽的一半长度
+        self.half_width = width / 2.0
+        # 作业档位阈值表: 0 为未作业, 默认阈值表时 1 为浅耕, 2 为深耕
+        self.band_thresholds = segment_utils.band_thresholds(deep_depth, shallow_depth, band_thresholds)
+        self.bands = segment_utils.table_bands(self.band_thresholds)
+
+        # 地块多边形及投影
+        self.field_polygon = field_utils.field_geometry(field_data)
+        if utm_proj is None:
+            utm_proj = coor_utils.check_utm(self.field_polygon.centroid.x)
+        self.utm_proj = utm_proj
+        self.transformer = coor_utils.get_transformer(utm_proj)
+        self.field_area = coor_utils.project_geometry(self.field_polygon, self.transformer).area
+
+        # 轨迹长度: 相邻轨迹点距离之和, 首点和末点用于闭合
+        self.track_length = 0.0
+        self.first_point = None
+        self.last_point = None
+        self.last_gps_time = None
+        self.point_count = 0
+
+        # 地块范围内的最后一个轨迹点, 用于衔接下一批轨迹点
+        self.last_filter_point = None
+        # 未结束的作业段
+        self.tile_size = tile_size
+        self.open_run = None
+
+        # 各档位已结束作业段面积之和(包括重复作业)
+        self.band_gross_areas = dict.fromkeys(self.bands, 0.0)
+        # 深耕(最高一档)、浅耕(其余作业档位)、总作业和农机运动的覆盖范围
+        self.band_coverages = {band: union_engine.TiledCoverage(tile_size)
+                               for band in (segment_utils.SHALLOW_BAND, segment_utils.DEEP_BAND)}
+        self.total_coverage = union_engine.TiledCoverage(tile_size)
+        self.activity_coverage = union_engine.TiledCoverage(tile_size)
+
+    def report_band(self, band):
+        """
+        获取作业档位对应的输出档位
+
+        :param band: 阈值表中的作业档位
+        :return: 最高一档为 DEEP_BAND, 其余作业档位为 SHALLOW_BAND
+        """
+        return segment_utils.DEEP_BAND if band == self.bands[-1] else segment_utils.SHALLOW_BAND
+
+    def add_points(self, lng, lat, deep, gps_time=None):
+        """
+        追加一批新上报的轨迹点
+
+        :param lng: 经度, 数值或数组
+        :param lat: 纬度, 数值或数组
+        :param deep: 耕深, 数值或数组
+        :param gps_time: 定位时间, 数值或数组
+        """
+        lng = np.atleast_1d(np.asarray(lng, dtype=np.float64))
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        # 耕深保持原有精度, 与阈值按相同精度比较
+        deep = np.atleast_1d(np.asarray(deep))
+        if len(lng) == 0:
+            return
+        if gps_time is not None:
+            self.last_gps_time = np.atleast_1d(gps_time)[-1]
+
+        # 只转换新增轨迹点
+        x, y = self.transformer.transform(lng, lat)
+        points = np.column_stack((x, y))
+
+        # 累加轨迹长度
+        if self.last_point is None:
+            self.first_point = points[0]
+            steps = np.diff(points, axis=0)
+        else:
+            steps = np.diff(np.vstack((self.last_point, points)), axis=0)
+        self.track_length += float(np.hypot(steps[:, 0], steps[:, 1]).sum())
+        self.last_point = points[-1]
+        self.point_count += len(points)
+
+        # 只保留地块范围内轨迹点
+        filter_mask = field_utils.points_in_field(lng, lat, self.field_polygon)
+        filter_points = points[filter_mask]
+        if len(filter_points) == 0:
+            return
+        filter_bands = segment_utils.depth_bands(deep[filter_mask], self.band_thresholds)
+
+        # 农机运动覆盖范围只并入新增轨迹
+        if self.last_filter_point is None:
+            activity_points = filter_points
+        else:
+            activity_points = np.vstack((self.last_filter_point, filter_points))
+        if len(activity_points) == 1:
+            self.activity_coverage.add(Point(activity_points[0]).buffer(self.half_width))
+        else:
+            self.activity_coverage.add(LineString(activity_points).buffer(self.half_width))
+
+        # 新增轨迹首段与未结束作业段档位不同时, 未结束作业段结束
+        if self.open_run is not None and filter_bands[0] != self.open_run.band:
+            self.close_run()
+        for band, start, stop in segment_utils.segment_runs(filter_bands):
+            if start > 0 or self.open_run is None:
+                self.open_run = OpenRun(band, self.half_width, self.tile_size)
+            # 新增部分的幅宽直接并入档位和总作业覆盖范围, 同一作业段的各部分之并即为整个作业段的缓冲区
+            piece = self.open_run.extend(filter_points[start:stop])
+            self.band_coverages[self.report_band(band)].add(piece)
+            self.total_coverage.add(piece)
+            if stop < len(filter_points):
+                self.close_run()
+
+        self.last_filter_point = filter_points[-1]
+
+    def close_run(self):
+        """
+        结束当前作业段, 将其面积计入累计结果, 覆盖范围已在轨迹点到达时并入
+        """
+        self.band_gross_areas[self.open_run.band] += self.open_run.gross_area()
+        self.open_run = None
+
+    def snapshot(self):
+        """
+        获取当前累计的作业面积, 未结束的作业段已计入覆盖范围, 不修改累计结果
+
+        :return: 轨迹总体长度, 地块面积, 轨迹覆盖面积, 深耕作业面积, 浅耕作业面积, 总作业面积(不包括重复作业), 重复作业面积
+        """
+        # 轨迹首尾闭合后的总体长度
+        track_length = self.track_length
+        if self.point_count > 1:
+            track_length += float(np.hypot(*(self.last_point - self.first_point)))
+        track_length = track_length / 1000
+
+        field_area = self.field_area / 2000 * 3
+        # 与整体计算一致, 没有地块范围内轨迹点时运动面积为 0
+        total_area = 0.0
+        if self.last_filter_point is not None:
+            total_area = (self.activity_coverage.area - (math.pi * self.half_width ** 2)) / 2000 * 3
+
+        band_union_areas = {band: coverage.area for band, coverage in self.band_coverages.items()}
+        union_total_area = self.total_coverage.area
+        gross_area = sum(self.band_gross_areas.values())
+        if self.open_run is not None:
+            # 计入未结束的作业段
+            gross_area += self.open_run.gross_area()
+
+        cultivation_deep_area = band_union_areas[segment_utils.DEEP_BAND] / 2000 * 3
+        cultivation_shallow_area = band_union_areas[segment_utils.SHALLOW_BAND] / 2000 * 3
+        cultivation_total_area = union_total_area / 2000 * 3
+        overlap_total_area = (gross_area - union_total_area) / 2000 * 3
+
+        return track_length, field_area, total_area, cultivation_deep_area, cultivation_shallow_area, cultivation_total_area, \
+            overlap_total_area
+
+
+def chunked_track_area(track_data, field_data, width, deep_depth, shallow_depth, chunk_size, tile_size=DEFAULT_TILE_SIZE,
+                       band_thresholds=None, utm_proj=None):
+    """
+    按固定大小的窗口分块计算农机作业面积, 轨迹文件按窗口流式读取, 不整体载入; 相邻窗口间衔接上一窗口的末尾轨迹点以拼接
+    跨窗口作业段, 每个窗口的覆盖范围并入累计结果后即释放, 内存占用只与窗口大小和覆盖范围有关
+
+    :param track_data: 农机轨迹数据, 轨迹文件路径(JSON 或二进制)、轨迹记录字典列表或 track_io.load_track 读取的字段数组
+    :param field_data: 地块边界数据
+    :param width: 农具作业幅宽
+    :param deep_depth: 农具深耕阈值
+    :param shallow_depth: 农具浅耕阈值
+    :param chunk_size: 每个窗口的轨迹点数
+    :param tile_size: 覆盖范围瓦片边长(米)
+    :param band_thresholds: 递增的耕深阈值表, 为 None 时为 (浅耕阈值, 深耕阈值)
+    :param utm_proj: 投影坐标系编号, 为 None 时按地块中心经度判断(整体计算按全部轨迹经度中位数判断, 轨迹在地块附近时一致)
+    :return: 轨迹总体长度, 地块面积, 轨迹覆盖面积, 深耕作业面积, 浅耕作业面积, 总作业面积(不包括重复作业), 重复作业面积
+    """
+    accumulator = TrackAccumulator(field_data, width, deep_depth, shallow_depth, utm_proj, tile_size, band_thresholds)
+    for chunk in track_io.iter_track_chunks(track_data, ('lng', 'lat', 'deep'), chunk_size):
+        accumulator.add_points(chunk['lng'], chunk['lat'], chunk['deep'])
+    return accumulator.snapshot()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import math
+import collections
+import numpy as np
+
+# 栅格覆盖计算结果, 面积单位均为平方米
+RasterCoverage = collections.namedtuple('RasterCoverage', [
+    'pass_count',       # 各栅格被作业段覆盖的次数(同一作业段只计一次)
+    'band_masks',       # 档位到该档位覆盖栅格布尔数组的字典
+    'activity_mask',    # 农机运动轨迹覆盖栅格布尔数组
+    'bounds',           # 栅格范围 (min_x, min_y, max_x, max_y), 第 0 行对应 max_y
+    'cell_size',        # 栅格边长(米)
+    'activity_area',    # 农机运动覆盖面积
+    'band_areas',       # 档位到该档位覆盖面积的字典
+    'union_area',       # 总作业覆盖面积(不包括重复作业)
+    'gross_area',       # 各作业段覆盖面积之和(包括重复作业)
+    'overlap_area',     # 重复作业面积, 按重复次数累计, 与矢量计算口径一致
+    'multi_pass_area',  # 覆盖次数不少于 2 的栅格面积
+    'error_bounds',     # 各面积相对矢量精确结果的误差上界字典
+])
+
+# 默认栅格边长(米)
+DEFAULT_CELL_SIZE = 0.2
+# 按行扫描绘制幅宽时每批处理的线段数
+SPAN_BATCH_SIZE = 65536
+
+
+def grid_shape(bounds, cell_size):
+    """
+    计算覆盖指定范围的栅格行列数
+
+    :param bounds: 范围 (min_x, min_y, max_x, max_y)
+    :param cell_size: 栅格边长(米)
+    :return: (行数, 列数)
+    """
+    min_x, min_y, max_x, max_y = bounds
+    rows = max(int(math.ceil((max_y - min_y) / cell_size)), 1)
+    cols = max(int(math.ceil((max_x - min_x) / cell_size)), 1)
+    return rows, cols
+
+
+def line_window(line_points, half_width, bounds, cell_size, shape):
+    """
+    计算线的作业幅宽缓冲区所覆盖的栅格窗口
+
+    :param line_points: 线的投影坐标数组
+    :param half_width: 农具作业幅宽的一半长度
+    :param bounds: 栅格范围 (min_x, min_y, max_x, max_y)
+    :param cell_size: 栅格边长(米)
+    :param shape: 栅格行列数
+    :return: (起始行, 结束行, 起始列, 结束列), 结束行列不包含在内
+    """
+    min_x, _, _, max_y = bounds
+    rows, cols = shape
+    col0 = max(int((line_points[:, 0].min() - half_width - min_x) / cell_size), 0)
+    col1 = min(int((line_points[:, 0].max() + half_width - min_x) / cell_size) + 1, cols)
+    row0 = max(int((max_y - line_points[:, 1].max() - half_width) / cell_size), 0)
+    row1 = min(int((max_y - line_points[:, 1].min() + half_width) / cell_size) + 1, rows)
+    return row0, row1, col0, col1
+
+
+def solve_interval(slope, offset, lower, upper):
+    """
+    求解线性不等式 lower <= slope * x + offset <= upper 的解区间
+
+    :param slope: 系数数组
+    :param offset: 常数项数组
+    :param lower: 下界
+    :param upper: 上界数组或数值
+    :return: (区间左端数组, 区间右端数组), 无解时左端大于右端
+    """
+    flat = np.abs(slope) < 1e-12
+    safe_slope = np.where(flat, 1.0, slope)
+    x0 = (lower - offset) / safe_slope
+    x1 = (upper - offset) / safe_slope
+    left = np.where(flat, np.where((offset >= lower) & (offset <= upper), -np.inf, np.inf), np.minimum(x0, x1))
+    right = np.where(flat, np.where((offset >= lower) & (offset <= upper), np.inf, -np.inf), np.maximum(x0, x1))
+    return left, right
+
+
+def swath_spans(starts, ends, half_width, bounds, cell_size, shape):
+    """
+    计算一批线段的作业幅宽缓冲区在各栅格行中心线上覆盖的列区间: 线段缓冲区为凸集, 与每条行中心线的交集为一个区间,
+    即两端圆和中间矩形各自区间的并
+
+    :param starts: 线段起点坐标数组
+    :param ends: 线段终点坐标数组
+    :param half_width: 农具作业幅宽的一半长度
+    :param bounds: 栅格范围 (min_x, min_y, max_x, max_y), 第 0 行对应 max_y
+    :param cell_size: 栅格边长(米)
+    :param shape: 栅格行列数
+    :return: (线段序号数组, 行号数组, 起始列数组, 结束列数组), 结束列包含在内
+    """
+    min_x, _, _, max_y = bounds
+    rows, cols = shape
+    # 各线段外扩半幅宽范围所跨的栅格行
+    row0 = np.maximum(np.ceil((max_y - np.maximum(starts[:, 1], ends[:, 1]) - half_width) / cell_size - 0.5), 0)
+    row1 = np.minimum(np.floor((max_y - np.minimum(starts[:, 1], ends[:, 1]) + half_width) / cell_size - 0.5), rows - 1)
+    counts = np.maximum(row1 - row0 + 1, 0).astype(np.intp)
+    segment = np.repeat(np.arange(len(starts)), counts)
+    row = (row0[segment] + np.arange(len(segment)) - np.repeat(np.cumsum(counts) - counts, counts)).astype(np.intp)
+    center_y = max_y - (row + 0.5) * cell_size
+
+    ax, ay = starts[segment, 0], starts[segment, 1]
+    bx, by = ends[segment, 0], ends[segment, 1]
+    half_width2 = half_width * half_width
+
+    # 两端圆与行中心线的交集
+    left = np.full(len(segment), np.inf)
+    right = np.full(len(segment), -np.inf)
+    for px, py in ((ax, ay), (bx, by)):
+        dy2 = (center_y - py) ** 2
+        hit = dy2 <= half_width2
+        dx = np.sqrt(np.where(hit, half_width2 - dy2, 0.0))
+        left = np.where(hit, np.minimum(left, px - dx), left)
+        right = np.where(hit, np.maximum(right, px + dx), right)
+
+    # 中间矩形与行中心线的交集: 沿线段方向投影在 [0, 长度] 内, 垂直方向距离不超过半幅宽
+    length = np.hypot(bx - ax, by - ay)
+    moving = length > 1e-9
+    safe_length = np.where(moving, length, 1.0)
+    ux = (bx - ax) / safe_length
+    uy = (by - ay) / safe_length
+    along_left, along_right = solve_interval(ux, (center_y - ay) * uy - ax * ux, 0.0, length)
+    across_left, across_right = solve_interval(-uy, (center_y - ay) * ux + ax * uy, -half_width, half_width)
+    body_left = np.maximum(along_left, across_left)
+    body_right = np.minimum(along_right, across_right)
+    body = moving & (body_left <= body_right)
+    left = np.where(body, np.minimum(left, body_left), left)
+    right = np.where(body, np.maximum(right, body_right), right)
+
+    # 栅格中心落在区间内的列
+    col0 = np.maximum(np.ceil((left - min_x) / cell_size - 0.5), 0)
+    col1 = np.minimum(np.floor((right - min_x) / cell_size - 0.5), cols - 1)
+    valid = col0 <= col1
+    return segment[valid], row[valid], col0[valid].astype(np.intp), col1[valid].astype(np.intp)
+
+
+def draw_swath(mask, line_points, half_width, bounds, cell_size, batch_size=SPAN_BATCH_SIZE):
+    """
+    将一条线的作业幅宽缓冲区绘制到布尔栅格上, 栅格中心到线的距离不超过半幅宽即视为覆盖;
+    全部线段一次性按行扫描求覆盖列区间, 再以逐行差分累加填充, 计算量与线段所跨行数成正比
+
+    :param mask: 布尔栅格数组, 原地修改
+    :param line_points: 线的投影坐标数组, 单点时为圆
+    :param half_width: 农具作业幅宽的一半长度
+    :param bounds: 栅格范围 (min_x, min_y, max_x, max_y)
+    :param cell_size: 栅格边长(米)
+    :param batch_size: 每批处理的线段数, 限制中间数组大小
+    """
+    rows, cols = mask.shape
+    starts = line_points[:-1] if len(line_points) > 1 else line_points
+    ends = line_points[1:] if len(line_points) > 1 else line_points
+    # 每行多一列用于差分的结束位置
+    steps = np.zeros(rows * (cols + 1), dtype=np.int32)
+    for i in range(0, len(starts), batch_size):
+        _, row, col0, col1 = swath_spans(starts[i:i + batch_size], ends[i:i + batch_size], half_width, bounds,
+                                         cell_size, (rows, cols))
+        add_spans(steps, row, col0, col1, cols)
+    mask |= np.cumsum(steps.reshape(rows, cols + 1), axis=1)[:, :cols] > 0
+
+
+def merge_spans(groups, col0, col1):
+    """
+    合并同一分组内相互重叠的列区间, 使每个栅格在同一分组内只计一次
+
+    :param groups: 各区间的分组号数组, 如 作业段序号 × 行数 + 行号
+    :param col0: 区间起始列数组
+    :param col1: 区间结束列数组, 包含在内
+    :return: (分组号数组, 起始列数组, 结束列数组), 同一分组内的区间互不重叠
+    """
+    if len(groups) == 0:
+        return groups, col0, col1
+    order = np.lexsort((col0, groups))
+    groups = groups[order]
+    col0 = col0[order]
+    col1 = col1[order]
+    # 分组内结束列的累计最大值, 分组号作为高位保证各分组独立累计
+    span = int(col1.max()) + 2
+    reach = np.maximum.accumulate(groups * span + col1) - groups * span
+    # 区间起始列超过之前区间的最大结束列时开始新的合并区间
+    new_span = np.ones(len(groups), dtype=bool)
+    new_span[1:] = (groups[1:] != groups[:-1]) | (col0[1:] > reach[:-1])
+    first = np.flatnonzero(new_span)
+    last = np.append(first[1:], len(groups)) - 1
+    return groups[first], col0[first], reach[last]
+
+
+def runs_spans(points, runs, half_width, bounds, cell_size, shape):
+    """
+    一次性计算一批作业段的幅宽缓冲区在各栅格行上覆盖的列区间, 同一作业段自身重叠的区间已合并
+
+    :param points: 投影坐标数组
+    :param runs: 作业段数组, 每行为 (档位, 起始索引, 结束索引)
+    :param half_width: 农具作业幅宽的一半长度
+    :param bounds: 栅格范围 (min_x, min_y, max_x, max_y), 第 0 行对应 max_y
+    :param cell_size: 栅格边长(米)
+    :param shape: 栅格行列数
+    :return: (作业段序号数组, 行号数组, 起始列数组, 结束列数组), 结束列包含在内
+    """
+    rows, _ = shape
+    point_counts = runs[:, 2] - runs[:, 1]
+    # 单点作业段按零长度线段处理, 即为圆
+    segment_counts = np.maximum(point_counts - 1, 1)
+    run_index = np.repeat(np.arange(len(runs)), segment_counts)
+    offsets = np.arange(len(run_index)) - np.repeat(np.cumsum(segment_counts) - segment_counts, segment_counts)
+    first = runs[run_index, 1] + offsets
+    last = first + (point_counts[run_index] > 1)
+    segment, row, col0, col1 = swath_spans(points[first], points[last], half_width, bounds, cell_size, shape)
+    groups, col0, col1 = merge_spans(run_index[segment] * rows + row, col0, col1)
+    run_index, row = np.divmod(groups, rows)
+    return run_index, row, col0, col1
+
+
+def add_spans(steps, row, col0, col1, cols):
+    """
+    将列区间按逐行差分累加到差分数组
+
+    :param steps: 差分数组, 长度为 行数 × (列数 + 1), 原地修改
+    :param row: 行号数组
+    :param col0: 起始列数组
+    :param col1: 结束列数组, 包含在内
+    :param cols: 栅格列数
+    """
+    steps += np.bincount(row * (cols + 1) + col0, minlength=len(steps)).astype(steps.dtype)
+    steps -= np.bincount(row * (cols + 1) + col1 + 1, minlength=len(steps)).astype(steps.dtype)
+
+
+def track_coverage(points, runs, half_width, bounds, bands, cell_size=DEFAULT_CELL_SIZE):
+    """
+    以栅格方式计算作业覆盖: 全部作业段按行扫描求覆盖列区间, 合并同一作业段自身重叠后以差分累加得到覆盖次数栅格,
+    各面积由数组统计得到
+
+    :param points: 地块范围内轨迹点投影坐标数组
+    :param runs: 作业段数组, 每行为 (档位, 起始索引, 结束索引)
+    :param half_width: 农具作业幅宽的一半长度
+    :param bounds: 需要覆盖的投影范围 (min_x, min_y, max_x, max_y), 一般为地块范围
+    :param bands: 需要统计的档位列表
+    :param cell_size: 栅格边长(米)
+    :return: RasterCoverage 栅格覆盖计算结果
+    """
+    # 栅格范围在给定范围基础上外扩半幅宽, 保证缓冲区完整落在栅格内
+    min_x, min_y, max_x, max_y = bounds
+    bounds = (min_x - half_width, min_y - half_width, max_x + half_width, max_y + half_width)
+    rows, cols = grid_shape(bounds, cell_size)
+    cell_area = cell_size * cell_size
+    runs = np.asarray(runs, dtype=np.intp).reshape(-1, 3)
+
+    # 覆盖次数和各档位覆盖的逐行差分
+    pass_steps = np.zeros(rows * (cols + 1), dtype=np.int32)
+    band_steps = {band: np.zeros(rows * (cols + 1), dtype=np.int32) for band in bands}
+    # 按线段数将作业段分批, 限制中间数组大小
+    segment_counts = np.maximum(runs[:, 2] - runs[:, 1] - 1, 1)
+    long_runs = segment_counts > SPAN_BATCH_SIZE
+    batches = (np.cumsum(segment_counts) - segment_counts) // SPAN_BATCH_SIZE
+    for batch in np.unique(batches[~long_runs]):
+        batch_runs = runs[(batches == batch) & ~long_runs]
+        run_index, row, col0, col1 = runs_spans(points, batch_runs, half_width, bounds, cell_size, (rows, cols))
+        add_spans(pass_steps, row, col0, col1, cols)
+        span_bands = batch_runs[run_index, 0]
+        for band in bands:
+            in_band = span_bands == band
+            add_spans(band_steps[band], row[in_band], col0[in_band], col1[in_band], cols)
+    pass_count = np.cumsum(pass_steps.reshape(rows, cols + 1), axis=1)[:, :cols].astype(np.uint16)
+    band_masks = {band: np.cumsum(band_steps[band].reshape(rows, cols + 1), axis=1)[:, :cols] > 0 for band in bands}
+
+    # 超长作业段在其所在窗口内分批绘制, 同一作业段自身重叠只计一次
+    for band, start, stop in runs[long_runs]:
+        run_points = points[start:stop]
+        row0, row1, col0, col1 = line_window(run_points, half_width, bounds, cell_size, (rows, cols))
+        if row0 >= row1 or col0 >= col1:
+            continue
+        window_bounds = (bounds[0] + col0 * cell_size, 0.0, 0.0, bounds[3] - row0 * cell_size)
+        run_mask = np.zeros((row1 - row0, col1 - col0), dtype=bool)
+        draw_swath(run_mask, run_points, half_width, window_bounds, cell_size)
+        pass_count[row0:row1, col0:col1] += run_mask
+        if band in band_masks:
+            band_masks[band][row0:row1, col0:col1] |= run_mask
+
+    # 各作业段缓冲区周长之和, 用于估计误差上界
+    distances = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(points, axis=0).T)))) if len(points) else np.zeros(1)
+    run_lengths = distances[runs[:, 2] - 1] - distances[runs[:, 1]] if len(runs) else np.zeros(0)
+    band_perimeters = {band: float(np.sum(2 * run_lengths[runs[:, 0] == band] + 2 * math.pi * half_width))
+                       for band in bands}
+
+    # 农机运动轨迹覆盖
+    activity_mask = np.zeros((rows, cols), dtype=bool)
+    if len(points):
+        draw_swath(activity_mask, points, half_width, bounds, cell_size)
+    activity_length = float(np.hypot(*np.diff(points, axis=0).T).sum()) if len(points) > 1 else 0.0
+
+    # 与矢量计算一致, 运动覆盖面积扣除一个端点圆的面积, 没有轨迹点时为 0
+    activity_area = float(np.count_nonzero(activity_mask)) * cell_area - math.pi * half_width ** 2 if len(points) else 0.0
+    band_areas = {band: float(np.count_nonzero(band_masks[band])) * cell_area for band in bands}
+    union_area = float(np.count_nonzero(pass_count)) * cell_area
+    gross_area = float(pass_count.sum(dtype=np.int64)) * cell_area
+    overlap_area = gross_area - union_area
+    multi_pass_area = float(np.count_nonzero(pass_count >= 2)) * cell_area
+
+    # 栅格中心采样时, 多算的部分位于边界外侧半个栅格对角线以内, 少算的部分位于边界内侧半个栅格对角线以内,
+    # 面积误差不超过两者中的较大者, 误差上界为边界长度 × 半个栅格对角线
+    half_diagonal = cell_size * math.sqrt(2) / 2
+    total_perimeter = sum(band_perimeters.values())
+    # 重复作业面积为各作业段面积之和减去并集面积: 并集的多算(少算)部分必然也是某个作业段的多算(少算)部分, 两者部分抵消,
+    # 误差上界与作业段面积之和相同
+    error_bounds = {
+        'activity_area': (2 * activity_length + 2 * math.pi * half_width) * half_diagonal,
+        'band_areas': {band: band_perimeters[band] * half_diagonal for band in bands},
+        'union_area': total_perimeter * half_diagonal,
+        'gross_area': total_perimeter * half_diagonal,
+        'overlap_area': total_perimeter * half_diagonal,
+    }
+
+    return RasterCoverage(pass_count, band_masks, activity_mask, bounds, cell_size, activity_area, band_areas,
+                          union_area, gross_area, overlap_area, multi_pass_area, error_bounds)
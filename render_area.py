@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+import zlib
+import struct
+import argparse
+import numpy as np
+import shapely
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.path import Path
+from matplotlib.patches import PathPatch
+import cal_area as ca
+import raster_area
+
+"""
+python render_area.py --track_data ./xinxiang_chongming_track.json --field_data ./chongming_field.json --output ./coverage.png
+python render_area.py --track_data ./xinxiang_chongming_track.json --field_data ./chongming_field.json --output ./coverage_grid.png --raster
+"""
+
+# 各档位覆盖范围颜色
+BAND_COLORS = {ca.SHALLOW_BAND: 'blue', ca.DEEP_BAND: 'green'}
+# 地块边界和轨迹颜色
+FIELD_COLOR = 'orange'
+TRACK_COLOR = 'black'
+# 栅格导出时各像素值对应的 RGBA 颜色: 0 未作业, 1 浅耕, 2 深耕, 3 深耕和浅耕都有
+GRID_PALETTE = np.array([
+    [0, 0, 0, 0],
+    [0, 0, 255, 160],
+    [0, 128, 0, 160],
+    [0, 128, 128, 200],
+], dtype=np.uint8)
+
+
+def geometry_path(geometry):
+    """
+    将(多)多边形的全部环合成一条复合路径, 整个几何对象只需一个图形元素
+
+    :param geometry: 多边形或多多边形
+    :return: matplotlib 路径
+    """
+    rings = shapely.get_rings(shapely.get_parts(geometry))
+    coords, ring_index = shapely.get_coordinates(rings, return_index=True)
+    if len(coords) == 0:
+        return Path(np.empty((0, 2)))
+    codes = np.full(len(coords), Path.LINETO, dtype=Path.code_type)
+    starts = np.flatnonzero(np.diff(ring_index, prepend=-1))
+    codes[starts] = Path.MOVETO
+    codes[np.append(starts[1:], len(coords)) - 1] = Path.CLOSEPOLY
+    return Path(coords, codes)
+
+
+def render_coverage(geometry, output_path, title=None, draw_points=True, dpi=150, figsize=(8, 8)):
+    """
+    无界面绘制作业覆盖图并保存为图片, 直接使用 track_area 返回的几何对象, 不重复计算;
+    各档位覆盖范围各为一个图形元素, 不使用 pyplot 全局状态, 可在多进程中批量绘制
+
+    :param geometry: cal_area.CoverageGeometry 几何对象
+    :param output_path: 输出图片路径
+    :param title: 图片标题
+    :param draw_points: 是否绘制地块范围内轨迹点
+    :param dpi: 图片分辨率
+    :param figsize: 图片尺寸(英寸)
+    """
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    if geometry.raster is not None:
+        # 栅格计算结果直接按栅格绘制
+        grid = raster_grid(geometry.raster)
+        min_x, min_y, max_x, max_y = geometry.raster.bounds
+        ax.imshow(GRID_PALETTE[grid], extent=(min_x, max_x, min_y, max_y), origin='upper', interpolation='nearest')
+    else:
+        for band, color in BAND_COLORS.items():
+            band_union = geometry.band_unions[band]
+            if not band_union.is_empty:
+                ax.add_patch(PathPatch(geometry_path(band_union), facecolor=color, edgecolor='none', alpha=0.5))
+
+    ax.add_patch(PathPatch(geometry_path(geometry.field_poly), facecolor='none', edgecolor=FIELD_COLOR, linewidth=1.0))
+    points = geometry.filter_points_utm
+    if len(points):
+        ax.plot(points[:, 0], points[:, 1], color=TRACK_COLOR, linewidth=0.5)
+        if draw_points:
+            # 作业段内轨迹点按档位着色
+            point_colors = np.full(len(points), 'red', dtype=object)
+            for band, start, stop in geometry.runs:
+                point_colors[start:stop] = BAND_COLORS[band]
+            ax.scatter(points[:, 0], points[:, 1], c=list(point_colors), s=5, zorder=2)
+
+    ax.set_aspect('equal', 'box')
+    ax.autoscale_view()
+    if title:
+        ax.set_title(title)
+    fig.savefig(output_path, dpi=dpi)
+
+
+def raster_grid(coverage):
+    """
+    将栅格覆盖结果转换为档位编码栅格
+
+    :param coverage: raster_area.RasterCoverage 栅格覆盖结果
+    :return: uint8 栅格, 0 未作业, 1 浅耕, 2 深耕, 3 深耕和浅耕都有
+    """
+    grid = coverage.band_masks[ca.SHALLOW_BAND].astype(np.uint8)
+    grid |= coverage.band_masks[ca.DEEP_BAND].astype(np.uint8) << 1
+    return grid
+
+
+def vector_grid(geometry, cell_size=raster_area.DEFAULT_CELL_SIZE):
+    """
+    将矢量覆盖多边形按栅格中心采样转换为档位编码栅格, 只做点在多边形内判断, 不重复缓冲
+
+    :param geometry: cal_area.CoverageGeometry 几何对象
+    :param cell_size: 栅格边长(米)
+    :return: (uint8 档位编码栅格, 栅格范围 (min_x, min_y, max_x, max_y)), 第 0 行对应 max_y
+    """
+    bounds = shapely.total_bounds([geometry.field_poly, geometry.union_polygon])
+    rows, cols = raster_area.grid_shape(bounds, cell_size)
+    min_x, _, _, max_y = bounds
+    bounds = (min_x, max_y - rows * cell_size, min_x + cols * cell_size, max_y)
+    center_x = min_x + (np.arange(cols) + 0.5) * cell_size
+    center_y = max_y - (np.arange(rows) + 0.5) * cell_size
+    grid_x, grid_y = np.meshgrid(center_x, center_y)
+
+    grid = np.zeros((rows, cols), dtype=np.uint8)
+    for bit, band in enumerate((ca.SHALLOW_BAND, ca.DEEP_BAND)):
+        band_union = geometry.band_unions[band]
+        if band_union.is_empty:
+            continue
+        shapely.prepare(band_union)
+        grid |= shapely.contains_xy(band_union, grid_x, grid_y).astype(np.uint8) << bit
+    return grid, bounds
+
+
+def write_png(path, rgba):
+    """
+    将 RGBA 数组写为 PNG 图片
+
+    :param path: 输出文件路径
+    :param rgba: (行数, 列数, 4) 的 uint8 数组
+    """
+    rows, cols = rgba.shape[:2]
+    # 每行前加过滤类型字节 0
+    raw = np.concatenate((np.zeros((rows, 1), dtype=np.uint8), rgba.reshape(rows, cols * 4)), axis=1).tobytes()
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', cols, rows, 8, 6, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw, 6)))
+        f.write(chunk(b'IEND', b''))
+
+
+def write_world_file(path, bounds, cell_size):
+    """
+    写出栅格图片的坐标文件(world file), 使图片可在 GIS 软件中按投影坐标叠加
+
+    :param path: 坐标文件路径, 如 coverage.pgw
+    :param bounds: 栅格范围 (min_x, min_y, max_x, max_y), 第 0 行对应 max_y
+    :param cell_size: 栅格边长(米)
+    """
+    min_x, _, _, max_y = bounds
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(str(value) for value in (cell_size, 0.0, 0.0, -cell_size, min_x + cell_size / 2,
+                                                   max_y - cell_size / 2)) + '\n')
+
+
+def export_raster(geometry, output_path, cell_size=raster_area.DEFAULT_CELL_SIZE):
+    """
+    将作业覆盖导出为带坐标文件的 PNG 栅格图片, 栅格计算结果直接导出, 矢量结果按栅格中心采样
+
+    :param geometry: cal_area.CoverageGeometry 几何对象
+    :param output_path: 输出 PNG 文件路径, 坐标文件写在同名 .pgw 文件中
+    :param cell_size: 矢量结果采样的栅格边长(米), 栅格计算结果使用其自身的栅格边长
+    :return: (档位编码栅格, 栅格范围, 栅格边长)
+    """
+    if geometry.raster is not None:
+        grid = raster_grid(geometry.raster)
+        bounds = geometry.raster.bounds
+        cell_size = geometry.raster.cell_size
+    else:
+        grid, bounds = vector_grid(geometry, cell_size)
+    write_png(output_path, GRID_PALETTE[grid])
+    write_world_file(output_path.rsplit('.', 1)[0] + '.pgw', bounds, cell_size)
+    return grid, bounds, cell_size
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render coverage of agricultural machinery to an image without a display')
+    parser.add_argument('--track_data', default='./xinxiang_chongming_track.json', help='Track json or binary track file of agricultural machinery')
+    parser.add_argument('--field_data', default='./chongming_field.json', help='Field json file')
+    parser.add_argument('--output', required=True, help='Output PNG file')
+    parser.add_argument('--width', type=float, default=2.3, help='Width of agricultural implement')
+    parser.add_argument('--deep_depth', type=float, default=15.0, help='Deep tillage depth')
+    parser.add_argument('--shallow_depth', type=float, default=12.0, help='Shallow tillage depth')
+    parser.add_argument('--backend', default='vector', choices=('vector', 'raster'), help='Exact vector or fast raster coverage')
+    parser.add_argument('--cell_size', type=float, default=0.2, help='Cell size (m) of the raster backend and raster export')
+    parser.add_argument('--raster', action='store_true', help='Export a georeferenced PNG grid with a world file instead of a map')
+    opt = parser.parse_args()
+
+    with open(opt.field_data, 'r', encoding='utf-8') as f:
+        field_data = json.load(f)
+    result, geometry = ca.track_area(opt.track_data, field_data, opt.width, opt.deep_depth, opt.shallow_depth,
+                                     backend=opt.backend, cell_size=opt.cell_size, return_geometry=True)
+    if opt.raster:
+        export_raster(geometry, opt.output, opt.cell_size)
+    else:
+        render_coverage(geometry, opt.output, title=f'Total cultivation area (mu): {result[5]:.4f}')
+    print(f'Rendered {opt.output}')
@@ -1,36 +1,55 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import json
+import logging
 import argparse
 import cal_area as ca
+import area_cache
+import area_stats
 
 """
-python run_area.py --track_data track_json_data --field_data field_json_data --width 2.3 --deep_depth 15.0 --shallow_depth 12.0
+python run_area.py --track_data ./xinxiang_chongming_track.json --field_data ./chongming_field.json --width 2.3 --deep_depth 15.0 --shallow_depth 12.0
 """
 
-# 获取计算地块内农机作业面积时必须的一些参数
-# 打开轨迹 GeoJSON 文件并读取内容
-track_json_path = "./xinxiang_chongming_track.json"
-with open(track_json_path, 'r', encoding='utf-8') as f:
-    track_geojson_data = json.load(f)
-
-# 打开地块 GeoJSON 文件并读取内容
-field_json_path = "./chongming_field.json"
-with open(field_json_path, 'r', encoding='utf-8') as f:
-    field_geojson_data = json.load(f)
+if __name__ == '__main__':
+    # 获取计算地块内农机作业面积时必须的一些参数
+    parser = argparse.ArgumentParser(description='Calculate operation area agricultural machinery of from track data')
+    parser.add_argument('--track_data', default='./xinxiang_chongming_track.json', help='Track json or binary track file of agricultural machinery')
+    parser.add_argument('--field_data', default='./chongming_field.json', help='Field json file')
+    parser.add_argument('--width', type=float, default=2.3, help='Width of agricultural implement')
+    parser.add_argument('--deep_depth', type=float, default=15.0, help='Deep tillage depth')
+    parser.add_argument('--shallow_depth', type=float, default=12.0, help='Shallow tillage depth')
+    parser.add_argument('--tile_size', type=float, default=None, help='Tile size (m) of the tiled union engine')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes of the tiled union engine')
+    parser.add_argument('--backend', default='vector', choices=('vector', 'raster'), help='Exact vector or fast raster coverage')
+    parser.add_argument('--cell_size', type=float, default=0.2, help='Cell size (m) of the raster backend')
+    parser.add_argument('--cache_path', default=None, help='Sqlite file caching results across runs')
+    parser.add_argument('--stats', action='store_true', help='Log wall time and counters of every stage')
+    parser.add_argument('--max_area_error', type=float, default=None, help='Relative area error allowed when decimating the track, e.g. 0.001')
+    parser.add_argument('--band_thresholds', type=float, nargs='+', default=None, help='Increasing depth thresholds of the tillage bands, the highest band is deep, e.g. 12 13.5 15')
+    opt = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
 
-parser = argparse.ArgumentParser(description='Calculate operation area agricultural machinery of from track data')
-parser.add_argument('--track_data', default=track_geojson_data, help='Track data of agricultural machinery')
-parser.add_argument('--field_data', default=field_geojson_data, help='Field json data')
-parser.add_argument('--width', type=float, default=2.3, help='Width of agricultural implement')
-parser.add_argument('--deep_depth', type=float, default=15.0, help='Deep tillage depth')
-parser.add_argument('--shallow_depth', type=float, default=12.0, help='Shallow tillage depth')
+    # 轨迹文件由 track_area 读取(JSON 流式读取, 二进制内存映射), 读取耗时计入统计
+    track_data = opt.track_data
 
-opt = parser.parse_args()
+    # 打开地块 GeoJSON 文件并读取内容
+    with open(opt.field_data, 'r', encoding='utf-8') as f:
+        field_data = json.load(f)
 
-if __name__ == '__main__':
-    track_length, field_area, total_area, cultivation_deep_area, cultivation_shallow_area, cultivation_total_area, overlap_total_area = ca.track_area(
-        opt.track_data, opt.field_data, opt.width, opt.deep_depth, opt.shallow_depth)
+    options = dict(tile_size=opt.tile_size, workers=opt.workers, backend=opt.backend, cell_size=opt.cell_size,
+                   max_area_error=opt.max_area_error, band_thresholds=opt.band_thresholds)
+    if opt.stats:
+        options['stats'] = area_stats.AreaStats(hook=area_stats.log_stage)
+    if opt.cache_path:
+        # 相同轨迹、地块和参数的结果直接从缓存读取
+        cache = area_cache.AreaCache(opt.cache_path)
+        result = cache.track_area(track_data, field_data, opt.width, opt.deep_depth, opt.shallow_depth, **options)
+        logging.info('Result cache: %s', cache.stats())
+        cache.close()
+    else:
+        result = ca.track_area(track_data, field_data, opt.width, opt.deep_depth, opt.shallow_depth, **options)
+    track_length, field_area, total_area, cultivation_deep_area, cultivation_shallow_area, cultivation_total_area, overlap_total_area = result
     print(f'Track length (km): {track_length:.4f}')
     print(f'Activity area (mu): {total_area:.4f}')
     print(f'Field area (mu): {field_area:.4f}')
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import math
+import numpy as np
+from shapely.geometry import Point, LineString, GeometryCollection
+
+# 作业档位编号, 对应耕深阈值 (浅耕阈值, 深耕阈值)
+BAND_IDLE = 0
+SHALLOW_BAND = 1
+DEEP_BAND = 2
+# 缓冲区四分之一圆弧的分段数(与 shapely buffer 默认值一致)
+BUFFER_QUAD_SEGS = 16
+# 作业段航向变化超过该角度时认为作业段可能折返重叠, 需构建精确缓冲区
+MAX_SIMPLE_HEADING_SPAN = math.pi / 2
+
+
+def band_thresholds(deep_depth, shallow_depth, thresholds=None):
+    """
+    获取作业档位的耕深阈值表
+
+    :param deep_depth: 农具深耕阈值
+    :param shallow_depth: 农具浅耕阈值
+    :param thresholds: 递增的耕深阈值表, 如 (浅耕阈值, 中耕阈值, 深耕阈值); 为 None 时为 (浅耕阈值, 深耕阈值)
+    :return: 耕深阈值元组
+    """
+    if thresholds is None:
+        return min(shallow_depth, deep_depth), deep_depth
+    thresholds = tuple(float(value) for value in thresholds)
+    if len(thresholds) < 2 or any(upper < lower for lower, upper in zip(thresholds, thresholds[1:])):
+        raise ValueError("ERROR!!! Band thresholds must be at least two non-decreasing depths: {}".format(thresholds))
+    return thresholds
+
+
+def table_bands(thresholds):
+    """
+    获取耕深阈值表对应的作业档位编号, 最高一档为深耕, 其余为浅耕
+
+    :param thresholds: 耕深阈值表
+    :return: 作业档位编号元组, 默认阈值表为 (SHALLOW_BAND, DEEP_BAND)
+    """
+    return tuple(range(1, len(thresholds) + 1))
+
+
+def report_runs(runs, bands):
+    """
+    将作业段档位归并为深耕(最高一档)和浅耕(其余作业档位), 用于输出深耕、浅耕作业面积
+
+    :param runs: 作业段数组, 每行为 (档位, 起始索引, 结束索引)
+    :param bands: 耕深阈值表对应的作业档位编号
+    :return: 档位为 SHALLOW_BAND 或 DEEP_BAND 的作业段数组, 默认阈值表时即为原作业段数组
+    """
+    if tuple(bands) == (SHALLOW_BAND, DEEP_BAND):
+        return runs
+    runs = runs.copy()
+    runs[:, 0] = np.where(runs[:, 0] == bands[-1], DEEP_BAND, SHALLOW_BAND)
+    return runs
+
+
+def depth_bands(depths, thresholds):
+    """
+    按耕深阈值划分作业档位, 小于最低阈值为未作业(0), thresholds[i-1] <= 耕深 < thresholds[i] 为第 i 档
+
+    :param depths: 耕深数组
+    :param thresholds: 递增的耕深阈值序列, 如 (浅耕阈值, 深耕阈值)
+    :return: 作业档位数组
+    """
+    depths = np.asarray(depths)
+    # 阈值按耕深的浮点精度比较, 以免 float32 耕深恰好等于阈值时被划入低一档
+    threshold_dtype = depths.dtype if np.issubdtype(depths.dtype, np.floating) else np.float64
+    bands = np.digitize(depths, np.asarray(thresholds, dtype=threshold_dtype))
+    # 耕深缺失时按未作业处理
+    bands[np.isnan(depths)] = BAND_IDLE
+    return bands
+
+
+def segment_runs(bands):
+    """
+    按作业档位变化一次性切分连续作业段
+
+    :param bands: 作业档位数组
+    :return: 作业段数组, 每行为 (档位, 起始索引, 结束索引), 结束索引不包含在内
+    """
+    bands = np.asarray(bands)
+    if len(bands) == 0:
+        return np.empty((0, 3), dtype=np.intp)
+
+    # 档位发生变化的位置即为作业段边界
+    boundaries = np.flatnonzero(bands[1:] != bands[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    stops = np.concatenate((boundaries, [len(bands)]))
+    run_bands = bands[starts]
+
+    # 只保留作业档位的作业段
+    working = run_bands != BAND_IDLE
+    return np.column_stack((run_bands[working], starts[working], stops[working])).astype(np.intp)
+
+
+def run_buffer(run_points, half_width):
+    """
+    创建单个作业段的作业幅宽缓冲区多边形
+
+    :param run_points: 作业段投影坐标数组
+    :param half_width: 农具作业幅宽的一半长度
+    :return: 作业段多边形
+    """
+    if len(run_points) == 1:
+        return Point(run_points[0]).buffer(half_width)
+    return LineString(run_points).buffer(half_width)
+
+
+def run_skeletons(points, runs):
+    """
+    创建各作业段的中心线几何对象, 单点作业段为点
+
+    :param points: 投影坐标数组
+    :param runs: 作业段数组, 每行为 (档位, 起始索引, 结束索引)
+    :return: 作业段中心线几何对象列表
+    """
+    skeletons = []
+    for _, start, stop in runs:
+        if stop - start == 1:
+            skeletons.append(Point(points[start]))
+        else:
+            skeletons.append(LineString(points[start:stop]))
+    return skeletons
+
+
+def runs_buffer(points, runs, half_width):
+    """
+    一次性创建多个作业段缓冲区的并集多边形
+
+    :param points: 投影坐标数组
+    :param runs: 作业段数组, 每行为 (档位, 起始索引, 结束索引)
+    :param half_width: 农具作业幅宽的一半长度
+    :return: 作业段缓冲区的并集多边形
+    """
+    # 线集合的缓冲区即为各条线缓冲区的并集
+    return GeometryCollection(run_skeletons(points, runs)).buffer(half_width)
+
+
+def fillet_area(angles, half_width):
+    """
+    计算缓冲区圆弧扇形的面积, 与 shapely 按 BUFFER_QUAD_SEGS 分段逼近圆弧的方式一致
+
+    :param angles: 圆弧角度数组(弧度)
+    :param half_width: 农具作业幅宽的一半长度
+    :return: 扇形面积数组
+    """
+    angles = np.asarray(angles, dtype=np.float64)
+    quantum = math.pi / 2 / BUFFER_QUAD_SEGS
+    segments = np.maximum(np.ceil(angles / quantum - 1e-9), 1)
+    return np.where(angles > 0, half_width ** 2 / 2 * segments * np.sin(angles / segments), 0.0)
+
+
+def swath_area(run_points, half_width):
+    """
+    解析计算无自重叠作业段的缓冲区面积: 幅宽 × 长度 + 两端半圆 + 各转角处外侧扇形 - 内侧重叠
+
+    :param run_points: 作业段投影坐标数组
+    :param half_width: 农具作业幅宽的一半长度
+    :return: 作业段缓冲区面积, 作业段可能折返自重叠时返回 None
+    """
+    cap_area = 2 * float(fillet_area(math.pi, half_width))
+    deltas = np.diff(run_points, axis=0)
+    lengths = np.hypot(deltas[:, 0], deltas[:, 1])
+    # 去除停车等原因产生的零长度线段
+    moving = lengths > 1e-9
+    deltas = deltas[moving]
+    lengths = lengths[moving]
+    if len(lengths) == 0:
+        return cap_area
+
+    # 各转角处的转向角
+    headings = np.arctan2(deltas[:, 1], deltas[:, 0])
+    turns = (np.diff(headings) + math.pi) % (2 * math.pi) - math.pi
+    # 航向变化范围过大, 作业段可能折返
+    heading_offsets = np.concatenate(([0.0], np.cumsum(turns)))
+    if heading_offsets.max() - heading_offsets.min() > MAX_SIMPLE_HEADING_SPAN:
+        return None
+    # 转角内侧重叠区域超出相邻线段长度, 作业段局部自重叠
+    turn_angles = np.abs(turns)
+    inner_lengths = half_width * np.tan(turn_angles / 2)
+    required_lengths = np.zeros(len(lengths))
+    required_lengths[:-1] += inner_lengths
+    required_lengths[1:] += inner_lengths
+    if np.any(required_lengths > lengths):
+        return None
+
+    joint_areas = fillet_area(turn_angles, half_width) - half_width * inner_lengths
+    return float(2 * half_width * lengths.sum() + cap_area + joint_areas.sum())
+
+
+def run_gross_area(run_points, half_width):
+    """
+    计算单个作业段的缓冲区面积, 无自重叠时使用解析公式, 否则构建精确缓冲区
+
+    :param run_points: 作业段投影坐标数组
+    :param half_width: 农具作业幅宽的一半长度
+    :return: 作业段缓冲区面积
+    """
+    area = swath_area(run_points, half_width)
+    if area is None:
+        area = run_buffer(run_points, half_width).area
+    return area
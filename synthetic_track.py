@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import math
+import numpy as np
+import coor_utils
+
+# 合成地块的参考位置(崇明)
+ORIGIN_LON = 121.50
+ORIGIN_LAT = 31.66
+# 地头掉头半圆的顶点数
+TURN_SEGMENTS = 16
+# 轨迹起始时间戳(秒)
+START_TIME = 1679492866
+
+
+def boustrophedon_path(passes, pass_length, spacing):
+    """
+    生成往复作业路径的折线顶点: 各作业行沿 y 方向往返, 行间在地头以半圆掉头
+
+    :param passes: 作业行数
+    :param pass_length: 作业行长度(米)
+    :param spacing: 相邻作业行间距(米)
+    :return: (顶点坐标数组, 顶点是否位于作业行上的布尔数组, 顶点所属作业行序号数组)
+    """
+    radius = spacing / 2.0
+    angles = np.linspace(math.pi, 0.0, TURN_SEGMENTS + 1)[1:-1]
+    vertices = []
+    working = []
+    pass_index = []
+    for i in range(passes):
+        x = i * spacing
+        y0, y1 = (0.0, pass_length) if i % 2 == 0 else (pass_length, 0.0)
+        vertices += [(x, y0), (x, y1)]
+        working += [True, True]
+        pass_index += [i, i]
+        if i < passes - 1:
+            # 在作业行末端外侧掉头, 上端向上、下端向下
+            sign = 1.0 if i % 2 == 0 else -1.0
+            turn_x = x + radius + radius * np.cos(angles)
+            turn_y = y1 + sign * radius * np.sin(angles)
+            vertices += list(zip(turn_x, turn_y))
+            working += [False] * len(angles)
+            pass_index += [i] * len(angles)
+    return np.array(vertices), np.array(working), np.array(pass_index)
+
+
+def generate_workload(points=10000, passes=10, width=2.3, deep_depth=15.0, shallow_depth=12.0, step=1.0,
+                      shallow_ratio=0.3, switch_rate=0.0, jitter=0.3, parks=0, park_points=60, overlap=0.05, seed=0):
+    """
+    生成合成的地块和农机轨迹: 往复作业行覆盖矩形地块, 地头掉头时提升农具, 可配置耕深切换、定位抖动和停车
+
+    :param points: 轨迹点数
+    :param passes: 作业行数, 不切换耕深时即为作业段数
+    :param width: 农具作业幅宽
+    :param deep_depth: 农具深耕阈值
+    :param shallow_depth: 农具浅耕阈值
+    :param step: 行驶时相邻轨迹点间距(米), 作业行长度由轨迹点数推算
+    :param shallow_ratio: 浅耕作业行的比例
+    :param switch_rate: 作业行内每个轨迹点切换深耕/浅耕的概率
+    :param jitter: 定位抖动标准差(米)
+    :param parks: 停车次数
+    :param park_points: 每次停车的轨迹点数
+    :param overlap: 相邻作业行的重叠比例
+    :param seed: 随机数种子
+    :return: (track_io.load_track 同样格式的字段数组字典, ESRI JSON 地块边界数据)
+    """
+    rng = np.random.default_rng(seed)
+    spacing = width * (1.0 - overlap)
+    moving_points = points - parks * park_points
+    if moving_points < 2:
+        raise ValueError("ERROR!!! Too few moving points: {}".format(moving_points))
+
+    # 按轨迹点数推算作业行长度, 掉头路径长度为半圆周长
+    turn_length = math.pi * spacing / 2.0
+    pass_length = max((moving_points - 1) * step / passes - turn_length, step)
+    vertices, vertex_working, vertex_pass = boustrophedon_path(passes, pass_length, spacing)
+
+    # 沿路径等间距重采样
+    distances = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(vertices, axis=0).T))))
+    samples = np.linspace(0.0, distances[-1], moving_points)
+    x = np.interp(samples, distances, vertices[:, 0])
+    y = np.interp(samples, distances, vertices[:, 1])
+    segment = np.clip(np.searchsorted(distances, samples, side='right') - 1, 0, len(vertices) - 2)
+    working = vertex_working[segment] & vertex_working[segment + 1]
+    pass_of_point = vertex_pass[segment]
+
+    # 作业行按比例选择浅耕, 行内按概率切换深耕/浅耕
+    shallow_pass = rng.random(passes) < shallow_ratio
+    toggle_count = np.cumsum(rng.random(moving_points) < switch_rate)
+    parity = toggle_count - toggle_count[np.searchsorted(pass_of_point, pass_of_point)]
+    shallow = shallow_pass[pass_of_point] ^ (parity % 2 == 1)
+    deep = np.where(shallow, (shallow_depth + deep_depth) / 2.0, deep_depth + 5.0)
+    deep = np.where(working, deep + rng.normal(0.0, 0.3, moving_points), rng.uniform(0.0, 3.0, moving_points))
+
+    # 停车: 在随机位置重复轨迹点
+    repeats = np.ones(moving_points, dtype=np.intp)
+    if parks:
+        np.add.at(repeats, rng.integers(0, moving_points, parks), park_points)
+    index = np.repeat(np.arange(moving_points), repeats)
+    parked = np.zeros(points, dtype=bool)
+    parked[1:] = index[1:] == index[:-1]
+    x = x[index] + rng.normal(0.0, jitter, points)
+    y = y[index] + rng.normal(0.0, jitter, points)
+    deep = deep[index]
+    speeds = np.where(parked, 0.0, step * 3.6)
+
+    # 由投影坐标转换为经纬度
+    transformer = coor_utils.get_transformer(coor_utils.check_utm(ORIGIN_LON))
+    origin_x, origin_y = transformer.transform(ORIGIN_LON, ORIGIN_LAT)
+    lons, lats = transformer.transform(origin_x + x, origin_y + y, direction='INVERSE')
+    track_data = {
+        'lng': np.asarray(lons, dtype=np.float64),
+        'lat': np.asarray(lats, dtype=np.float64),
+        'deep': deep.astype(np.float32),
+        'gps_time': START_TIME + np.arange(points, dtype=np.int64),
+        'veo': speeds.astype(np.float32),
+    }
+
+    # 地块为外扩掉头范围的矩形, ESRI 外环为顺时针
+    margin = spacing + width
+    corners_x = origin_x + np.array([-margin, -margin, (passes - 1) * spacing + margin, (passes - 1) * spacing + margin, -margin])
+    corners_y = origin_y + np.array([-margin, pass_length + margin, pass_length + margin, -margin, -margin])
+    ring_lons, ring_lats = transformer.transform(corners_x, corners_y, direction='INVERSE')
+    field_data = {
+        'geometryType': 'esriGeometryPolygon',
+        'features': [{
+            'attributes': {'OID': 1, 'Name': 'synthetic'},
+            'geometry': {'rings': [[[float(lon), float(lat)] for lon, lat in zip(ring_lons, ring_lats)]]},
+        }],
+    }
+    return track_data, field_data
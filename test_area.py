@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pytest
+import cal_area as ca
+
+"""
+python -m pytest -q test_area.py
+"""
+
+# 示例轨迹
+TRACK_PATH = './xinxiang_chongming_track.json'
+# 农具作业幅宽、深耕阈值、浅耕阈值
+WIDTH = 2.3
+DEEP_DEPTH = 15.0
+SHALLOW_DEPTH = 12.0
+# 同一算法不同计算方式之间面积的最大绝对偏差(亩)
+AREA_TOLERANCE = 1e-8
+
+
+@pytest.mark.parametrize('tile_size', [200.0, 37.0])
+def test_tiled_union_matches_global(jittered_workload, tile_size):
+    track_data, field_data = jittered_workload
+    expected = ca.track_area(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    result = ca.track_area(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, tile_size=tile_size)
+    assert result == pytest.approx(expected, abs=AREA_TOLERANCE)
+
+
+def test_tiled_union_matches_global_on_sample(field_data):
+    expected = ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    result = ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, tile_size=50.0, workers=2)
+    assert result == pytest.approx(expected, abs=AREA_TOLERANCE)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+import area_cache
+import area_stats
+import cal_area as ca
+import track_io
+
+"""
+python -m pytest -q test_area_cache.py
+"""
+
+# 示例轨迹
+TRACK_PATH = './xinxiang_chongming_track.json'
+# 农具作业幅宽、深耕阈值、浅耕阈值
+WIDTH = 2.3
+DEEP_DEPTH = 15.0
+SHALLOW_DEPTH = 12.0
+
+
+@pytest.fixture(scope='module')
+def track_data():
+    return track_io.load_track(TRACK_PATH)
+
+
+def hit_counts(cache):
+    stats = cache.stats()
+    return stats['memory_hits'], stats['disk_hits'], stats['misses'], stats['evictions']
+
+
+def test_memory_and_disk_hits(field_data, track_data, tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    expected = ca.track_area(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    cache = area_cache.AreaCache(path)
+    assert cache.track_area(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH) == pytest.approx(expected)
+    assert cache.track_area(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH) == pytest.approx(expected)
+    assert hit_counts(cache) == (1, 0, 1, 0)
+    cache.close()
+
+    # 重新打开后从磁盘缓存命中
+    cache = area_cache.AreaCache(path)
+    assert cache.track_area(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH) == pytest.approx(expected)
+    assert hit_counts(cache) == (0, 1, 0, 0)
+    assert cache.stats()['hit_rate'] == 1.0
+    cache.close()
+
+
+def test_eviction(field_data, track_data, tmp_path):
+    cache = area_cache.AreaCache(str(tmp_path / 'cache.sqlite'), memory_size=1, max_disk_bytes=300)
+    for width in (2.0, 2.1, 2.2):
+        cache.track_area(track_data, field_data, width, DEEP_DEPTH, SHALLOW_DEPTH)
+    assert cache.stats()['memory_entries'] == 1
+    assert cache.stats()['evictions'] > 0
+    # 最早的结果已从内存和磁盘淘汰, 再次查询为未命中
+    cache.track_area(track_data, field_data, 2.0, DEEP_DEPTH, SHALLOW_DEPTH)
+    assert cache.stats()['misses'] == 4
+    cache.close()
+
+
+def test_default_options_share_key(field_data, track_data):
+    key = area_cache.cache_key(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    assert area_cache.cache_key(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, backend='vector',
+                                cell_size=0.2, tile_size=None, workers=4) == key
+    assert area_cache.cache_key(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, backend='raster') != key
+    assert area_cache.cache_key(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, band_thresholds=[8, 15]) == \
+        area_cache.cache_key(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, band_thresholds=(8.0, 15.0))
+
+
+def test_speed_is_hashed_for_decimation(field_data, track_data):
+    slow = dict(track_data, veo=np.zeros_like(track_data['veo']))
+    assert area_cache.cache_key(slow, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH) == \
+        area_cache.cache_key(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    assert area_cache.cache_key(slow, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, max_area_error=0.01) != \
+        area_cache.cache_key(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, max_area_error=0.01)
+
+
+def test_stats_record_cache_stage(field_data, track_data):
+    cache = area_cache.AreaCache()
+    stats = area_stats.AreaStats()
+    cache.track_area(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, stats=stats)
+    assert stats.stages[0].name == 'cache' and stats.stages[0].counters['hit'] is False
+    assert 'union' in stats.as_dict()
+
+    stats = area_stats.AreaStats()
+    cache.track_area(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, stats=stats)
+    assert [stage.name for stage in stats.stages] == ['cache']
+    assert stats.stages[0].counters['hit'] is True
+
+
+def test_return_geometry_bypasses_cache(field_data, track_data):
+    cache = area_cache.AreaCache()
+    result, geometry = cache.track_area(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, return_geometry=True)
+    assert result == pytest.approx(ca.track_area(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH))
+    assert geometry.union_polygon is not None
+    assert hit_counts(cache) == (0, 0, 0, 0)
+    assert cache.stats()['memory_entries'] == 0
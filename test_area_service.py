@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import json
+import signal
+import asyncio
+import pytest
+import area_service
+import synthetic_track
+
+"""
+python -m pytest -q test_area_service.py
+"""
+
+# 等待超时任务在工作进程中结束的最长时间(秒)
+SETTLE_TIMEOUT = 60.0
+
+
+@pytest.fixture(scope='module')
+def area_body():
+    track_data, field_data = synthetic_track.generate_workload(4000, 8)
+    payload = {'track': {column: values.tolist() for column, values in track_data.items()}, 'field': field_data,
+               'width': 2.3, 'deep_depth': 15.0, 'shallow_depth': 12.0}
+    return json.dumps(payload).encode('utf-8')
+
+
+@pytest.fixture
+def service():
+    service = area_service.AreaService(workers=1, max_pending=1, warm_zones=())
+    service.warm_up()
+    yield service
+    service.close()
+
+
+async def wait_released(service):
+    """
+    等待在途任务全部结束、名额全部释放
+    """
+    for _ in range(int(SETTLE_TIMEOUT / 0.05)):
+        if not service.slots.locked():
+            return
+        await asyncio.sleep(0.05)
+    raise AssertionError('Slot was never released')
+
+
+def test_computes_area(service, area_body):
+    status, record = asyncio.run(service.handle_area(area_body))
+    assert status == 200
+    assert record['status'] == 'ok'
+    assert record['total_area'] > 0
+    assert service.counters['ok'] == 1
+
+
+def test_rejects_when_pending_limit_reached(service, area_body):
+    async def run():
+        return await asyncio.gather(service.handle_area(area_body), service.handle_area(area_body))
+
+    statuses = sorted(status for status, _ in asyncio.run(run()))
+    assert statuses == [200, 503]
+    assert service.counters['rejected'] == 1
+
+
+def test_timeout_keeps_slot_until_work_finishes(service, area_body):
+    service.timeout = 0.001
+
+    async def run():
+        status, _ = await service.handle_area(area_body)
+        # 超时后任务仍在工作进程中计算, 名额未释放, 新请求被拒绝
+        assert service.slots.locked()
+        rejected, _ = await service.handle_area(area_body)
+        await wait_released(service)
+        return status, rejected
+
+    assert asyncio.run(run()) == (504, 503)
+    assert service.counters['timeouts'] == 1
+
+
+def test_broken_pool_answers_503_and_restarts(service, area_body):
+    os.kill(service.executor.submit(os.getpid).result(), signal.SIGKILL)
+
+    async def run():
+        status, _ = await service.handle_area(area_body)
+        await wait_released(service)
+        return status, (await service.handle_area(area_body))[0]
+
+    assert asyncio.run(run()) == (503, 200)
+    assert service.counters['pool_restarts'] == 1
+
+
+def test_rejects_track_paths(service):
+    body = json.dumps({'track': '../etc/passwd', 'field': {}, 'width': 2.3, 'deep_depth': 15.0,
+                       'shallow_depth': 12.0}).encode('utf-8')
+    status, record = asyncio.run(service.handle_area(body))
+    assert status == 400
+    assert 'not accepted' in record['error']
+
+
+def test_request_track_stays_in_track_dir(tmp_path):
+    assert area_service.request_track('a/track.bin', str(tmp_path)) == str(tmp_path / 'a' / 'track.bin')
+    with pytest.raises(ValueError):
+        area_service.request_track('../track.bin', str(tmp_path))
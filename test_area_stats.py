@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+import pytest
+import area_stats
+import cal_area as ca
+
+"""
+python -m pytest -q test_area_stats.py
+"""
+
+# 示例轨迹
+TRACK_PATH = './xinxiang_chongming_track.json'
+# 农具作业幅宽、深耕阈值、浅耕阈值
+WIDTH = 2.3
+DEEP_DEPTH = 15.0
+SHALLOW_DEPTH = 12.0
+# 并集步骤的顶点数计数
+VERTEX_COUNTERS = ('deep_vertices', 'shallow_vertices', 'total_vertices')
+
+
+def test_stats_do_not_change_result(field_data):
+    expected = ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    stages = []
+    stats = area_stats.AreaStats(hook=stages.append)
+    assert ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, stats=stats) == expected
+    assert [stage.name for stage in stages] == [stage.name for stage in stats.stages]
+    assert {'runs', 'activity', 'gross', 'union'} <= set(stats.as_dict())
+    assert stats.total_time > 0
+
+
+@pytest.mark.parametrize('options', [{}, {'return_geometry': True}, {'tile_size': 50.0}])
+def test_union_vertices_on_every_path(field_data, options):
+    stats = area_stats.AreaStats()
+    ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, stats=stats, **options)
+    union = stats.as_dict()['union']
+    assert all(union[name] > 0 for name in VERTEX_COUNTERS)
+
+
+def test_tiled_vertices_include_tile_cuts(field_data):
+    stats = area_stats.AreaStats()
+    ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, stats=stats)
+    tiled_stats = area_stats.AreaStats()
+    ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, tile_size=50.0, stats=tiled_stats)
+    for name in VERTEX_COUNTERS:
+        assert tiled_stats.as_dict()['union'][name] >= stats.as_dict()['union'][name]
+
+
+def test_decimation_counters_and_log(field_data, caplog):
+    stats = area_stats.AreaStats()
+    ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, max_area_error=0.01, stats=stats)
+    decimate = stats.as_dict()['decimate']
+    assert decimate['output_points'] < decimate['input_points']
+    assert decimate['max_deviation'] <= decimate['tolerance']
+
+    # 未开启统计时抽稀结果写入日志
+    with caplog.at_level(logging.INFO, logger='cal_area'):
+        ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, max_area_error=0.01)
+    assert any('Decimated track points: {} -> {}'.format(decimate['input_points'], decimate['output_points'])
+               in record.getMessage() for record in caplog.records)
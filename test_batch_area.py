@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import json
+import pytest
+import cal_area as ca
+import batch_area
+
+"""
+python -m pytest -q test_batch_area.py
+"""
+
+# 示例轨迹和地块
+TRACK_PATH = os.path.abspath('./xinxiang_chongming_track.json')
+FIELD_PATH = os.path.abspath('./chongming_field.json')
+
+
+def job_line(job_id, **fields):
+    job = {'id': job_id, 'track_path': TRACK_PATH, 'field_path': FIELD_PATH, 'width': 2.3, 'deep_depth': 15.0,
+           'shallow_depth': 12.0}
+    job.update(fields)
+    return json.dumps(job)
+
+
+def read_records(output_path):
+    with open(output_path, 'r', encoding='utf-8') as f:
+        return {record['id']: record for record in map(json.loads, f)}
+
+
+def test_bad_rows_fail_only_their_jobs(field_data, tmp_path):
+    manifest_path = str(tmp_path / 'jobs.jsonl')
+    output_path = str(tmp_path / 'results.jsonl')
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join([job_line('good'), job_line('bad_width', width='wide'), job_line('no_depth', deep_depth=None),
+                           '{"id": "truncated", ']) + '\n')
+
+    ok_count, error_count, skip_count = batch_area.run_batch(manifest_path, output_path, workers=1, warm_zones=())
+    assert (ok_count, error_count, skip_count) == (1, 3, 0)
+    records = read_records(output_path)
+    assert set(records) == {'good', 'bad_width', 'no_depth', '4'}
+    assert records['bad_width']['status'] == 'error'
+    assert 'deep_depth' in records['no_depth']['error']
+
+    expected = ca.track_area(TRACK_PATH, field_data, 2.3, 15.0, 12.0)
+    assert [records['good'][name] for name in batch_area.RESULT_FIELDS] == pytest.approx(expected)
+
+
+def test_resume_skips_finished_jobs(tmp_path):
+    manifest_path = str(tmp_path / 'jobs.jsonl')
+    output_path = str(tmp_path / 'results.jsonl')
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join([job_line('a'), job_line('b', field_path=str(tmp_path / 'missing.json'))]) + '\n')
+    assert batch_area.run_batch(manifest_path, output_path, workers=1, warm_zones=()) == (1, 1, 0)
+
+    # 中断时写了一半的行不影响续算, 失败的作业重新执行
+    with open(output_path, 'a', encoding='utf-8') as f:
+        f.write('{"id": "c", "sta')
+    assert batch_area.run_batch(manifest_path, output_path, workers=1, warm_zones=()) == (0, 1, 1)
+    assert batch_area.completed_job_ids(output_path) == {'a'}
+    with open(output_path, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert json.loads(lines[-1])['id'] == 'b'
+
+
+def test_csv_manifest(tmp_path):
+    manifest_path = str(tmp_path / 'jobs.csv')
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        f.write('track_path,field_path,width,deep_depth,shallow_depth\n')
+        f.write('{},{},2.3,15.0,12.0\n'.format(TRACK_PATH, FIELD_PATH))
+        f.write('{},{},2.3,,12.0\n'.format(TRACK_PATH, FIELD_PATH))
+    jobs = batch_area.read_manifest(manifest_path)
+    assert [job['id'] for job in jobs] == ['1', '2']
+    assert jobs[0]['deep_depth'] == 15.0
+    assert 'error' in jobs[1]
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+import numpy as np
+import benchmark_area
+import segment_utils
+import synthetic_track
+
+"""
+python -m pytest -q test_benchmark_area.py
+"""
+
+# 基准结果文件
+BASELINE_PATH = './benchmark_baseline.json'
+
+
+def test_generate_workload_is_reproducible():
+    track_data, field_data = synthetic_track.generate_workload(2000, 4, parks=1, park_points=30, seed=3)
+    again, _ = synthetic_track.generate_workload(2000, 4, parks=1, park_points=30, seed=3)
+    assert len(track_data['lng']) == 2000
+    for column, values in track_data.items():
+        np.testing.assert_array_equal(values, again[column])
+    assert len(field_data['features']) == 1
+
+    # 不切换耕深时每个作业行为一个作业段
+    bands = segment_utils.depth_bands(track_data['deep'], (12.0, 15.0))
+    runs = segment_utils.segment_runs(bands)
+    assert np.count_nonzero(runs[:, 0] > 0) == 4
+
+
+def test_compare_results_flags_regressions():
+    baseline = {'case': {'areas': {'total_area': 10.0}, 'wall_time': 1.0}}
+    assert benchmark_area.compare_results({'case': {'areas': {'total_area': 10.0}, 'wall_time': 1.2}}, baseline) == []
+    problems = benchmark_area.compare_results({'case': {'areas': {'total_area': 10.1}, 'wall_time': 2.0}}, baseline)
+    assert len(problems) == 2
+    # 基准中没有的用例不比较
+    assert benchmark_area.compare_results({'new': {'areas': {}, 'wall_time': 9.0}}, baseline) == []
+
+
+def test_benchmark_baseline_areas():
+    with open(BASELINE_PATH, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    options = baseline['options']
+    results = {}
+    for name, points, passes, workload in benchmark_area.BENCHMARK_CASES:
+        if name in baseline['cases']:
+            results[name] = benchmark_area.run_case(name, points, passes, workload, options['width'],
+                                                    options['deep_depth'], options['shallow_depth'], 1,
+                                                    {'backend': options['backend']})
+    assert results
+    # 耗时与运行环境有关, 只比较面积
+    assert benchmark_area.compare_results(results, baseline['cases'], time_tolerance=float('inf')) == []
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+import cal_area as ca
+import decimate_utils
+import segment_utils
+
+"""
+python -m pytest -q test_decimate_utils.py
+"""
+
+# 示例轨迹
+TRACK_PATH = './xinxiang_chongming_track.json'
+# 农具作业幅宽、深耕阈值、浅耕阈值
+WIDTH = 2.3
+DEEP_DEPTH = 15.0
+SHALLOW_DEPTH = 12.0
+# 允许的最大面积相对误差
+MAX_AREA_ERROR = 0.01
+
+
+def test_decimate_keeps_band_boundaries():
+    # 共线的直线作业行, 中途切换档位并有停车重复点
+    x = np.concatenate((np.linspace(0.0, 50.0, 51), np.full(5, 50.0), np.linspace(51.0, 100.0, 50)))
+    points = np.column_stack((x, np.zeros(len(x))))
+    bands = np.where(np.arange(len(x)) < 30, segment_utils.DEEP_BAND, segment_utils.SHALLOW_BAND)
+    speeds = np.where(np.diff(x, prepend=-1.0) == 0, 0.0, 5.0)
+    keep, stats = decimate_utils.decimate_track(points, bands, WIDTH / 2.0, MAX_AREA_ERROR, speeds)
+
+    boundaries = [0, 29, 30, len(x) - 1]
+    assert keep[boundaries].all()
+    # 化简后每个档位只剩首末点, 档位切分结果不变
+    assert np.flatnonzero(keep).tolist() == boundaries
+    np.testing.assert_array_equal(segment_utils.segment_runs(bands[keep])[:, 0], segment_utils.segment_runs(bands)[:, 0])
+    assert stats.output_points == len(boundaries)
+    assert stats.stationary_points == 5
+    assert stats.input_points == stats.output_points + stats.stationary_points + stats.simplified_points
+
+
+def test_decimate_deviation_within_tolerance():
+    rng = np.random.default_rng(0)
+    points = np.cumsum(rng.normal(0.0, 0.3, (500, 2)) + [1.0, 0.0], axis=0)
+    bands = np.repeat([2, 1, 2, 0, 2], 100)
+    keep, stats = decimate_utils.decimate_track(points, bands, WIDTH / 2.0, MAX_AREA_ERROR)
+    assert stats.max_deviation <= stats.tolerance
+    assert stats.max_deviation == pytest.approx(decimate_utils.max_deviation(points, keep))
+    changes = np.flatnonzero(bands[1:] != bands[:-1])
+    assert keep[changes].all() and keep[changes + 1].all()
+
+
+def test_decimated_area_within_error(field_data):
+    expected = ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    result = ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, max_area_error=MAX_AREA_ERROR)
+    # 各作业面积的相对偏差不超过允许的最大面积相对误差
+    for index in (3, 4, 5):
+        assert result[index] == pytest.approx(expected[index], rel=MAX_AREA_ERROR)
+    # 轨迹总体长度仍按全部轨迹点计算
+    assert result[0] == expected[0]
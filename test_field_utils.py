@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import copy
+import pytest
+import shapely
+import cal_area as ca
+import field_utils
+
+"""
+python -m pytest -q test_field_utils.py
+"""
+
+# 示例轨迹
+TRACK_PATH = './xinxiang_chongming_track.json'
+# 农具作业幅宽、深耕阈值、浅耕阈值
+WIDTH = 2.3
+DEEP_DEPTH = 15.0
+SHALLOW_DEPTH = 12.0
+
+
+def parcel(oid=None, name=None):
+    attributes = {}
+    if oid is not None:
+        attributes['OID'] = oid
+    if name is not None:
+        attributes['Name'] = name
+    return {'attributes': attributes, 'geometry': {'rings': []}}
+
+
+def split_field(field_data, attributes):
+    """
+    将示例地块沿中心经线切分为东西两个地块, 分别使用给定的属性
+    """
+    polygon = field_utils.field_geometry(field_data)
+    min_x, min_y, max_x, max_y = polygon.bounds
+    center_x = polygon.centroid.x
+    halves = (shapely.clip_by_rect(polygon, min_x, min_y, center_x, max_y),
+              shapely.clip_by_rect(polygon, center_x, min_y, max_x, max_y))
+    collection = copy.deepcopy(field_data)
+    collection['features'] = [{'attributes': dict(attribute),
+                               'geometry': {'rings': [shapely.get_coordinates(half.exterior).tolist()]}}
+                              for half, attribute in zip(halves, attributes)]
+    return collection
+
+
+def test_feature_keys_unique():
+    features = [parcel(1, 'a'), parcel(2, 'a'), parcel(name='c'), parcel()]
+    assert field_utils.feature_keys(features) == [1, 2, 'c', 3]
+
+
+def test_feature_keys_oid_collision_uses_name():
+    features = [parcel(1, 'a'), parcel(1, 'b'), parcel(2, 'c')]
+    # 只有重复的 OID 改用 Name, 其余地块仍以 OID 为标识
+    assert field_utils.feature_keys(features) == ['a', 'b', 2]
+
+
+def test_feature_keys_disambiguates_only_collisions():
+    features = [parcel(1, 'a'), parcel(1, 'a'), parcel(2, 'c'), parcel()]
+    # 要素序号不与 OID 混淆: 重复的标识附加要素序号
+    assert field_utils.feature_keys(features) == [(1, 0), (1, 1), 2, 3]
+    features = [parcel(3), parcel(), parcel(), parcel()]
+    assert field_utils.feature_keys(features) == [(3, 0), 1, 2, (3, 3)]
+
+
+def test_fields_area_keys(field_data):
+    unique = split_field(field_data, [{'OID': 10, 'Name': 'west'}, {'OID': 20, 'Name': 'east'}])
+    expected = ca.fields_area(TRACK_PATH, unique, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    assert set(expected) == {10, 20}
+
+    same_oid = split_field(field_data, [{'OID': 1, 'Name': 'west'}, {'OID': 1, 'Name': 'east'}])
+    result = ca.fields_area(TRACK_PATH, same_oid, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    assert result['west'] == pytest.approx(expected[10])
+    assert result['east'] == pytest.approx(expected[20])
+
+    same_key = split_field(field_data, [{'OID': 1, 'Name': 'area'}, {'OID': 1, 'Name': 'area'}])
+    result = ca.fields_area(TRACK_PATH, same_key, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    assert result[(1, 0)] == pytest.approx(expected[10])
+    assert result[(1, 1)] == pytest.approx(expected[20])
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+import shapely
+import cal_area as ca
+import fleet_area
+import track_io
+
+"""
+python -m pytest -q test_fleet_area.py
+"""
+
+# 示例轨迹
+TRACK_PATH = './xinxiang_chongming_track.json'
+# 农具作业幅宽、深耕阈值、浅耕阈值
+WIDTH = 2.3
+DEEP_DEPTH = 15.0
+SHALLOW_DEPTH = 12.0
+# 面积的最大绝对偏差(亩)
+AREA_TOLERANCE = 1e-8
+
+
+def machine(track_data):
+    return {'track': track_data, 'width': WIDTH, 'deep_depth': DEEP_DEPTH, 'shallow_depth': SHALLOW_DEPTH}
+
+
+def test_overlap_matrix_matches_pairwise_intersections():
+    # 三台农机: a 与 b 部分重叠, c 与其它农机不相交, 面积单位为平方米
+    machine_swaths = [
+        [shapely.box(0, 0, 100, 10), shapely.box(0, 10, 100, 20)],
+        [shapely.box(50, 15, 150, 25), shapely.box(140, 0, 150, 15)],
+        [shapely.box(500, 0, 600, 10)],
+    ]
+    machine_unions = [shapely.union_all(swaths) for swaths in machine_swaths]
+    coverage = fleet_area.fleet_coverage(['a', 'b', 'c'], [()] * 3, machine_swaths, machine_unions)
+
+    expected = np.array([[shapely.intersection(a, b).area if i != j else a.area
+                          for j, b in enumerate(machine_unions)] for i, a in enumerate(machine_unions)]) / 2000 * 3
+    np.testing.assert_allclose(coverage.overlap_matrix, expected)
+    assert coverage.overlap_matrix[0, 1] == pytest.approx(50 * 5 / 2000 * 3)
+    assert coverage.union_area == pytest.approx(shapely.union_all(machine_unions).area / 2000 * 3)
+    assert coverage.fleet_overlap_area == pytest.approx(coverage.overlap_matrix[0, 1])
+
+
+def test_fleet_of_split_track(field_data):
+    track_data = track_io.load_track(TRACK_PATH)
+    half = len(track_data['lng']) // 2
+    machines = {
+        'first': machine({column: values[:half] for column, values in track_data.items()}),
+        'second': machine({column: values[half:] for column, values in track_data.items()}),
+        # 与 first 轨迹相同的农机, 覆盖范围完全重叠
+        'again': machine({column: values[:half] for column, values in track_data.items()}),
+    }
+    coverage = ca.fleet_track_area(machines, field_data)
+    matrix = coverage.overlap_matrix
+
+    assert coverage.machine_ids == ['first', 'second', 'again']
+    np.testing.assert_allclose(matrix, matrix.T)
+    for i, machine_id in enumerate(coverage.machine_ids):
+        expected = ca.track_area(machines[machine_id]['track'], field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+        assert coverage.machine_areas[machine_id] == pytest.approx(expected, abs=AREA_TOLERANCE)
+        assert matrix[i, i] == pytest.approx(expected[5], abs=AREA_TOLERANCE)
+    assert matrix[0, 2] == pytest.approx(matrix[0, 0], abs=AREA_TOLERANCE)
+    assert 0.0 < matrix[0, 1] < min(matrix[0, 0], matrix[1, 1])
+    assert matrix[1, 2] == pytest.approx(matrix[0, 1], abs=AREA_TOLERANCE)
+
+    # 重复的农机不增加总覆盖面积, 农机间重复作业面积为各农机覆盖面积之和减去总覆盖面积
+    pair = ca.fleet_track_area({'first': machines['first'], 'second': machines['second']}, field_data)
+    assert coverage.union_area == pytest.approx(pair.union_area, abs=AREA_TOLERANCE)
+    assert coverage.fleet_overlap_area == pytest.approx(np.trace(matrix) - coverage.union_area, abs=AREA_TOLERANCE)
+    assert pair.fleet_overlap_area == pytest.approx(pair.overlap_matrix[0, 1], abs=AREA_TOLERANCE)
+
+    parallel = ca.fleet_track_area(machines, field_data, workers=2)
+    np.testing.assert_allclose(parallel.overlap_matrix, matrix, atol=AREA_TOLERANCE)
+
+
+def test_empty_fleet(field_data):
+    coverage = ca.fleet_track_area({}, field_data)
+    assert coverage.union_area == 0.0
+    assert coverage.overlap_matrix.shape == (0, 0)
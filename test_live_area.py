@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pytest
+import cal_area as ca
+import area_stats
+import live_area
+import track_io
+
+"""
+python -m pytest -q test_live_area.py
+"""
+
+# 示例轨迹
+TRACK_PATH = './xinxiang_chongming_track.json'
+# 农具作业幅宽、深耕阈值、浅耕阈值
+WIDTH = 2.3
+DEEP_DEPTH = 15.0
+SHALLOW_DEPTH = 12.0
+# 逐批并入的覆盖范围在批次衔接处的圆弧近似与整体缓冲不同, 允许的最大绝对偏差(亩)
+LIVE_TOLERANCE = 5e-5
+# 分块计算在窗口衔接处的圆弧近似与整体缓冲不同, 允许的最大绝对偏差(亩)
+CHUNKED_TOLERANCE = 1e-5
+
+
+@pytest.fixture(scope='module')
+def track_data():
+    return track_io.load_track(TRACK_PATH)
+
+
+@pytest.mark.parametrize('batch_size', [1, 13, 100, 1000])
+def test_snapshot_matches_track_area(field_data, track_data, batch_size):
+    accumulator = live_area.TrackAccumulator(field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    count = len(track_data['lng'])
+    checkpoints = {count // 3, count}
+    for start in range(0, count, batch_size):
+        stop = min(start + batch_size, count)
+        accumulator.add_points(track_data['lng'][start:stop], track_data['lat'][start:stop],
+                               track_data['deep'][start:stop])
+        if stop in checkpoints or (start < count // 3 < stop):
+            # 任意时刻的快照与截至该时刻的轨迹整体计算结果一致
+            prefix = {column: values[:stop] for column, values in track_data.items()}
+            expected = ca.track_area(prefix, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+            assert accumulator.snapshot() == pytest.approx(expected, abs=LIVE_TOLERANCE)
+
+
+def test_snapshot_without_points_in_field(field_data, track_data):
+    accumulator = live_area.TrackAccumulator(field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    # 地块范围外的轨迹点只计入轨迹长度
+    accumulator.add_points(track_data['lng'][:1] + 1.0, track_data['lat'][:1], track_data['deep'][:1])
+    result = accumulator.snapshot()
+    assert result[2:] == (0.0, 0.0, 0.0, 0.0, 0.0)
+
+
+def test_chunked_matches_one_shot(field_data, jittered_workload):
+    expected = ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    result = ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, chunk_size=100)
+    assert result == pytest.approx(expected, abs=CHUNKED_TOLERANCE)
+
+    track_data, workload_field = jittered_workload
+    expected = ca.track_area(track_data, workload_field, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    result = ca.track_area(track_data, workload_field, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, chunk_size=1000)
+    assert result == pytest.approx(expected, abs=CHUNKED_TOLERANCE)
+
+
+def test_chunked_streams_track_files(field_data, track_data, tmp_path):
+    # 轨迹文件按窗口流式读取, 与内存中的轨迹分块计算结果相同
+    expected = live_area.chunked_track_area(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, 100)
+    binary_path = str(tmp_path / 'track.bin')
+    track_io.convert_track(TRACK_PATH, binary_path)
+    for path in (TRACK_PATH, binary_path):
+        result = live_area.chunked_track_area(path, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, 100)
+        assert result == pytest.approx(expected, abs=1e-12)
+
+    chunks = list(track_io.iter_track_chunks(TRACK_PATH, ('lng', 'deep'), 100))
+    assert [len(chunk['lng']) for chunk in chunks[:-1]] == [100] * (len(chunks) - 1)
+    assert sum(len(chunk['deep']) for chunk in chunks) == len(track_data['lng'])
+
+
+@pytest.mark.parametrize('options', [{'stats': area_stats.AreaStats()}, {'tile_size': 50.0}, {'workers': 2},
+                                     {'max_area_error': 0.01}])
+def test_chunked_rejects_unsupported_options(field_data, options):
+    with pytest.raises(ValueError):
+        ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, chunk_size=100, **options)
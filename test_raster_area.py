@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+import shapely
+import cal_area as ca
+import area_stats
+import raster_area
+
+"""
+python -m pytest -q test_raster_area.py
+"""
+
+# 示例轨迹
+TRACK_PATH = './xinxiang_chongming_track.json'
+# 农具作业幅宽、深耕阈值、浅耕阈值
+WIDTH = 2.3
+DEEP_DEPTH = 15.0
+SHALLOW_DEPTH = 12.0
+# 误差上界计数与结果字段的对应关系
+ERROR_FIELDS = (('activity_error', 2), ('deep_error', 3), ('shallow_error', 4), ('union_error', 5),
+                ('overlap_error', 6))
+
+
+def test_draw_swath_matches_centre_distance():
+    # 栅格中心到中心线的距离不超过半幅宽时栅格被覆盖, 含折返和停车重复点
+    line_points = np.array([[1.3, 2.1], [9.7, 3.4], [9.7, 3.4], [4.2, 8.8], [12.5, 7.1], [3.0, 3.0]])
+    half_width = 1.15
+    bounds = (0.0, 0.0, 15.0, 12.0)
+    cell_size = 0.1
+    rows, cols = raster_area.grid_shape(bounds, cell_size)
+    mask = np.zeros((rows, cols), dtype=bool)
+    raster_area.draw_swath(mask, line_points, half_width, bounds, cell_size, batch_size=2)
+
+    centre_x = bounds[0] + (np.arange(cols) + 0.5) * cell_size
+    centre_y = bounds[3] - (np.arange(rows) + 0.5) * cell_size
+    xs, ys = np.meshgrid(centre_x, centre_y)
+    distances = shapely.distance(shapely.LineString(line_points), shapely.points(xs, ys))
+    # 与边界距离小于浮点误差的栅格不比较
+    decided = np.abs(distances - half_width) > 1e-9
+    assert np.array_equal(mask[decided], (distances <= half_width)[decided])
+
+
+@pytest.mark.parametrize('cell_size', [0.2, 0.5, 1.0])
+def test_raster_within_error_bounds(field_data, cell_size):
+    expected = ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    stats = area_stats.AreaStats()
+    result = ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, backend='raster',
+                           cell_size=cell_size, stats=stats)
+    counters = stats.as_dict()['raster']
+    for name, index in ERROR_FIELDS:
+        assert abs(result[index] - expected[index]) <= counters[name]
+
+
+def test_error_bounds_are_informative(field_data):
+    # 默认栅格边长下各误差上界应小于对应面积本身
+    expected = ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    stats = area_stats.AreaStats()
+    ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, backend='raster', stats=stats)
+    counters = stats.as_dict()['raster']
+    for name, index in ERROR_FIELDS:
+        assert counters[name] < expected[index]
+
+
+def test_raster_without_points():
+    coverage = raster_area.track_coverage(np.empty((0, 2)), np.empty((0, 3), dtype=np.intp), 1.15,
+                                          (0.0, 0.0, 10.0, 10.0), (ca.SHALLOW_BAND, ca.DEEP_BAND))
+    assert coverage.activity_area == 0.0
+    assert coverage.union_area == 0.0
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+import cal_area as ca
+import render_area
+
+"""
+python -m pytest -q test_render_area.py
+"""
+
+# 示例轨迹
+TRACK_PATH = './xinxiang_chongming_track.json'
+# 农具作业幅宽、深耕阈值、浅耕阈值
+WIDTH = 2.3
+DEEP_DEPTH = 15.0
+SHALLOW_DEPTH = 12.0
+# PNG 文件标识
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# 矢量结果按栅格中心采样的面积相对覆盖多边形面积的最大偏差
+GRID_AREA_TOLERANCE = 0.02
+
+
+@pytest.fixture(scope='module')
+def geometries(field_data):
+    return {backend: ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, backend=backend,
+                                   return_geometry=True)[1] for backend in ('vector', 'raster')}
+
+
+@pytest.mark.parametrize('backend', ['vector', 'raster'])
+def test_render_coverage_writes_png(geometries, tmp_path, backend):
+    path = tmp_path / 'coverage.png'
+    render_area.render_coverage(geometries[backend], str(path), title=backend)
+    with open(path, 'rb') as f:
+        assert f.read(len(PNG_SIGNATURE)) == PNG_SIGNATURE
+
+
+@pytest.mark.parametrize('backend', ['vector', 'raster'])
+def test_export_raster_writes_world_file(geometries, tmp_path, backend):
+    path = tmp_path / 'coverage.png'
+    grid, bounds, cell_size = render_area.export_raster(geometries[backend], str(path))
+    with open(path, 'rb') as f:
+        assert f.read(len(PNG_SIGNATURE)) == PNG_SIGNATURE
+
+    # 坐标文件给出左上角栅格中心坐标
+    world = [float(line) for line in (tmp_path / 'coverage.pgw').read_text().split()]
+    min_x, min_y, max_x, max_y = bounds
+    assert world == [cell_size, 0.0, 0.0, -cell_size, min_x + cell_size / 2, max_y - cell_size / 2]
+    rows, cols = grid.shape
+    assert abs(rows * cell_size - (max_y - min_y)) < cell_size
+    assert abs(cols * cell_size - (max_x - min_x)) < cell_size
+    assert set(np.unique(grid)) <= {0, 1, 2, 3}
+
+
+def test_vector_grid_samples_band_unions(geometries):
+    geometry = geometries['vector']
+    cell_size = geometries['raster'].raster.cell_size
+    grid, bounds = render_area.vector_grid(geometry, cell_size)
+    min_x, min_y, max_x, max_y = bounds
+    assert grid.shape == (round((max_y - min_y) / cell_size), round((max_x - min_x) / cell_size))
+    # 按栅格中心采样的各档位面积与覆盖多边形面积相近
+    for bit, band in enumerate((ca.SHALLOW_BAND, ca.DEEP_BAND)):
+        sampled_area = np.count_nonzero(grid & (1 << bit)) * cell_size ** 2
+        assert sampled_area == pytest.approx(geometry.band_unions[band].area, rel=GRID_AREA_TOLERANCE)
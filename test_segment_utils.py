@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+import cal_area as ca
+import segment_utils
+import track_io
+
+"""
+python -m pytest -q test_segment_utils.py
+"""
+
+# 示例轨迹
+TRACK_PATH = './xinxiang_chongming_track.json'
+# 农具作业幅宽、深耕阈值、浅耕阈值
+WIDTH = 2.3
+DEEP_DEPTH = 15.0
+SHALLOW_DEPTH = 12.0
+# 同一算法不同计算方式之间面积的最大绝对偏差(亩)
+AREA_TOLERANCE = 1e-8
+# 解析计算的作业段面积与缓冲区多边形面积的最大相对偏差
+SWATH_TOLERANCE = 1e-5
+
+
+def test_trailing_run_is_counted(field_data):
+    assert segment_utils.segment_runs(np.array([0, 2, 2, 1, 1])).tolist() == [[2, 1, 3], [1, 3, 5]]
+
+    # 轨迹在地块内的深耕作业段中结束
+    track_data = track_io.load_track(TRACK_PATH)
+    deep_index = np.flatnonzero(track_data['deep'] >= DEEP_DEPTH)
+    end = int(deep_index[len(deep_index) // 2]) + 1
+    track_data = {column: np.asarray(values[:end]) for column, values in track_data.items()}
+    result = ca.track_area(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+
+    # 在末尾原地追加一个未作业点关闭作业段, 覆盖范围不变
+    closed = {column: np.append(values, values[-1]) for column, values in track_data.items()}
+    closed['deep'][-1] = 0.0
+    expected = ca.track_area(closed, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    assert result == pytest.approx(expected, abs=AREA_TOLERANCE)
+    assert result[3] > 0.0
+
+
+def test_threshold_equal_depths(field_data):
+    # float32 耕深与阈值相等的轨迹点按阈值所在档位计算
+    bands = segment_utils.depth_bands(np.array([8.2, 13.1, 13.0], dtype=np.float32), (8.2, 13.1))
+    assert bands.tolist() == [1, 2, 1]
+
+    result = ca.track_area(TRACK_PATH, field_data, WIDTH, 13.1, 8.2)
+    assert result[4] == pytest.approx(0.2144, abs=1e-4)
+
+
+def test_band_threshold_table(field_data):
+    expected = ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    result = ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH,
+                           band_thresholds=(SHALLOW_DEPTH, DEEP_DEPTH))
+    assert result == pytest.approx(expected, abs=AREA_TOLERANCE)
+
+    # 三档阈值表: 最高档为深耕, 其余作业档合并为浅耕
+    result = ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, band_thresholds=(8.0, 12.0, 15.0))
+    assert result[3] == pytest.approx(expected[3], abs=AREA_TOLERANCE)
+    assert result[4] >= expected[4]
+    assert result[5] >= expected[5]
+
+    with pytest.raises(ValueError):
+        segment_utils.band_thresholds(DEEP_DEPTH, SHALLOW_DEPTH, (15.0, 12.0))
+
+
+@pytest.mark.parametrize('run_points', [
+    [[0.0, 0.0], [50.0, 0.0]],
+    [[0.0, 0.0], [30.0, 0.0], [30.0, 20.0], [60.0, 25.0], [61.0, 60.0]],
+    [[0.0, 0.0], [10.0, 0.0], [10.0, 0.0], [20.0, 0.5]],
+])
+def test_swath_area_matches_buffer(run_points):
+    run_points = np.array(run_points)
+    expected = segment_utils.run_buffer(run_points, WIDTH / 2.0).area
+    assert segment_utils.swath_area(run_points, WIDTH / 2.0) == pytest.approx(expected, rel=SWATH_TOLERANCE)
+
+
+def test_swath_area_rejects_folded_run():
+    # 折返的作业段自重叠, 不能解析计算
+    run_points = np.array([[0.0, 0.0], [30.0, 0.0], [0.0, 1.0]])
+    assert segment_utils.swath_area(run_points, WIDTH / 2.0) is None
+
+
+def test_gross_area_matches_run_buffers(field_data):
+    # 重复作业面积中的作业段面积之和按解析公式计算, 与逐段缓冲多边形面积之和一致
+    result, geometry = ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, return_geometry=True)
+    gross_area = sum(poly.area for poly in geometry.run_polygons)
+    expected = (gross_area - geometry.union_polygon.area) / 2000 * 3
+    assert result[6] == pytest.approx(expected, rel=SWATH_TOLERANCE)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+import cal_area as ca
+import track_io
+
+"""
+python -m pytest -q test_track_io.py
+"""
+
+# 示例轨迹
+TRACK_PATH = './xinxiang_chongming_track.json'
+# 农具作业幅宽、深耕阈值、浅耕阈值
+WIDTH = 2.3
+DEEP_DEPTH = 15.0
+SHALLOW_DEPTH = 12.0
+# 同一算法不同计算方式之间面积的最大绝对偏差(亩)
+AREA_TOLERANCE = 1e-8
+
+
+def test_binary_track_round_trip(field_data, tmp_path):
+    binary_path = str(tmp_path / 'track.bin')
+    count = track_io.convert_track(TRACK_PATH, binary_path)
+    assert track_io.is_binary_track(binary_path)
+
+    expected = track_io.load_json_track(TRACK_PATH, track_io.BINARY_COLUMNS)
+    loaded = track_io.load_binary_track(binary_path)
+    assert list(loaded) == list(expected)
+    for column, values in expected.items():
+        assert len(loaded[column]) == count
+        np.testing.assert_array_equal(loaded[column], values)
+
+    expected = ca.track_area(TRACK_PATH, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    assert ca.track_area(binary_path, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH) == pytest.approx(expected,
+                                                                                                       abs=AREA_TOLERANCE)
+
+
+def test_binary_track_is_memory_mapped(tmp_path):
+    binary_path = str(tmp_path / 'track.bin')
+    track_io.write_binary_track(binary_path, {'lng': np.arange(3.0), 'deep': np.array([1.5, 2.5, 3.5])})
+    loaded = track_io.load_binary_track(binary_path, ('deep',))
+    assert list(loaded) == ['deep']
+    assert loaded['deep'].dtype == np.float32
+    assert not loaded['deep'].flags.writeable
+    with pytest.raises(ValueError):
+        track_io.load_binary_track(binary_path, ('veo',))
+    with pytest.raises(ValueError):
+        track_io.write_binary_track(binary_path, {'lng': np.arange(3.0), 'lat': np.arange(2.0)})
+
+
+def test_streamed_json_matches_records():
+    records = track_io.track_columns(list(track_io.iter_track_records(TRACK_PATH)), track_io.DEFAULT_COLUMNS)
+    loaded = track_io.load_json_track(TRACK_PATH)
+    for column in track_io.DEFAULT_COLUMNS:
+        np.testing.assert_array_equal(loaded[column], records[column])
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+import cal_area as ca
+import track_io
+import window_area
+
+"""
+python -m pytest -q test_window_area.py
+"""
+
+# 示例轨迹
+TRACK_PATH = './xinxiang_chongming_track.json'
+# 农具作业幅宽、深耕阈值、浅耕阈值
+WIDTH = 2.3
+DEEP_DEPTH = 15.0
+SHALLOW_DEPTH = 12.0
+# 窗口面积与整体计算的最大绝对偏差(亩): 窗口按作业段缓冲区多边形计算, track_area 按解析公式计算作业段面积
+WINDOW_TOLERANCE = 1e-5
+
+
+@pytest.fixture(scope='module')
+def track_data():
+    return track_io.load_track(TRACK_PATH)
+
+
+@pytest.mark.parametrize('interval', [300, 600, 3600])
+def test_window_overlap_sums_to_track_overlap(track_data, field_data, interval):
+    expected = ca.track_area(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    windows = ca.window_areas(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, interval=interval)
+    assert len(windows) > 1
+    for window in windows:
+        assert window['overlap_total_area'] == pytest.approx(window['overlap_within_area'] + window['overlap_cross_area'])
+
+    # 各窗口重复作业面积之和等于整体重复作业面积, 各窗口新增覆盖面积之和等于整体总作业面积
+    assert sum(window['overlap_total_area'] for window in windows) == pytest.approx(expected[6], abs=WINDOW_TOLERANCE)
+    assert sum(window['cultivation_total_area'] - window['overlap_cross_area'] for window in windows) == \
+        pytest.approx(expected[5], abs=WINDOW_TOLERANCE)
+
+
+def test_single_window_matches_track_area(track_data, field_data):
+    expected = ca.track_area(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH)
+    times = track_data['gps_time']
+    windows = ca.window_areas(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH,
+                              boundaries=[times.min(), times.max() + 1])
+    assert len(windows) == 1
+    window = windows[0]
+    assert window['overlap_cross_area'] == 0.0
+    result = (window['cultivation_deep_area'], window['cultivation_shallow_area'], window['cultivation_total_area'],
+              window['overlap_total_area'])
+    assert result == pytest.approx(expected[3:], abs=WINDOW_TOLERANCE)
+
+
+def test_unordered_points_are_sorted_by_time(track_data, field_data):
+    expected = ca.window_areas(track_data, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, interval=600)
+    order = np.random.default_rng(0).permutation(len(track_data['lng']))
+    shuffled = {column: values[order] for column, values in track_data.items()}
+    assert ca.window_areas(shuffled, field_data, WIDTH, DEEP_DEPTH, SHALLOW_DEPTH, interval=600) == expected
+
+
+def test_window_edges_follow_boundaries():
+    edges = window_area.window_edges(np.array([]), boundaries=['2023-03-22 14:00:00', '2023-03-22 08:00:00',
+                                                               np.int64(1679500800)])
+    assert list(edges) == [1679472000.0, 1679493600.0, 1679500800.0]
+    with pytest.raises(ValueError):
+        window_area.window_edges(np.array([]))
@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import json
+import array
+import struct
+import calendar
+import datetime
+import numpy as np
+
+# 轨迹字段对应的紧凑数组类型(array 模块类型码)
+COLUMN_TYPECODES = {
+    'lng': 'd',
+    'lat': 'd',
+    'deep': 'f',
+    'veo': 'f',
+    'gps_time': 'q',
+    'server_time': 'q',
+}
+# 时间字段, 解析为时间戳(秒)
+TIME_COLUMNS = ('gps_time', 'server_time')
+# track_area 默认读取的字段
+DEFAULT_COLUMNS = ('lng', 'lat', 'deep', 'gps_time', 'veo')
+
+# 流式读取文件时每次读取的字符数
+READ_CHUNK_SIZE = 1 << 16
+
+# 二进制列式轨迹文件: 文件头 + 字段目录 + 按字段连续存放的小端序数组
+BINARY_MAGIC = b'TRKCOL\x00\x01'
+# 文件头: 标识, 字段数, 轨迹点数
+BINARY_HEADER = struct.Struct('<8sIQ')
+# 字段目录项: 字段名, numpy 类型描述(如 '<f8'), 数据在文件中的偏移
+BINARY_COLUMN = struct.Struct('<16s4sQ')
+# 二进制轨迹文件保存的字段
+BINARY_COLUMNS = ('lng', 'lat', 'deep', 'gps_time', 'veo')
+# 各字段数据按该字节数对齐
+BINARY_ALIGN = 8
+
+
+def parse_time(value):
+    """
+    将轨迹时间字符串解析为时间戳(秒), 按时间字符串所示时刻计算, 不做时区换算
+
+    :param value: 时间字符串, 如 '2023-03-22 13:47:46', 或已是数值的时间戳
+    :return: 时间戳(秒)
+    """
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    return calendar.timegm(datetime.datetime.fromisoformat(value).timetuple())
+
+
+def column_value(record, column):
+    """
+    读取单条轨迹记录中的字段值并转换为数值
+
+    :param record: 轨迹记录
+    :param column: 字段名
+    :return: 字段数值
+    """
+    value = record.get(column)
+    if column in TIME_COLUMNS:
+        return parse_time(value) if value is not None else 0
+    return float(value) if value is not None and value != '' else float('nan')
+
+
+def iter_track_records(path):
+    """
+    以流的方式逐条解析轨迹 JSON 数组文件, 不一次性载入整个文件
+
+    :param path: 轨迹 JSON 文件路径
+    :return: 轨迹记录生成器
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(READ_CHUNK_SIZE).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError("ERROR!!! Track data must be a JSON array")
+        pos = 1
+        eof = False
+        while True:
+            # 跳过空白和分隔符
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # 当前缓冲区内记录不完整, 丢弃已解析部分并继续读取
+                chunk = f.read(READ_CHUNK_SIZE)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield record
+            pos = end
+
+
+def is_binary_track(path):
+    """
+    判断文件是否为二进制列式轨迹文件
+
+    :param path: 轨迹文件路径
+    :return: 是否为二进制轨迹文件
+    """
+    with open(path, 'rb') as f:
+        return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+def column_dtype(typecode):
+    """
+    获取类型码对应的小端序 numpy 类型
+
+    :param typecode: array 模块类型码
+    :return: numpy 类型
+    """
+    return np.dtype(typecode).newbyteorder('<')
+
+
+def write_binary_track(path, columns):
+    """
+    将轨迹字段数组写入二进制列式轨迹文件
+
+    :param path: 输出文件路径
+    :param columns: 字段名到数组的字典, 各数组长度相同
+    """
+    names = list(columns)
+    count = len(columns[names[0]]) if names else 0
+    arrays = []
+    for name in names:
+        values = np.ascontiguousarray(columns[name], dtype=column_dtype(COLUMN_TYPECODES.get(name, 'd')))
+        if len(values) != count:
+            raise ValueError("ERROR!!! Track column {} has {} values, expected {}".format(name, len(values), count))
+        arrays.append(values)
+
+    # 字段目录之后按对齐偏移依次存放各字段数据
+    offset = BINARY_HEADER.size + BINARY_COLUMN.size * len(names)
+    offsets = []
+    for values in arrays:
+        offset = -(-offset // BINARY_ALIGN) * BINARY_ALIGN
+        offsets.append(offset)
+        offset += values.nbytes
+
+    with open(path, 'wb') as f:
+        f.write(BINARY_HEADER.pack(BINARY_MAGIC, len(names), count))
+        for name, values, column_offset in zip(names, arrays, offsets):
+            f.write(BINARY_COLUMN.pack(name.encode('ascii'), values.dtype.str.encode('ascii'), column_offset))
+        for values, column_offset in zip(arrays, offsets):
+            f.write(b'\x00' * (column_offset - f.tell()))
+            f.write(values.tobytes())
+
+
+def load_binary_track(path, columns=None):
+    """
+    以内存映射方式读取二进制列式轨迹文件, 各字段数组直接映射文件内容, 不复制数据
+
+    :param path: 二进制轨迹文件路径
+    :param columns: 需要的字段, 为 None 时读取全部字段
+    :return: 字段名到 numpy 数组(只读)的字典
+    """
+    mapped = np.memmap(path, dtype=np.uint8, mode='r')
+    magic, column_count, count = BINARY_HEADER.unpack_from(mapped, 0)
+    if magic != BINARY_MAGIC:
+        raise ValueError("ERROR!!! Not a binary track file: {}".format(path))
+
+    directory = {}
+    for i in range(column_count):
+        name, dtype_str, offset = BINARY_COLUMN.unpack_from(mapped, BINARY_HEADER.size + BINARY_COLUMN.size * i)
+        directory[name.rstrip(b'\x00').decode('ascii')] = (np.dtype(dtype_str.rstrip(b'\x00').decode('ascii')), offset)
+
+    result = {}
+    for column in (directory if columns is None else columns):
+        if column not in directory:
+            raise ValueError("ERROR!!! Binary track file lacks column: {}".format(column))
+        dtype, offset = directory[column]
+        result[column] = np.ndarray((count,), dtype=dtype, buffer=mapped, offset=offset)
+    return result
+
+
+def convert_track(json_path, output_path, columns=BINARY_COLUMNS):
+    """
+    将轨迹 JSON 文件转换为二进制列式轨迹文件
+
+    :param json_path: 轨迹 JSON 文件路径
+    :param output_path: 输出文件路径
+    :param columns: 需要保存的字段
+    :return: 轨迹点数
+    """
+    track_data = load_json_track(json_path, columns)
+    write_binary_track(output_path, track_data)
+    return len(track_data[columns[0]]) if columns else 0
+
+
+def load_track(path, columns=DEFAULT_COLUMNS):
+    """
+    读取轨迹文件, 二进制列式轨迹文件以内存映射方式读取, 否则流式读取轨迹 JSON 文件
+
+    :param path: 轨迹文件路径
+    :param columns: 需要保留的字段
+    :return: 字段名到 numpy 数组的字典
+    """
+    if is_binary_track(path):
+        return load_binary_track(path, columns)
+    return load_json_track(path, columns)
+
+
+def load_json_track(path, columns=DEFAULT_COLUMNS):
+    """
+    流式读取轨迹 JSON 文件, 只保留指定字段并存为紧凑的类型化数组
+
+    :param path: 轨迹 JSON 文件路径
+    :param columns: 需要保留的字段
+    :return: 字段名到 numpy 数组的字典
+    """
+    buffers = {column: array.array(COLUMN_TYPECODES.get(column, 'd')) for column in columns}
+    for record in iter_track_records(path):
+        for column in columns:
+            buffers[column].append(column_value(record, column))
+
+    result = {}
+    for column, buffer in buffers.items():
+        # 直接共享 array 的内存, 不再复制
+        result[column] = np.frombuffer(buffer, dtype=buffer.typecode) if len(buffer) else np.array([], dtype=buffer.typecode)
+    return result
+
+
+def open_track(track_data):
+    """
+    轨迹数据为文件路径时读取轨迹文件, 否则原样返回
+
+    :param track_data: 轨迹文件路径(JSON 或二进制), 轨迹记录字典列表, 或字段名到数组的字典
+    :return: 轨迹记录字典列表, 或字段名到数组的字典
+    """
+    if isinstance(track_data, (str, os.PathLike)):
+        return load_track(track_data)
+    return track_data
+
+
+def has_column(track_data, column):
+    """
+    判断轨迹数据是否包含指定字段
+
+    :param track_data: 轨迹记录字典列表, 或字段名到数组的字典
+    :param column: 字段名
+    :return: 是否包含该字段
+    """
+    if isinstance(track_data, dict):
+        return column in track_data
+    return len(track_data) > 0 and column in track_data[0]
+
+
+def iter_track_chunks(track_data, columns, chunk_size):
+    """
+    按固定点数的窗口依次读取轨迹字段, 轨迹文件不整体载入: JSON 文件流式解析, 二进制文件按窗口切片内存映射的字段
+
+    :param track_data: 轨迹文件路径(JSON 或二进制), 轨迹记录字典列表, 或字段名到数组的字典
+    :param columns: 需要的字段
+    :param chunk_size: 每个窗口的轨迹点数
+    :return: 各窗口字段名到 numpy 数组的字典的生成器
+    """
+    if isinstance(track_data, (str, os.PathLike)):
+        if is_binary_track(track_data):
+            track_data = load_binary_track(track_data, columns)
+        else:
+            buffers = {column: array.array(COLUMN_TYPECODES.get(column, 'd')) for column in columns}
+            count = 0
+            for record in iter_track_records(track_data):
+                for column in columns:
+                    buffers[column].append(column_value(record, column))
+                count += 1
+                if count == chunk_size:
+                    yield {column: np.array(buffer, dtype=buffer.typecode) for column, buffer in buffers.items()}
+                    buffers = {column: array.array(buffer.typecode) for column, buffer in buffers.items()}
+                    count = 0
+            if count:
+                yield {column: np.array(buffer, dtype=buffer.typecode) for column, buffer in buffers.items()}
+            return
+
+    count = len(track_data[columns[0]]) if isinstance(track_data, dict) else len(track_data)
+    for start in range(0, count, chunk_size):
+        if isinstance(track_data, dict):
+            yield {column: np.asarray(track_data[column][start:start + chunk_size]) for column in columns}
+        else:
+            yield track_columns(track_data[start:start + chunk_size], columns)
+
+
+def track_columns(track_data, columns):
+    """
+    将轨迹数据统一为字段数组形式, 兼容记录字典列表和 load_track 的输出
+
+    :param track_data: 轨迹记录字典列表, 或字段名到数组的字典
+    :param columns: 需要的字段
+    :return: 字段名到 numpy 数组的字典
+    """
+    if isinstance(track_data, dict):
+        return {column: np.asarray(track_data[column]) for column in columns}
+    result = {}
+    for column in columns:
+        typecode = COLUMN_TYPECODES.get(column, 'd')
+        result[column] = np.array([column_value(record, column) for record in track_data], dtype=typecode)
+    return result
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import math
+import numpy as np
+import shapely
+from concurrent.futures import ProcessPoolExecutor
+from shapely.geometry import GeometryCollection
+import segment_utils
+
+
+def tile_grid(bounds, tile_size):
+    """
+    将范围按瓦片大小切分为规则格网
+
+    :param bounds: 范围 (min_x, min_y, max_x, max_y)
+    :param tile_size: 瓦片边长(米)
+    :return: 瓦片范围列表
+    """
+    min_x, min_y, max_x, max_y = bounds
+    nx = max(int(math.ceil((max_x - min_x) / tile_size)), 1)
+    ny = max(int(math.ceil((max_y - min_y) / tile_size)), 1)
+    tiles = []
+    for i in range(nx):
+        for j in range(ny):
+            x0 = min_x + i * tile_size
+            y0 = min_y + j * tile_size
+            tiles.append((x0, y0, min(x0 + tile_size, max_x), min(y0 + tile_size, max_y)))
+    return tiles
+
+
+def tile_union_areas(task):
+    """
+    计算单个瓦片内各档位及总作业缓冲区并集的面积
+
+    :param task: (瓦片范围, 作业段中心线列表, 作业段档位列表, 档位列表, 农具作业幅宽的一半长度)
+    :return: (各档位并集面积列表, 总并集面积, 各档位并集顶点数列表, 总并集顶点数), 顶点数为裁剪到瓦片范围后的顶点数
+    """
+    tile_bounds, skeletons, run_bands, bands, half_width = task
+    tile_box = shapely.box(*tile_bounds)
+    run_bands = np.asarray(run_bands)
+
+    band_areas = []
+    band_vertices = []
+    for band in bands:
+        band_skeletons = [skeletons[i] for i in np.flatnonzero(run_bands == band)]
+        band_union = GeometryCollection(band_skeletons).buffer(half_width).intersection(tile_box)
+        band_areas.append(band_union.area)
+        band_vertices.append(int(shapely.get_num_coordinates(band_union)))
+    total_union = GeometryCollection(skeletons).buffer(half_width).intersection(tile_box)
+    return band_areas, total_union.area, band_vertices, int(shapely.get_num_coordinates(total_union))
+
+
+def union_areas(points, runs, half_width, bands, tile_size, workers=1):
+    """
+    分瓦片计算各档位及总作业缓冲区的并集面积, 作业段经 STRtree 只分发到其缓冲区触及的瓦片,
+    各瓦片并集裁剪到瓦片范围后求和, 可使用进程池并行
+
+    :param points: 投影坐标数组
+    :param runs: 作业段数组, 每行为 (档位, 起始索引, 结束索引)
+    :param half_width: 农具作业幅宽的一半长度
+    :param bands: 需要统计的档位列表
+    :param tile_size: 瓦片边长(米)
+    :param workers: 并行进程数, 小于等于 1 时在当前进程内计算
+    :return: (档位到并集面积的字典, 总并集面积, 档位到并集顶点数的字典, 总并集顶点数), 顶点数为各瓦片裁剪后的并集顶点数之和
+    """
+    band_union_areas = dict.fromkeys(bands, 0.0)
+    band_union_vertices = dict.fromkeys(bands, 0)
+    if len(runs) == 0:
+        return band_union_areas, 0.0, band_union_vertices, 0
+
+    skeletons = np.array(segment_utils.run_skeletons(points, runs), dtype=object)
+    tree = shapely.STRtree(skeletons)
+    min_x, min_y, max_x, max_y = shapely.total_bounds(skeletons)
+    extent = (min_x - half_width, min_y - half_width, max_x + half_width, max_y + half_width)
+
+    # 作业段中心线距瓦片超过半幅宽时对瓦片无影响, 按瓦片外扩范围裁剪中心线;
+    # 使用矩形裁剪而不是叠加求交, 抖动和停车轨迹的中心线不会在每个自相交处被打断成大量碎线, 缓冲开销与整体计算相当
+    margin = half_width * 1.5
+    tasks = []
+    for tile_bounds in tile_grid(extent, tile_size):
+        x0, y0, x1, y1 = tile_bounds
+        reach_bounds = (x0 - margin, y0 - margin, x1 + margin, y1 + margin)
+        candidates = tree.query(shapely.box(*reach_bounds))
+        if len(candidates) == 0:
+            continue
+        clipped = shapely.clip_by_rect(skeletons[candidates], *reach_bounds)
+        tasks.append((tile_bounds, list(clipped), runs[candidates, 0].tolist(), list(bands), half_width))
+
+    if workers is not None and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(tile_union_areas, tasks, chunksize=max(len(tasks) // (workers * 4), 1)))
+    else:
+        results = [tile_union_areas(task) for task in tasks]
+
+    total_union_area = 0.0
+    total_union_vertices = 0
+    for band_areas, total_area, band_vertices, total_vertices in results:
+        for band, area, vertices in zip(bands, band_areas, band_vertices):
+            band_union_areas[band] += area
+            band_union_vertices[band] += vertices
+        total_union_area += total_area
+        total_union_vertices += total_vertices
+    return band_union_areas, total_union_area, band_union_vertices, total_union_vertices
+
+
+class TiledCoverage:
+    """
+    按瓦片存储的覆盖范围, 新增多边形只与其触及的瓦片求并集, 合并开销与新增多边形大小相关, 与已有覆盖范围大小无关
+    """
+
+    def __init__(self, tile_size):
+        """
+        :param tile_size: 瓦片边长(米)
+        """
+        self.tile_size = tile_size
+        # 瓦片行列号到瓦片内覆盖多边形的字典
+        self.tiles = {}
+        # 覆盖总面积
+        self.area = 0.0
+
+    def tile_keys(self, geometry):
+        """
+        获取几何对象外包框触及的瓦片行列号
+
+        :param geometry: 几何对象
+        :return: 瓦片行列号列表
+        """
+        min_x, min_y, max_x, max_y = geometry.bounds
+        i0, i1 = int(math.floor(min_x / self.tile_size)), int(math.floor(max_x / self.tile_size))
+        j0, j1 = int(math.floor(min_y / self.tile_size)), int(math.floor(max_y / self.tile_size))
+        return [(i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)]
+
+    def tile_box(self, key):
+        """
+        获取瓦片范围多边形
+
+        :param key: 瓦片行列号
+        :return: 瓦片范围多边形
+        """
+        i, j = key
+        return shapely.box(i * self.tile_size, j * self.tile_size, (i + 1) * self.tile_size, (j + 1) * self.tile_size)
+
+    def merged_tiles(self, geometry):
+        """
+        计算几何对象并入各触及瓦片后的瓦片覆盖多边形, 不修改已有覆盖范围
+
+        :param geometry: 新增的多边形
+        :return: 瓦片行列号到 (合并后多边形, 面积增量) 的字典
+        """
+        merged = {}
+        if geometry.is_empty:
+            return merged
+        for key in self.tile_keys(geometry):
+            clipped = geometry.intersection(self.tile_box(key))
+            if clipped.is_empty:
+                continue
+            existing = self.tiles.get(key)
+            if existing is None:
+                merged[key] = (clipped, clipped.area)
+            else:
+                union = existing.union(clipped)
+                merged[key] = (union, union.area - existing.area)
+        return merged
+
+    def add(self, geometry):
+        """
+        将多边形并入覆盖范围
+
+        :param geometry: 新增的多边形
+        """
+        for key, (union, added_area) in self.merged_tiles(geometry).items():
+            self.tiles[key] = union
+            self.area += added_area
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import math
+import collections
+import numpy as np
+import shapely
+import segment_utils
+import track_io
+
+# 单个时间窗口的作业面积, 面积单位均为平方米
+WindowArea = collections.namedtuple('WindowArea', [
+    'start',                # 窗口起始时间戳(秒), 包含
+    'end',                  # 窗口结束时间戳(秒), 不包含
+    'points',               # 窗口内地块范围内轨迹点数
+    'band_areas',           # 档位到该档位覆盖面积的字典
+    'union_area',           # 窗口内总作业覆盖面积(不包括重复作业)
+    'gross_area',           # 窗口内各作业段片段覆盖面积之和(包括重复作业)
+    'within_overlap_area',  # 窗口内的重复作业面积
+    'cross_overlap_area',   # 与之前窗口覆盖范围重叠的面积(跨窗口重复作业)
+])
+
+
+def window_edges(times, interval=None, boundaries=None):
+    """
+    生成时间窗口边界: 按固定间隔(与整点对齐)或按给定的班次分界时间
+
+    :param times: 地块范围内轨迹点时间戳数组, 非递减
+    :param interval: 窗口间隔(秒), 如 3600 为按小时
+    :param boundaries: 班次分界时间列表(时间戳或时间字符串), 相邻两个分界之间为一个窗口
+    :return: 窗口边界时间戳数组, 第 k 个窗口为 [edges[k], edges[k + 1])
+    """
+    if boundaries is not None:
+        edges = np.array(sorted(track_io.parse_time(value) for value in boundaries), dtype=np.float64)
+        if len(edges) < 2:
+            raise ValueError("ERROR!!! At least two window boundaries are required")
+        return edges
+    if interval is None or interval <= 0:
+        raise ValueError("ERROR!!! Either a positive interval or window boundaries are required")
+    if len(times) == 0:
+        return np.array([0.0, float(interval)])
+    first = math.floor(times[0] / interval) * interval
+    last = (math.floor(times[-1] / interval) + 1) * interval
+    return np.arange(first, last + interval / 2, interval, dtype=np.float64)
+
+
+def split_run(run_points, run_times, edges):
+    """
+    在窗口边界处切分作业段, 边界点按时间在相邻轨迹点间线性插值
+
+    :param run_points: 作业段投影坐标数组
+    :param run_times: 作业段轨迹点时间戳数组
+    :param edges: 窗口边界时间戳数组
+    :return: (窗口序号, 片段投影坐标数组) 列表, 窗口序号为 -1 或窗口数时表示在全部窗口之外
+    """
+    window = int(np.searchsorted(edges, run_times[0], side='right')) - 1
+    split_edges = edges[window + 1:int(np.searchsorted(edges, run_times[-1], side='right'))]
+    pieces = []
+    piece_start = 0
+    boundary = None
+    for edge in split_edges:
+        # 边界时间所在的轨迹点区间 (i - 1, i]
+        i = int(np.searchsorted(run_times, edge, side='left'))
+        ratio = (edge - run_times[i - 1]) / (run_times[i] - run_times[i - 1])
+        next_boundary = run_points[i - 1] + ratio * (run_points[i] - run_points[i - 1])
+        piece = [run_points[piece_start:i], next_boundary[np.newaxis, :]]
+        if boundary is not None:
+            piece.insert(0, boundary[np.newaxis, :])
+        pieces.append((window, np.vstack(piece)))
+        window += 1
+        piece_start = i
+        boundary = next_boundary
+    piece = [run_points[piece_start:]]
+    if boundary is not None:
+        piece.insert(0, boundary[np.newaxis, :])
+    pieces.append((window, np.vstack(piece)))
+    return pieces
+
+
+def window_breakdown(points, times, runs, half_width, edges, bands):
+    """
+    一次遍历全部作业段计算各时间窗口的作业面积: 跨窗口的作业段在边界处切分, 每个片段只计入其未被同一作业段之前片段覆盖的部分,
+    因此各窗口面积之和与整体计算一致; 重复作业面积分为窗口内重复和与之前窗口的跨窗口重复
+
+    :param points: 地块范围内轨迹点投影坐标数组
+    :param times: 地块范围内轨迹点时间戳数组, 非递减
+    :param runs: 作业段数组, 每行为 (档位, 起始索引, 结束索引)
+    :param half_width: 农具作业幅宽的一半长度
+    :param edges: 窗口边界时间戳数组
+    :param bands: 需要统计的档位列表
+    :return: WindowArea 列表
+    """
+    times = np.asarray(times, dtype=np.float64)
+    if np.any(np.diff(times) < 0):
+        raise ValueError("ERROR!!! Track points must be ordered by gps_time")
+    window_count = len(edges) - 1
+    window_geometries = [{band: [] for band in bands} for _ in range(window_count)]
+
+    for band, start, stop in runs:
+        run_points = points[start:stop]
+        run_times = times[start:stop]
+        pieces = split_run(run_points, run_times, edges)
+        if len(pieces) == 1:
+            window, piece_points = pieces[0]
+            if 0 <= window < window_count:
+                window_geometries[window][band].append(segment_utils.run_buffer(piece_points, half_width))
+            continue
+
+        # 片段只保留未被同一作业段之前片段覆盖的部分, 作业段自身重叠不计为重复作业
+        covered = None
+        for window, piece_points in pieces:
+            piece_poly = segment_utils.run_buffer(piece_points, half_width)
+            piece_geometry = piece_poly if covered is None else piece_poly.difference(covered)
+            covered = piece_poly if covered is None else covered.union(piece_poly)
+            if 0 <= window < window_count and not piece_geometry.is_empty:
+                window_geometries[window][band].append(piece_geometry)
+
+    # 各窗口内的地块范围内轨迹点数
+    point_counts = np.diff(np.searchsorted(times, edges, side='left'))
+
+    results = []
+    previous_union = None
+    for window in range(window_count):
+        geometries = window_geometries[window]
+        band_areas = {band: shapely.union_all(geometries[band]).area for band in bands}
+        all_geometries = [geometry for band in bands for geometry in geometries[band]]
+        gross_area = float(sum(geometry.area for geometry in all_geometries))
+        window_union = shapely.union_all(all_geometries)
+        union_area = window_union.area
+
+        # 与之前各窗口覆盖范围的重叠面积
+        if previous_union is None:
+            cross_overlap_area = 0.0
+            previous_union = window_union
+        else:
+            merged = previous_union.union(window_union)
+            cross_overlap_area = max(union_area + previous_union.area - merged.area, 0.0)
+            previous_union = merged
+
+        results.append(WindowArea(float(edges[window]), float(edges[window + 1]), int(point_counts[window]), band_areas,
+                                  union_area, gross_area, gross_area - union_area, cross_overlap_area))
+    return results